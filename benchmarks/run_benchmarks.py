@@ -0,0 +1,414 @@
+"""
+Offline Benchmarks
+Drives the agent against local stand-ins for Apollo, Instantly and Inframail
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # all scenarios
+    python benchmarks/run_benchmarks.py --scenarios import_concurrent --latency 0.05
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<older>.json
+
+Every scenario gets fresh stub servers and a fresh DATA_DIR, and reports wall
+time, requests/sec, leads/sec and peak traced memory. Results are written as
+JSON (one file per commit by default) so runs can be compared across commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+sys.path.insert(0, BENCH_DIR)
+
+# Keep benchmark output on the console and quiet unless --verbose
+logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s',
+                    handlers=[logging.StreamHandler()])
+
+import agent  # noqa: E402
+from apollo_credit_safe import CreditSafeApolloManager  # noqa: E402
+from circuit_breaker import get_all_breaker_stats  # noqa: E402
+from deferred_work import LEAD_PUSH  # noqa: E402
+from email_validation import VALID, EmailValidator  # noqa: E402
+from http_transport import HttpTransport  # noqa: E402
+from rate_limiter import configure_limiter, get_all_limiter_stats  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from run_journal import ACCOUNT_CONNECTED, LEAD_PUSHED  # noqa: E402
+from stubs import ApolloStub, InframailStub, InstantlyStub  # noqa: E402
+
+logger = logging.getLogger("benchmarks")
+
+# Real API hosts and the stub that stands in for each
+API_HOSTS = {
+    "api.apollo.io": "apollo",
+    "api.instantly.ai": "instantly",
+    "app.inframail.io": "inframail",
+}
+
+SCENARIOS = ["import_sequential", "import_concurrent", "import_bulk", "import_bulk_enrich",
+             "import_streaming", "create_accounts", "daily_run", "sharded_run", "instantly_outage",
+             "daemon", "batch_enrich_safe", "validate_emails"]
+
+
+class StubTransport(HttpTransport):
+    """Shared transport that sends calls for the real API hosts to the local stubs"""
+
+    def __init__(self, stub_urls: Dict[str, str], **kwargs):
+        super().__init__(**kwargs)
+        self.stub_urls = stub_urls
+
+    def request(self, method: str, url: str, provider: Optional[str] = None, **kwargs):
+        parts = urlsplit(url)
+        stub = API_HOSTS.get(parts.netloc)
+        if stub in self.stub_urls:
+            url = self.stub_urls[stub] + url[len(f"{parts.scheme}://{parts.netloc}"):]
+        return super().request(method, url, provider=provider, **kwargs)
+
+
+class Environment:
+    """Fresh stubs, transport and DATA_DIR for one scenario"""
+
+    def __init__(self, args: argparse.Namespace, data_dir: str):
+        faults = dict(latency=args.latency, throttle_rate=args.throttle_rate,
+                      error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed)
+        self.apollo = ApolloStub(people=args.people, email_rate=args.email_rate,
+                                 not_found_rate=args.not_found_rate, bad_email_rate=args.bad_email_rate, **faults)
+        self.instantly = InstantlyStub(accounts=args.accounts, **faults)
+        self.inframail = InframailStub(accounts=args.accounts, **faults)
+        self.stubs = [self.apollo, self.instantly, self.inframail]
+        self.data_dir = data_dir
+        self.rate_limit = args.rate_limit
+        self._saved: Dict[str, object] = {}
+
+    def __enter__(self) -> "Environment":
+        urls = {stub.name: stub.start() for stub in self.stubs}
+        self.transport = StubTransport(urls, pool_maxsize=agent.HTTP_POOL_MAXSIZE, timeout=agent.HTTP_TIMEOUT)
+        self.patch(DATA_DIR=self.data_dir)
+        if self.rate_limit:
+            # Benchmark the code, not the production request budget
+            limits = {p: {'rate': self.rate_limit, 'burst': max(1, int(self.rate_limit))}
+                      for p in agent.RATE_LIMITS}
+            self.patch(RATE_LIMITS=limits)
+        for provider, limits in agent.RATE_LIMITS.items():
+            configure_limiter(provider, limits['rate'], limits['burst'])
+        return self
+
+    def __exit__(self, *exc):
+        for name, value in self._saved.items():
+            setattr(agent, name, value)
+        self.transport.close()
+        for stub in self.stubs:
+            stub.stop()
+
+    def patch(self, **settings):
+        """Override agent.py module settings for this scenario only"""
+        for name, value in settings.items():
+            self._saved.setdefault(name, getattr(agent, name))
+            setattr(agent, name, value)
+
+    def new_agent(self, worker_id: Optional[str] = None) -> "agent.AutonomousLeadAgent":
+        lead_agent = agent.AutonomousLeadAgent(worker_id=worker_id)
+        lead_agent.transport = self.transport
+        for manager in (lead_agent.inframail, lead_agent.instantly, lead_agent.apollo, lead_agent.enricher):
+            manager.http = self.transport
+        return lead_agent
+
+    def stub_stats(self) -> Dict:
+        statuses: Dict[str, int] = {}
+        for stub in self.stubs:
+            for status, count in stub.statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+        return {
+            "requests": sum(stub.total_requests for stub in self.stubs),
+            "statuses": statuses,
+            "endpoints": {f"{stub.name} {key}": count
+                          for stub in self.stubs for key, count in sorted(stub.requests.items())},
+        }
+
+
+# ============================================================================
+# SCENARIOS
+# Each returns what it produced: leads, accounts, credits used
+# ============================================================================
+
+def scenario_import_sequential(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(BULK_LEAD_UPLOAD=False)
+    return {"leads": env.new_agent().import_leads(args.leads, concurrent=False)}
+
+
+def scenario_import_concurrent(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(BULK_LEAD_UPLOAD=False)
+    return {"leads": env.new_agent().import_leads(args.leads, concurrent=True)}
+
+
+def scenario_import_bulk(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(BULK_LEAD_UPLOAD=True)
+    return {"leads": env.new_agent().import_leads(args.leads, concurrent=True)}
+
+
+def scenario_import_bulk_enrich(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(BULK_LEAD_UPLOAD=True, BULK_ENRICHMENT=True)
+    return {"leads": env.new_agent().import_leads(args.leads, concurrent=True)}
+
+
+def scenario_import_streaming(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(STREAMING_IMPORT=True, BULK_LEAD_UPLOAD=True, BULK_ENRICHMENT=True)
+    return {"leads": env.new_agent().import_leads(args.leads)}
+
+
+def scenario_create_accounts(env: Environment, args: argparse.Namespace) -> Dict:
+    lead_agent = env.new_agent()
+    existing = lead_agent.inframail.get_email_accounts()
+    return {"accounts": lead_agent.create_email_accounts(args.new_accounts, existing_accounts=existing)}
+
+
+def scenario_daily_run(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(ACCOUNTS_TO_CREATE_PER_DAY=args.new_accounts)
+    lead_agent = env.new_agent()
+    lead_agent.run()
+    return {"leads": lead_agent.journal.count(LEAD_PUSHED), "accounts": lead_agent.stats['accounts_connected']}
+
+
+def scenario_sharded_run(env: Environment, args: argparse.Namespace) -> Dict:
+    env.patch(ACCOUNTS_TO_CREATE_PER_DAY=args.new_accounts, WORKER_SHARDING=True)
+    # Workers in one process share one limiter per provider, and each would take
+    # only 1/N of it: scale it up so the cluster as a whole gets RATE_LIMITS
+    env.patch(RATE_LIMITS={p: {'rate': limits['rate'] * args.workers, 'burst': limits['burst'] * args.workers}
+                           for p, limits in agent.RATE_LIMITS.items()})
+    workers = [env.new_agent(worker_id=f"bench-{i}") for i in range(args.workers)]
+    errors = []
+
+    def work(lead_agent: "agent.AutonomousLeadAgent"):
+        try:
+            lead_agent.run()
+        except Exception as e:
+            logger.exception(f"Worker {lead_agent.leases.worker_id} failed")
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(lead_agent,)) for lead_agent in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for lead_agent in workers:
+        lead_agent.leases.close()
+    if errors:
+        raise errors[0]
+    journal = workers[0].journal
+    return {"leads": journal.count(LEAD_PUSHED), "accounts": journal.count(ACCOUNT_CONNECTED),
+            "workers": args.workers}
+
+
+def scenario_instantly_outage(env: Environment, args: argparse.Namespace) -> Dict:
+    """Instantly's lead endpoint is down for --outage seconds at the start of an import"""
+    env.patch(BULK_LEAD_UPLOAD=False,
+              CIRCUIT_BREAKERS={**agent.CIRCUIT_BREAKERS, "instantly": {"failure_threshold": 5, "probe_interval": 1}})
+    back_up = time.monotonic() + args.outage
+    env.instantly.outage("/api/v1/lead/add", args.outage)
+    lead_agent = env.new_agent()
+    first = lead_agent.import_leads(args.leads, concurrent=False)
+    deferred = lead_agent.deferred.count(LEAD_PUSH)
+    # The next run starts once Instantly is back and its breaker lets a probe through
+    time.sleep(max(0.0, back_up - time.monotonic()))
+    while lead_agent._import_paused():
+        time.sleep(0.1)
+    second = lead_agent.import_leads(args.leads - first, concurrent=False)
+    return {"leads": first + second, "leads_first_run": first, "leads_deferred": deferred,
+            "calls_failed_fast": sum(breaker['rejected'] for breaker in get_all_breaker_stats())}
+
+
+def scenario_daemon(env: Environment, args: argparse.Namespace) -> Dict:
+    """The daemon's phases on short cadences for --uptime seconds, then a graceful stop"""
+    env.patch(ACCOUNTS_TO_CREATE_PER_DAY=args.new_accounts, PROVISION_INTERVAL=1.0, IMPORT_INTERVAL=0.5,
+              STREAMING_IMPORT=True, BULK_ENRICHMENT=True, BULK_LEAD_UPLOAD=True)
+    lead_agent = env.new_agent()
+    done = {}
+
+    def import_phase():
+        lead_agent.import_phase()
+        if lead_agent.journal.is_complete() and not done:
+            done["requests"] = env.stub_stats()["requests"]
+
+    scheduler = Scheduler(on_stop=lead_agent.drain)
+    provision = scheduler.add("provision", lead_agent.provision_phase, agent.PROVISION_INTERVAL)
+    imports = scheduler.add("import", import_phase, agent.IMPORT_INTERVAL)
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    time.sleep(args.uptime)
+    scheduler.stop()
+    thread.join()
+    requests = env.stub_stats()["requests"]
+    return {"leads": lead_agent.journal.count(LEAD_PUSHED), "accounts": lead_agent.journal.count(ACCOUNT_CONNECTED),
+            "phase_runs": provision.runs + imports.runs,
+            "requests_after_day_done": requests - done["requests"] if done else None}
+
+
+def scenario_batch_enrich_safe(env: Environment, args: argparse.Namespace) -> Dict:
+    manager = CreditSafeApolloManager(agent.APOLLO_API_KEY, transport=env.transport)
+    contacts = [dict(env.apollo.person(i), email=None) for i in range(args.contacts)]
+    enriched = manager.batch_enrich_safe(contacts)
+    return {"leads": len(enriched), "credits_used": manager.credits_used_this_session}
+
+
+def scenario_validate_emails(env: Environment, args: argparse.Namespace) -> Dict:
+    # Offline only: every search page's emails screened in one batch
+    validator = EmailValidator()
+    pages = [[env.apollo.person(i).get("email") for i in range(start, min(start + 100, args.people))]
+             for start in range(0, args.people, 100)]
+    started = time.perf_counter()
+    verdicts = [verdict for page in pages for verdict in validator.validate_batch(page)]
+    elapsed = time.perf_counter() - started
+    return {"leads": verdicts.count(VALID), "emails_checked": len(verdicts),
+            "emails_per_sec": round(len(verdicts) / max(elapsed, 1e-9)),
+            "emails_rejected": validator.get_stats()["rejected"]}
+
+
+SCENARIO_FUNCTIONS: Dict[str, Callable[[Environment, argparse.Namespace], Dict]] = {
+    name: globals()[f"scenario_{name}"] for name in SCENARIOS
+}
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_scenario(name: str, args: argparse.Namespace, data_root: str) -> Dict:
+    data_dir = os.path.join(data_root, name)
+    with Environment(args, data_dir) as env:
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            produced = SCENARIO_FUNCTIONS[name](env, args)
+            error = None
+        except Exception as e:
+            logger.exception(f"Scenario {name} failed")
+            produced, error = {}, repr(e)
+        wall_time = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stubs = env.stub_stats()
+        result = {
+            "wall_time_s": round(wall_time, 3),
+            "requests": stubs["requests"],
+            "requests_per_sec": round(stubs["requests"] / max(wall_time, 1e-9), 2),
+            "leads": produced.get("leads", 0),
+            "leads_per_sec": round(produced.get("leads", 0) / max(wall_time, 1e-9), 2),
+            "peak_memory_mb": round(peak / (1024 * 1024), 2),
+            **{k: v for k, v in produced.items() if k != "leads"},
+            "statuses": stubs["statuses"],
+            "endpoints": stubs["endpoints"],
+            "rate_limiters": get_all_limiter_stats(),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict):
+    """Print the change of each headline number against an older result file"""
+    metrics = ("wall_time_s", "requests_per_sec", "leads_per_sec", "peak_memory_mb")
+    print(f"\nComparison with {baseline.get('commit') or 'baseline'} -> {current.get('commit') or 'current'}")
+    print(f"{'scenario':<20}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<20}{metric:<18}{old:>12}{new:>12}{change:>10}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local API stubs")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every stub response")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--people", type=int, default=5000, help="People in the Apollo search dataset")
+    parser.add_argument("--email-rate", type=float, default=0.5, help="Share of search results that already have an email")
+    parser.add_argument("--bad-email-rate", type=float, default=0.0,
+                        help="Share of search emails that are role, disposable or malformed")
+    parser.add_argument("--not-found-rate", type=float, default=0.1, help="Share of people/match lookups that 404")
+    parser.add_argument("--accounts", type=int, default=20, help="Mailboxes that already exist")
+    parser.add_argument("--new-accounts", type=int, default=20, help="Mailboxes to provision")
+    parser.add_argument("--workers", type=int, default=3, help="Workers in the sharded_run scenario")
+    parser.add_argument("--uptime", type=float, default=10.0, help="Seconds the daemon scenario runs")
+    parser.add_argument("--outage", type=float, default=3.0, help="Seconds Instantly is down in instantly_outage")
+    parser.add_argument("--leads", type=int, default=200, help="Leads per import scenario")
+    parser.add_argument("--contacts", type=int, default=100, help="Contacts for batch_enrich_safe")
+    parser.add_argument("--rate-limit", type=float, default=100.0,
+                        help="Requests/sec per provider (0 keeps RATE_LIMITS from agent.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Older result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the agent's own log output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")},
+        "scenarios": {},
+    }
+
+    data_root = tempfile.mkdtemp(prefix="lead_agent_bench_")
+    try:
+        for name in args.scenarios:
+            print(f"Running {name}...", flush=True)
+            result = run_scenario(name, args, data_root)
+            report["scenarios"][name] = result
+            print(f"  {result['wall_time_s']:.2f}s, {result['requests']} requests "
+                  f"({result['requests_per_sec']:.1f}/s), {result['leads']} leads "
+                  f"({result['leads_per_sec']:.1f}/s), "
+                  + (f"{result['accounts']} accounts, " if "accounts" in result else "")
+                  + f"peak {result['peak_memory_mb']:.1f} MB"
+                  + (f", ERROR {result['error']}" if "error" in result else ""), flush=True)
+    finally:
+        shutil.rmtree(data_root, ignore_errors=True)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{commit or 'unversioned'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
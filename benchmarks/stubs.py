@@ -0,0 +1,291 @@
+"""
+Local API Stand-ins
+Stub Apollo, Instantly and Inframail servers for offline benchmarks
+
+Each stub serves the endpoints agent.py calls, with configurable latency,
+429 (throttle) and 5xx rates, and a synthetic dataset of a chosen size.
+Outages (every call to an endpoint failing for a while) can be switched on per endpoint.
+Every stub counts the requests it served, by endpoint and status.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIRST_NAMES = ["james", "mary", "robert", "linda", "michael", "susan", "david", "karen", "daniel", "nancy"]
+
+# handler(body, query) -> (status, payload) or (status, payload, headers);
+# query also carries the URL path ("path") and the request headers ("headers")
+Route = Callable[[Dict, Dict], Tuple]
+
+
+class StubServer:
+    """One local stand-in API with injected latency, throttling and errors"""
+
+    def __init__(self, name: str, latency: float = 0.02, throttle_rate: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        self.name = name
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[int, int] = {}
+        self._routes: Dict[Tuple[str, str], Route] = {}
+        self._outages: Dict[str, float] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def route(self, method: str, path: str, handler: Route):
+        """Serve method requests whose path starts with path"""
+        self._routes[(method, path)] = handler
+
+    def outage(self, path: str, seconds: float):
+        """Answer every request whose path starts with path with 500 for the next seconds"""
+        with self._lock:
+            self._outages[path] = time.monotonic() + seconds
+
+    def _dispatch(self, method: str, raw_path: str, body: Dict,
+                  request_headers: Optional[Dict] = None) -> Tuple[int, object, Dict]:
+        parts = urlsplit(raw_path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        handler, endpoint = None, parts.path
+        for (route_method, prefix), candidate in self._routes.items():
+            if route_method == method and parts.path.startswith(prefix):
+                handler, endpoint = candidate, prefix
+                break
+
+        with self._lock:
+            roll = self._rng.random()
+            down = any(parts.path.startswith(path) and time.monotonic() < until
+                       for path, until in self._outages.items())
+        if handler is None:
+            status, payload, headers = 404, {"error": "not found"}, {}
+        elif down:
+            status, payload, headers = 500, {"error": "service down"}, {}
+        elif roll < self.throttle_rate:
+            status, payload, headers = 429, {"error": "rate limited"}, {"Retry-After": f"{self.retry_after:g}"}
+        elif roll < self.throttle_rate + self.error_rate:
+            status, payload, headers = 500, {"error": "internal error"}, {}
+        else:
+            status, payload, *extra = handler(body, {**query, "path": parts.path, "headers": request_headers or {}})
+            headers = extra[0] if extra else {}
+
+        with self._lock:
+            key = f"{method} {endpoint}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        return status, payload, headers
+
+    def start(self) -> str:
+        """Start serving on a free local port; returns the base URL"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, payload, headers = stub._dispatch(self.command, self.path, body, dict(self.headers))
+                data = json.dumps(payload).encode() if status != 304 else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True).start()
+        return self.base_url
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+
+class ApolloStub(StubServer):
+    """mixed_people/search over a synthetic dataset, people/match and bulk_match enrichment"""
+
+    def __init__(self, people: int = 5000, email_rate: float = 0.5, not_found_rate: float = 0.1,
+                 bad_email_rate: float = 0.0, **kwargs):
+        super().__init__("apollo", **kwargs)
+        self.people = people
+        self.email_rate = email_rate
+        self.bad_email_rate = bad_email_rate
+        self.not_found_rate = not_found_rate
+        self._matches: Dict[Tuple[str, ...], List[int]] = {}
+        self.route("POST", "/api/v1/mixed_people/search", self.search)
+        self.route("POST", "/api/v1/people/match", self.match)
+        self.route("POST", "/api/v1/people/bulk_match", self.bulk_match)
+
+    def person(self, index: int) -> Dict:
+        # Deterministic per index, so every run sees the same dataset
+        rng = random.Random(index)
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = f"owner{index}"
+        company = f"Company {index}"
+        email = f"{first}.{last}@company{index}.com" if rng.random() < self.email_rate else None
+        if email and rng.random() < self.bad_email_rate:
+            # Role accounts, disposable domains and malformed addresses in turn
+            email = [f"info@company{index}.com", f"{first}.{last}@mailinator.com",
+                     f"{first}..{last}@company{index}"][index % 3]
+        return {"id": f"person-{index}", "first_name": first.capitalize(), "last_name": last.capitalize(),
+                "name": f"{first.capitalize()} {last.capitalize()}", "title": "Owner",
+                "organization_name": company, "organization_num_employees": self.employees(index),
+                "email": email}
+
+    @staticmethod
+    def employees(index: int) -> int:
+        return 11 + (index * 37) % 90  # 11..100, spread evenly over the dataset
+
+    def matching(self, ranges: Optional[List[str]]) -> List[int]:
+        """Indexes of the people whose company size is in one of ranges ("min,max")"""
+        key = tuple(ranges or ())
+        if key not in self._matches:
+            bounds = [tuple(int(n) for n in r.split(",")) for r in key]
+            self._matches[key] = [i for i in range(self.people)
+                                  if not bounds or any(lo <= self.employees(i) <= hi for lo, hi in bounds)]
+        return self._matches[key]
+
+    def search(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        page = max(1, int(body.get("page", 1)))
+        per_page = max(1, int(body.get("per_page", 100)))
+        indexes = self.matching(body.get("organization_num_employees_ranges"))
+        start = (page - 1) * per_page
+        people = [self.person(i) for i in indexes[start:start + per_page]]
+        total_pages = (len(indexes) + per_page - 1) // per_page
+        return 200, {"people": people,
+                     "pagination": {"page": page, "per_page": per_page,
+                                    "total_entries": len(indexes), "total_pages": total_pages}}
+
+    def match(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        first = (body.get("first_name") or "").lower()
+        last = (body.get("last_name") or "").lower()
+        company = (body.get("organization_name") or "").lower().replace(" ", "")
+        # Hash the name so the same person is always found (or not)
+        if random.Random(f"{first}|{last}|{company}").random() < self.not_found_rate:
+            return 404, {"error": "person not found"}
+        return 200, {"person": {"first_name": body.get("first_name"), "last_name": body.get("last_name"),
+                                "organization_name": body.get("organization_name"),
+                                "email": f"{first}.{last}@{company or 'example'}.com"}}
+
+
+    def bulk_match(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        # Matches come back in request order, None for people not found
+        matches = []
+        for detail in body.get("details", []):
+            status, found = self.match(detail, query)
+            matches.append(found["person"] if status == 200 else None)
+        return 200, {"matches": matches, "credits_consumed": sum(1 for m in matches if m)}
+
+
+def conditional(query: Dict, payload: object) -> Tuple:
+    """200 with an ETag, or 304 if the client already has this version"""
+    etag = '"' + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16] + '"'
+    if query["headers"].get("If-None-Match") == etag:
+        return 304, None, {"ETag": etag}
+    return 200, payload, {"ETag": etag}
+
+
+class InstantlyStub(StubServer):
+    """Accounts, campaign membership and lead uploads"""
+
+    def __init__(self, accounts: int = 20, account_age_days: int = 90, **kwargs):
+        super().__init__("instantly", **kwargs)
+        self.accounts = [f"sender{i}@existing-domain.com" for i in range(accounts)]
+        # Existing accounts are long past warmup; new ones are created "now"
+        created = datetime.now(timezone.utc) - timedelta(days=account_age_days)
+        self.created = {email: created.isoformat() for email in self.accounts}
+        self.campaign = list(self.accounts)
+        self.leads: Dict[str, Dict] = {}
+        self.route("GET", "/api/v2/accounts", self.list_accounts)
+        self.route("POST", "/api/v2/accounts", self.add_account)
+        self.route("GET", "/api/v2/campaigns/", self.get_campaign)
+        self.route("PATCH", "/api/v2/campaigns/", self.update_campaign)
+        self.route("POST", "/api/v1/lead/add", self.add_leads)
+
+    def list_accounts(self, body: Dict, query: Dict) -> Tuple:
+        accounts = [{"email": email, "status": 1, "timestamp_created": self.created.get(email)}
+                    for email in self.accounts]
+        if "limit" not in query:
+            return 200, accounts
+        # v2 pagination: limit / starting_after, with an ETag on the first page
+        start = 0
+        if query.get("starting_after"):
+            start = self.accounts.index(query["starting_after"]) + 1
+        items = accounts[start:start + int(query["limit"])]
+        after = items[-1]["email"] if start + len(items) < len(accounts) else None
+        page = {"items": items, "next_starting_after": after}
+        if start:
+            return 200, page
+        return conditional(query, {**page, "total": len(accounts)})
+
+    def add_account(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        self.accounts.append(body.get("email"))
+        self.created[body.get("email")] = datetime.now(timezone.utc).isoformat()
+        return 200, {"email": body.get("email"), "status": 1, "timestamp_created": self.created[body.get("email")]}
+
+    def get_campaign(self, body: Dict, query: Dict) -> Tuple:
+        return conditional(query, {"id": query["path"].rsplit("/", 1)[-1], "email_list": list(self.campaign)})
+
+    def update_campaign(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        self.campaign = list(body.get("email_list", []))
+        return 200, {"email_list": self.campaign}
+
+    def add_leads(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        leads = body.get("leads") or [body]
+        for lead in leads:
+            self.leads[lead.get("email")] = lead
+        return 200, {"status": "success", "total_sent": len(leads), "leads_uploaded": len(leads),
+                     "already_in_campaign": 0, "invalid_email_count": 0, "duplicate_email_count": 0}
+
+
+class InframailStub(StubServer):
+    """Mailbox listing and creation"""
+
+    def __init__(self, accounts: int = 20, **kwargs):
+        super().__init__("inframail", **kwargs)
+        self.emails = [f"sender{i}@existing-domain.com" for i in range(accounts)]
+        self.route("GET", "/api/v1/host/operations/email", self.list_emails)
+        self.route("POST", "/api/v1/host/operations/email", self.create_email)
+
+    def list_emails(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        # No ETag: the mirror falls back to diffing the full list
+        return 200, {"emails": [{"email": email} for email in self.emails]}
+
+    def create_email(self, body: Dict, query: Dict) -> Tuple[int, object]:
+        self.emails.append(body.get("email"))
+        return 200, {"status": "success", "email": body.get("email")}
@@ -58,6 +58,10 @@ EXISTING_DOMAINS = [
     "yourdomain3.com",
 ]
 
+# Mailbox name patterns, in order of preference (used once the previous one is full)
+# "first.last" = sarah.smith@, "firstl" = sarahs@, "f.last" = s.smith@
+NAME_PATTERNS = ["first.last", "firstl", "f.last"]
+
 # ============================================================================
 # ADVANCED SETTINGS (Optional)
 # ============================================================================
@@ -68,7 +72,95 @@ ORGANIZATION_EMPLOYEE_RANGES = ["11,20", "21,50", "51,100", "101,200"]
 
 # Warmup settings
 WARMUP_DAYS = 14  # Days to warm up new email accounts before full sending
-
-# Logging level (DEBUG, INFO, WARNING, ERROR)
-LOG_LEVEL = "INFO"
+SENDING_RAMP_DAYS = 7  # After warmup, campaign emails grow to EMAILS_PER_ACCOUNT_PER_DAY over this many days
+
+# Local state (search cursors and other on-disk stores)
+DATA_DIR = "/opt/lead_agent/data"
+
+# Cross-run lead dedup (leads already pushed are never enriched or pushed again)
+LEAD_DEDUP_CAPACITY = 5000000  # Expected number of known leads (sizes the in-memory filter)
+
+# Metrics (request counts, latencies, stage timings) are written to DATA_DIR/metrics.json
+# and served by the dashboard at /metrics
+METRICS_EXPORT_INTERVAL = 15  # Seconds between snapshots
+
+# HTTP connection pooling (shared by Apollo, Instantly and Inframail calls)
+HTTP_TIMEOUT = 30          # Seconds before any API call is abandoned
+HTTP_POOL_MAXSIZE = 10     # Keep-alive connections kept open per host
+
+# Per-provider rate limits: starting requests/sec and burst size.
+# Each limiter slows down on 429s (honoring Retry-After) and speeds back up while calls succeed.
+RATE_LIMITS = {
+    "apollo": {"rate": 2.0, "burst": 5},
+    "instantly": {"rate": 5.0, "burst": 10},
+    "inframail": {"rate": 1.0, "burst": 2},
+}
+
+# Per-endpoint circuit breakers: after failure_threshold failures in a row (timeouts, 5xx) calls to
+# that endpoint fail at once; after probe_interval seconds one probe call tests it again.
+# While Apollo or Instantly is down the import stops and leaves the rest of the day for a later run.
+CIRCUIT_BREAKERS = {
+    "apollo": {"failure_threshold": 5, "probe_interval": 60},
+    "instantly": {"failure_threshold": 5, "probe_interval": 60},
+    "inframail": {"failure_threshold": 3, "probe_interval": 120},
+}
+DEFERRED_MAX_ATTEMPTS = 5       # Failed pushes before a lead parked in DATA_DIR/deferred_work.db is given up
+
+# Concurrent lead import (opt-in)
+CONCURRENT_IMPORT = False       # Enrich and push leads in parallel
+IMPORT_WORKERS = 8              # Leads processed at the same time
+APOLLO_MAX_CONCURRENCY = 4      # Parallel Apollo enrichment calls
+INSTANTLY_MAX_CONCURRENCY = 4   # Parallel Instantly calls (lead pushes, account connects)
+
+# Bulk enrichment (opt-in): hidden emails are revealed through Apollo's people/bulk_match
+# and cached in DATA_DIR/enrichment_cache.db
+BULK_ENRICHMENT = False
+ENRICH_BATCH_SIZE = 10          # Contacts per request (Apollo allows up to 10)
+
+# Offline email validation: each search page is screened (syntax, disposable domains,
+# role accounts) before any enrichment credit is spent or any lead is pushed
+EMAIL_REJECT_ROLE_ACCOUNTS = True   # Skip info@, sales@, ... addresses
+EMAIL_REJECT_FREE_MAIL = False      # Skip gmail.com, outlook.com, ... addresses
+
+# Streaming lead import (opt-in): search, enrichment and pushes overlap as one pipeline
+# with bounded queues between stages, so memory stays flat however many leads are imported
+STREAMING_IMPORT = False
+PIPELINE_QUEUE_SIZE = 200       # Leads buffered between two stages at most
+
+# Parallel account provisioning
+INFRAMAIL_MAX_CONCURRENCY = 3   # Parallel Inframail account creates
+PROVISION_MAX_PER_DOMAIN = 2    # Accounts in flight per domain at once
+
+# Bulk lead upload (opt-in): leads are sent to Instantly in chunks instead of one per request
+BULK_LEAD_UPLOAD = False
+LEAD_UPLOAD_CHUNK_SIZE = 100    # Leads per request
+LEAD_UPLOAD_MAX_WAIT = 10       # Seconds a buffered lead may wait before a flush
+BULK_UPLOAD_SPLITS = 3          # Times a chunk Instantly rejects (400/422) is halved to isolate bad leads
+
+# Campaign assignment: new accounts are merged into the campaign once per run
+CAMPAIGN_ASSIGN_CHUNK_SIZE = 500  # New accounts per PATCH
+CAMPAIGN_ASSIGN_ATTEMPTS = 3      # Re-merge attempts if verification finds lost updates
+
+# Multiple workers (opt-in): run several agents (processes or machines) on one shared DATA_DIR.
+# Workers lease domains, search shards (one per employee range) and batches of the day's leads
+# in DATA_DIR/leases.db, and split RATE_LIMITS evenly between the live workers.
+WORKER_SHARDING = False
+WORKER_ID = None                # Defaults to <hostname>-<pid>
+LEASE_TTL = 120                 # Seconds before a silent worker's leases expire
+LEAD_BATCH_SIZE = 100           # Leads per leased batch of the day's target
+
+# Daemon mode (agent.py --daemon): one long-running process runs each phase on its own cadence.
+# Once the day's work is done the phases make no API calls until the next day.
+# SIGHUP (systemctl reload) reloads this file; SIGTERM lets in-flight work finish, then exits.
+PROVISION_INTERVAL = 3600       # Seconds between account provisioning passes
+IMPORT_INTERVAL = 900           # Seconds between lead import passes
+
+# Logging: records are queued and written by a background thread, so API calls never wait on disk.
+# One file per day (agent_YYYYMMDD.log in LOG_DIR, tailed by the dashboard), rotated by size too.
+LOG_DIR = "/opt/lead_agent/logs"
+LOG_LEVEL = "INFO"              # DEBUG, INFO, WARNING, ERROR (DEBUG logs every API call with its latency)
+LOG_FORMAT = "text"             # "text", or "json" for one JSON object per line
+LOG_MAX_BYTES = 50 * 1024 * 1024  # A day's file is rotated to .1, .2, ... past this size
+LOG_BACKUP_COUNT = 5            # Rotated files kept per day
+LOG_RETENTION_DAYS = 14         # Older daily logs are deleted
 
@@ -19,7 +19,7 @@ source venv/bin/activate
 
 # Start the agent in the background
 echo "Starting lead generation agent..."
-nohup python3 src/agent.py > logs/agent.log 2>&1 &
+nohup python3 src/agent.py --daemon > logs/agent.log 2>&1 &
 AGENT_PID=$!
 echo $AGENT_PID > /opt/lead_agent/agent.pid
 echo "✓ Agent started (PID: $AGENT_PID)"
@@ -0,0 +1,370 @@
+"""
+Account Mirror
+Local copy of the Inframail mailboxes, Instantly accounts and campaign membership
+
+Key Features:
+1. SQLite store (WAL) shared by the agent and the dashboard, so both read
+   counts and lists locally instead of calling the providers
+2. Conditional fetches: the ETag / Last-Modified of the last sync is sent back,
+   and a 304 answer costs one small request and no writes
+3. Paginated fetches where the provider pages its list (Instantly v2 accounts)
+4. Where neither is supported, a digest of the list skips unchanged syncs, and
+   changed lists are applied as a diff (only added, changed and removed rows)
+5. Write-through: accounts the agent creates, connects or assigns are added
+   right away, without waiting for the next sync
+6. A revision number per source that changes whenever its contents change
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from http_transport import HttpTransport
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+INFRAMAIL = "inframail"
+INSTANTLY = "instantly"
+CAMPAIGN = "campaign"
+SOURCES = (INFRAMAIL, INSTANTLY, CAMPAIGN)
+
+DEFAULT_PAGE_SIZE = 100
+
+# fetch(validators) -> (items, validators), or None if the list is unchanged (304)
+Fetcher = Callable[[Dict], Optional[Tuple[List[Dict], Dict]]]
+
+
+def _validators(response) -> Dict:
+    return {k: v for k, v in (("etag", response.headers.get("ETag")),
+                              ("last_modified", response.headers.get("Last-Modified"))) if v}
+
+
+def _conditional_headers(headers: Dict, validators: Dict) -> Dict:
+    headers = dict(headers)
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def inframail_fetcher(transport: HttpTransport, url: str, headers: Dict, provider: Optional[str] = None) -> Fetcher:
+    """Inframail returns every mailbox of the host order in one response"""
+    def fetch(validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        response = transport.get(url, headers=_conditional_headers(headers, validators), provider=provider)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return response.json().get("emails", []), _validators(response)
+    return fetch
+
+
+def instantly_accounts_fetcher(transport: HttpTransport, url: str, headers: Dict, provider: Optional[str] = None,
+                               page_size: int = DEFAULT_PAGE_SIZE) -> Fetcher:
+    """
+    Instantly v2 pages accounts with limit / starting_after
+    Only the first page is fetched conditionally; a plain list answer is taken as the whole list.
+    """
+    def fetch(validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        items: List[Dict] = []
+        params = {"limit": page_size}
+        request_headers = _conditional_headers(headers, validators)
+        new_validators: Dict = {}
+        while True:
+            response = transport.get(url, headers=request_headers, params=params, provider=provider)
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            if not new_validators:
+                new_validators = _validators(response)
+            body = response.json()
+            if isinstance(body, list):
+                return body, new_validators
+            items.extend(body.get("items", []))
+            after = body.get("next_starting_after")
+            if not after or not body.get("items"):
+                return items, new_validators
+            params = {"limit": page_size, "starting_after": after}
+            request_headers = headers
+    return fetch
+
+
+def campaign_fetcher(transport: HttpTransport, url: str, headers: Dict, provider: Optional[str] = None) -> Fetcher:
+    """Campaign membership: the campaign's email_list"""
+    def fetch(validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        response = transport.get(url, headers=_conditional_headers(headers, validators), provider=provider)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return [{"email": email} for email in response.json().get("email_list", [])], _validators(response)
+    return fetch
+
+
+def _row(item: Dict) -> Optional[Tuple[str, str, Optional[str], str]]:
+    """(email, domain, status, data) for one provider record"""
+    email = (item.get("email") or "").strip().lower()
+    if "@" not in email:
+        return None
+    status = item.get("status")
+    return email, email.split("@", 1)[1], None if status is None else str(status), json.dumps(item, sort_keys=True)
+
+
+class AccountMirror:
+    """Incrementally synced local mirror of provider account lists"""
+
+    def __init__(self, path: str, fetchers: Optional[Dict[str, Fetcher]] = None):
+        self.path = path
+        self.fetchers = dict(fetchers or {})
+        self._lock = threading.Lock()
+        self._sync_locks = {source: threading.Lock() for source in SOURCES}
+        self._conn = open_database(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mirrored_accounts (
+                source TEXT NOT NULL,
+                email TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                status TEXT,
+                data TEXT,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (source, email)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_mirrored_accounts_domain ON mirrored_accounts (source, domain)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mirror_sources (
+                source TEXT PRIMARY KEY,
+                validators TEXT,
+                digest TEXT,
+                revision INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL,
+                changed_at REAL,
+                first_synced_at REAL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(mirror_sources)")}
+        if "first_synced_at" not in columns:
+            # Mirrors created before the column existed: their first sync stored the oldest rows
+            self._conn.execute("ALTER TABLE mirror_sources ADD COLUMN first_synced_at REAL")
+            self._conn.execute(
+                """UPDATE mirror_sources SET first_synced_at = (
+                       SELECT MIN(first_seen) FROM mirrored_accounts WHERE source = mirror_sources.source)
+                   WHERE synced_at IS NOT NULL"""
+            )
+
+        self.syncs = 0
+        self.not_modified = 0
+        self.unchanged = 0
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def _source_state(self, source: str) -> Dict:
+        """Caller holds the lock"""
+        row = self._conn.execute(
+            "SELECT validators, digest, revision, synced_at, changed_at FROM mirror_sources WHERE source = ?",
+            (source,)
+        ).fetchone()
+        if row is None:
+            return {"validators": {}, "digest": None, "revision": 0, "synced_at": None, "changed_at": None}
+        return {"validators": json.loads(row[0]) if row[0] else {}, "digest": row[1], "revision": row[2],
+                "synced_at": row[3], "changed_at": row[4]}
+
+    def sync(self, source: str, max_age: float = 0) -> bool:
+        """
+        Bring one source up to date, unless it was synced (by any process) within max_age seconds
+        Returns True if the mirrored contents changed. Raises if the fetch fails.
+        """
+        fetch = self.fetchers[source]
+        with self._sync_locks[source]:
+            with self._lock:
+                state = self._source_state(source)
+            if max_age and state["synced_at"] and time.time() - state["synced_at"] < max_age:
+                return False
+
+            self.syncs += 1
+            result = fetch(state["validators"])
+            now = time.time()
+            if result is None:
+                self.not_modified += 1
+                with self._lock:
+                    self._conn.execute("UPDATE mirror_sources SET synced_at = ? WHERE source = ?", (now, source))
+                return False
+
+            items, validators = result
+            rows = {row[0]: row for row in map(_row, items) if row}
+            digest = hashlib.sha256(json.dumps(sorted(rows.values())).encode()).hexdigest()
+            if digest == state["digest"]:
+                self.unchanged += 1
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE mirror_sources SET validators = ?, synced_at = ? WHERE source = ?",
+                        (json.dumps(validators), now, source)
+                    )
+                return False
+
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    current = {row[0]: row for row in self._conn.execute(
+                        "SELECT email, domain, status, data FROM mirrored_accounts WHERE source = ?", (source,))}
+                    added = [row for email, row in rows.items() if email not in current]
+                    changed = [row for email, row in rows.items() if email in current and current[email] != row]
+                    removed = [email for email in current if email not in rows]
+                    self._conn.executemany(
+                        """INSERT INTO mirrored_accounts (source, email, domain, status, data, first_seen)
+                           VALUES (?, ?, ?, ?, ?, ?)
+                           ON CONFLICT(source, email) DO UPDATE SET
+                               domain = excluded.domain, status = excluded.status, data = excluded.data""",
+                        [(source, *row, now) for row in added + changed]
+                    )
+                    self._conn.executemany("DELETE FROM mirrored_accounts WHERE source = ? AND email = ?",
+                                           [(source, email) for email in removed])
+                    self._save_state(source, validators, digest, now, bool(added or changed or removed))
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+        if added or changed or removed:
+            logger.info(f"[{source}] Mirror synced: +{len(added)} ~{len(changed)} -{len(removed)} "
+                        f"({len(rows)} accounts)")
+        return bool(added or changed or removed)
+
+    def _save_state(self, source: str, validators: Dict, digest: Optional[str], now: float, changed: bool):
+        """Caller holds the lock"""
+        self._conn.execute(
+            """INSERT INTO mirror_sources (source, validators, digest, revision, synced_at, changed_at, first_synced_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(source) DO UPDATE SET
+                   validators = excluded.validators, digest = excluded.digest, synced_at = excluded.synced_at,
+                   revision = mirror_sources.revision + ?,
+                   changed_at = CASE WHEN ? THEN excluded.changed_at ELSE mirror_sources.changed_at END,
+                   first_synced_at = COALESCE(mirror_sources.first_synced_at, excluded.first_synced_at)""",
+            (source, json.dumps(validators), digest, int(changed), now, now, now, int(changed), int(changed))
+        )
+
+    def sync_all(self, max_age: float = 0) -> Dict[str, Optional[str]]:
+        """Sync every configured source; returns {source: error or None}"""
+        errors = {}
+        for source in self.fetchers:
+            try:
+                self.sync(source, max_age)
+                errors[source] = None
+            except Exception as e:
+                logger.error(f"[{source}] Mirror sync failed: {e}")
+                errors[source] = str(e)
+        return errors
+
+    def add(self, source: str, accounts: Iterable[Dict]):
+        """Write-through for accounts the agent just created, connected or assigned"""
+        now = time.time()
+        rows = [row for row in map(_row, accounts) if row]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = sum(self._conn.execute(
+                    """INSERT OR IGNORE INTO mirrored_accounts (source, email, domain, status, data, first_seen)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (source, *row, now)
+                ).rowcount for row in rows)
+                # The provider's next full list will differ from the last digest, so it is re-applied
+                self._conn.execute(
+                    """INSERT INTO mirror_sources (source, digest, revision, changed_at) VALUES (?, NULL, ?, ?)
+                       ON CONFLICT(source) DO UPDATE SET digest = NULL,
+                           revision = mirror_sources.revision + excluded.revision,
+                           changed_at = CASE WHEN excluded.revision THEN excluded.changed_at
+                                             ELSE mirror_sources.changed_at END""",
+                    (source, int(inserted > 0), now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def emails(self, source: str) -> List[str]:
+        with self._lock:
+            return [email for (email,) in self._conn.execute(
+                "SELECT email FROM mirrored_accounts WHERE source = ? ORDER BY first_seen, email", (source,))]
+
+    def records(self, source: str) -> List[Dict]:
+        """Every mirrored account of a source with the provider's record and when it was first seen"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT email, domain, status, data, first_seen FROM mirrored_accounts WHERE source = ?", (source,)
+            ).fetchall()
+        return [{"email": email, "domain": domain, "status": status, "data": json.loads(data) if data else {},
+                 "first_seen": first_seen} for email, domain, status, data, first_seen in rows]
+
+    def count(self, source: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM mirrored_accounts WHERE source = ?", (source,)
+            ).fetchone()[0]
+
+    def accounts(self, source: str, domain: Optional[str] = None, status: Optional[str] = None,
+                 offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Mirrored accounts of a source, oldest first, optionally filtered and paged"""
+        sql = "SELECT email, domain, status FROM mirrored_accounts WHERE source = ?"
+        params: List = [source]
+        if domain:
+            sql += " AND domain = ?"
+            params.append(domain.lower())
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(str(status))
+        sql += " ORDER BY first_seen, email LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        with self._lock:
+            return [{"email": email, "domain": domain, "status": status}
+                    for email, domain, status in self._conn.execute(sql, params)]
+
+    def count_by_domain(self, source: str, status: Optional[str] = None) -> Dict[str, int]:
+        sql = "SELECT domain, COUNT(*) FROM mirrored_accounts WHERE source = ?"
+        params: List = [source]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(str(status))
+        with self._lock:
+            return dict(self._conn.execute(sql + " GROUP BY domain ORDER BY domain", params).fetchall())
+
+    def revision(self, source: str) -> int:
+        with self._lock:
+            return self._source_state(source)["revision"]
+
+    def synced_at(self, source: str) -> Optional[float]:
+        with self._lock:
+            return self._source_state(source)["synced_at"]
+
+    def first_synced_at(self, source: str) -> Optional[float]:
+        """When the source was first fetched from the provider (accounts seen by then already existed)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT first_synced_at FROM mirror_sources WHERE source = ?", (source,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        stats = {"syncs": self.syncs, "not_modified": self.not_modified, "unchanged": self.unchanged, "sources": {}}
+        for source in SOURCES:
+            with self._lock:
+                state = self._source_state(source)
+            stats["sources"][source] = {
+                "accounts": self.count(source),
+                "revision": state["revision"],
+                "age_seconds": round(now - state["synced_at"], 1) if state["synced_at"] else None,
+            }
+        return stats
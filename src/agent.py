@@ -5,6 +5,7 @@ Uses realistic people names for better deliverability
 Author: Mikee Shattuck
 """
 
+import argparse
 import requests
 import json
 import time
@@ -12,9 +13,37 @@ import logging
 import random
 import string
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 import sys
 import os
+import runpy
+import signal
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from account_mirror import (AccountMirror, CAMPAIGN, INFRAMAIL, INSTANTLY,
+                            campaign_fetcher, inframail_fetcher, instantly_accounts_fetcher)
+from apollo_credit_safe import APOLLO_BULK_MATCH_URL, BULK_MATCH_SIZE, CreditSafeApolloManager
+from circuit_breaker import (CLOSED, STATE_VALUES, CircuitOpenError, configure_breaker, get_all_breaker_stats,
+                             get_state as circuit_state, is_open as circuit_open)
+from capacity import CapacityModel, campaign_account_dates
+from deferred_work import DeferredQueue, LEAD_PUSH
+from email_validation import MISSING, VALID, EmailValidator
+from enrichment_cache import EnrichmentCache
+from http_transport import HttpTransport, configure_transport, get_transport
+from lead_dedup import LeadDedupIndex
+from leases import LeaseStore
+from metrics import endpoint_label, registry as metrics
+from name_allocator import NameAllocator
+from provisioning import ProvisioningEngine
+from run_journal import RunJournal, ACCOUNT_CREATED, ACCOUNT_CONNECTED, ACCOUNT_ASSIGNED, LEAD_PUSHED
+from rate_limiter import configure_limiter, get_all_limiter_stats, set_cluster_workers
+from scheduler import Scheduler
+from lead_pipeline import LeadPipeline
+from logging_setup import configure_logging
+from search_cursor import SearchCursorStore, iter_search_pages, query_fingerprint, walk_search_pages
 
 # ============================================================================
 # CONFIGURATION
@@ -33,11 +62,14 @@ INFRAMAIL_HOST_ORDER_ID = "YOUR_HOST_ORDER_ID_HERE"
 # Campaign Settings
 INSTANTLY_CAMPAIGN_ID = "YOUR_CAMPAIGN_ID_HERE"
 TARGET_LOCATION = "United States"
+ORGANIZATION_EMPLOYEE_RANGES = ["11,20", "21,50", "51,100"]  # Company sizes searched in Apollo
 
 # Safe Ramp Schedule
 EMAILS_PER_ACCOUNT_PER_DAY = 20
 ACCOUNTS_TO_CREATE_PER_DAY = 20
 TARGET_TOTAL_ACCOUNTS = 100
+WARMUP_DAYS = 14            # New accounts only warm up (no campaign emails) for this many days
+SENDING_RAMP_DAYS = 7       # After warmup, campaign emails grow to EMAILS_PER_ACCOUNT_PER_DAY over this many days
 
 # Your existing domains
 EXISTING_DOMAINS = [
@@ -46,6 +78,97 @@ EXISTING_DOMAINS = [
     "yourdomain3.com"
 ]
 
+# Local state (search cursors and other on-disk stores)
+DATA_DIR = "/opt/lead_agent/data"
+
+# Cross-run lead dedup (leads already pushed are never enriched or pushed again)
+LEAD_DEDUP_CAPACITY = 5000000  # Expected number of known leads (sizes the in-memory filter)
+
+# Metrics (request counts, latencies, stage timings) are written to DATA_DIR/metrics.json
+# and served by the dashboard at /metrics
+METRICS_EXPORT_INTERVAL = 15  # Seconds between snapshots
+
+# HTTP connection pooling (shared by all managers)
+HTTP_TIMEOUT = 30          # Seconds before any API call is abandoned
+HTTP_POOL_MAXSIZE = 10     # Keep-alive connections kept open per host
+
+# Per-provider rate limits: starting requests/sec and burst size.
+# Each limiter slows down on 429s (honoring Retry-After) and speeds back up while calls succeed.
+RATE_LIMITS = {
+    "apollo": {"rate": 2.0, "burst": 5},
+    "instantly": {"rate": 5.0, "burst": 10},
+    "inframail": {"rate": 1.0, "burst": 2},
+}
+
+# Per-endpoint circuit breakers: after failure_threshold failures in a row (timeouts, 5xx) calls to
+# that endpoint fail at once; after probe_interval seconds one probe call tests it again.
+# While Apollo or Instantly is down the import stops and leaves the rest of the day for a later run.
+CIRCUIT_BREAKERS = {
+    "apollo": {"failure_threshold": 5, "probe_interval": 60},
+    "instantly": {"failure_threshold": 5, "probe_interval": 60},
+    "inframail": {"failure_threshold": 3, "probe_interval": 120},
+}
+DEFERRED_MAX_ATTEMPTS = 5       # Failed pushes before a lead parked in DATA_DIR/deferred_work.db is given up
+
+# Concurrent lead import (opt-in)
+CONCURRENT_IMPORT = False       # Enrich and push leads in parallel
+IMPORT_WORKERS = 8              # Leads processed at the same time
+APOLLO_MAX_CONCURRENCY = 4      # Parallel Apollo enrichment calls
+INSTANTLY_MAX_CONCURRENCY = 4   # Parallel Instantly calls (lead pushes, account connects)
+
+# Bulk enrichment (opt-in): hidden emails are revealed through Apollo's people/bulk_match
+# and cached in DATA_DIR/enrichment_cache.db
+BULK_ENRICHMENT = False
+ENRICH_BATCH_SIZE = BULK_MATCH_SIZE  # Contacts per request (Apollo allows up to 10)
+
+# Offline email validation: each search page is screened (syntax, disposable domains,
+# role accounts) before any enrichment credit is spent or any lead is pushed
+EMAIL_REJECT_ROLE_ACCOUNTS = True   # Skip info@, sales@, ... addresses
+EMAIL_REJECT_FREE_MAIL = False      # Skip gmail.com, outlook.com, ... addresses
+
+# Streaming lead import (opt-in): search, enrichment and pushes overlap as one pipeline
+# with bounded queues between stages, so memory stays flat however many leads are imported
+STREAMING_IMPORT = False
+PIPELINE_QUEUE_SIZE = 200       # Leads buffered between two stages at most
+
+# Parallel account provisioning
+INFRAMAIL_MAX_CONCURRENCY = 3   # Parallel Inframail account creates
+PROVISION_MAX_PER_DOMAIN = 2    # Accounts in flight per domain at once
+
+# Bulk lead upload (opt-in): leads are sent to Instantly in chunks instead of one per request
+BULK_LEAD_UPLOAD = False
+LEAD_UPLOAD_CHUNK_SIZE = 100    # Leads per request
+LEAD_UPLOAD_MAX_WAIT = 10       # Seconds a buffered lead may wait before a flush
+BULK_UPLOAD_SPLITS = 3          # Times a chunk Instantly rejects (400/422) is halved to isolate bad leads
+
+# Campaign assignment: new accounts are merged into the campaign once per run
+CAMPAIGN_ASSIGN_CHUNK_SIZE = 500  # New accounts per PATCH
+CAMPAIGN_ASSIGN_ATTEMPTS = 3      # Re-merge attempts if verification finds lost updates
+
+# Multiple workers (opt-in): run several agents (processes or machines) on one shared DATA_DIR.
+# Workers lease domains, search shards (one per employee range) and batches of the day's leads
+# in DATA_DIR/leases.db, and split RATE_LIMITS evenly between the live workers.
+WORKER_SHARDING = False
+WORKER_ID = None                # Defaults to <hostname>-<pid>
+LEASE_TTL = 120                 # Seconds before a silent worker's leases expire
+LEAD_BATCH_SIZE = 100           # Leads per leased batch of the day's target
+
+# Daemon mode (agent.py --daemon): one long-running process runs each phase on its own cadence.
+# Once the day's work is done the phases make no API calls until the next day.
+# SIGHUP reloads CONFIG_FILE; SIGTERM lets in-flight work finish, then exits.
+PROVISION_INTERVAL = 3600       # Seconds between account provisioning passes
+IMPORT_INTERVAL = 900           # Seconds between lead import passes
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "config.py")
+
+# Logging: records are queued and written by a background thread, so API calls never wait on disk.
+# One file per day (agent_YYYYMMDD.log in LOG_DIR, tailed by the dashboard), rotated by size too.
+LOG_DIR = "/opt/lead_agent/logs"
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"             # "text", or "json" for one JSON object per line
+LOG_MAX_BYTES = 50 * 1024 * 1024  # A day's file is rotated to .1, .2, ... past this size
+LOG_BACKUP_COUNT = 5            # Rotated files kept per day
+LOG_RETENTION_DAYS = 14         # Older daily logs are deleted
+
 # Realistic name lists for email accounts
 FIRST_NAMES = [
     "sarah", "michael", "jennifer", "david", "jessica", "james", "emily", "robert",
@@ -62,9 +185,13 @@ LAST_NAMES = [
     "taylor", "moore", "jackson", "martin", "lee", "thompson", "white", "harris",
     "clark", "lewis", "robinson", "walker", "hall", "allen", "young", "king",
     "wright", "scott", "torres", "nguyen", "hill", "flores", "green", "adams",
-    "nelson", "baker", "hall", "rivera", "campbell", "mitchell", "carter", "roberts"
+    "nelson", "baker", "rivera", "campbell", "mitchell", "carter", "roberts"
 ]
 
+# Mailbox name patterns, in order of preference (used once the previous one is full)
+# "first.last" = sarah.smith@, "firstl" = sarahs@, "f.last" = s.smith@
+NAME_PATTERNS = ["first.last", "firstl", "f.last"]
+
 # API Endpoints
 APOLLO_SEARCH_URL = "https://api.apollo.io/api/v1/mixed_people/search"
 APOLLO_ENRICH_URL = "https://api.apollo.io/api/v1/people/match"
@@ -73,15 +200,9 @@ INSTANTLY_ACCOUNTS_URL = "https://api.instantly.ai/api/v2/accounts"
 INSTANTLY_CAMPAIGN_URL = f"https://api.instantly.ai/api/v2/campaigns/{INSTANTLY_CAMPAIGN_ID}"
 INFRAMAIL_EMAIL_URL = "https://app.inframail.io/api/v1/host/operations/email"
 
-# Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'/root/lead_agent/logs/agent_{datetime.now().strftime("%Y%m%d")}.log'),
-        logging.StreamHandler()
-    ]
-)
+# Bulk lead uploads answered with these are split to find the leads Instantly refuses
+BULK_REJECTED_STATUSES = (400, 422)
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -91,19 +212,30 @@ logger = logging.getLogger(__name__)
 class InframailManager:
     """Manages email account creation via Inframail API"""
     
-    def __init__(self, api_key: str, customer_id: str, profile_id: str, host_order_id: str):
+    def __init__(self, api_key: str, customer_id: str, profile_id: str, host_order_id: str,
+                 transport: Optional[HttpTransport] = None):
         self.api_key = api_key
+        self.http = transport or get_transport()
         self.customer_id = customer_id
         self.profile_id = profile_id
         self.host_order_id = host_order_id
         self.headers = {"x-api-key": api_key, "Content-Type": "application/json"}
     
+    @property
+    def accounts_url(self) -> str:
+        return f"{INFRAMAIL_EMAIL_URL}?hostOrderId={self.host_order_id}&customerId={self.customer_id}&profileId={self.profile_id}"
+    
+    def fetch_accounts(self, validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        """Conditional fetch of every mailbox, for the account mirror"""
+        return inframail_fetcher(self.http, self.accounts_url, self.headers, provider="inframail")(validators)
+    
     def get_email_accounts(self) -> List[str]:
         """Get all existing email accounts"""
         try:
-            response = requests.get(
-                f"{INFRAMAIL_EMAIL_URL}?hostOrderId={self.host_order_id}&customerId={self.customer_id}&profileId={self.profile_id}",
-                headers=self.headers
+            response = self.http.get(
+                self.accounts_url,
+                headers=self.headers,
+                provider="inframail"
             )
             if response.status_code == 200:
                 data = response.json()
@@ -123,17 +255,20 @@ class InframailManager:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 INFRAMAIL_EMAIL_URL,
                 headers=self.headers,
-                json=payload
+                json=payload,
+                provider="inframail"
             )
             
             if response.status_code == 200:
-                logger.info(f"   ✓ Created: {email}")
+                logger.info(f"   ✓ Created: {email}",
+                            extra={'provider': 'inframail', 'endpoint': endpoint_label(INFRAMAIL_EMAIL_URL)})
                 return True
             else:
-                logger.error(f"   ✗ Failed to create {email}: {response.status_code}")
+                logger.error(f"   ✗ Failed to create {email}: {response.status_code}",
+                             extra={'provider': 'inframail', 'endpoint': endpoint_label(INFRAMAIL_EMAIL_URL)})
                 logger.error(f"      Response: {response.text}")
                 return False
         except Exception as e:
@@ -147,14 +282,15 @@ class InframailManager:
 class InstantlyManager:
     """Manages Instantly.ai operations"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, transport: Optional[HttpTransport] = None):
         self.api_key = api_key
+        self.http = transport or get_transport()
         self.headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     
     def get_accounts(self) -> List[str]:
         """Get all email accounts in Instantly"""
         try:
-            response = requests.get(INSTANTLY_ACCOUNTS_URL, headers=self.headers)
+            response = self.http.get(INSTANTLY_ACCOUNTS_URL, headers=self.headers, provider="instantly")
             if response.status_code == 200:
                 accounts = response.json()
                 return [acc['email'] for acc in accounts]
@@ -163,27 +299,41 @@ class InstantlyManager:
             logger.error(f"Instantly API error: {e}")
             return []
     
+    def fetch_accounts(self, validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        """Conditional, paginated fetch of every account, for the account mirror"""
+        return instantly_accounts_fetcher(self.http, INSTANTLY_ACCOUNTS_URL, self.headers, provider="instantly")(validators)
+    
+    def fetch_campaign_membership(self, validators: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        """Conditional fetch of the campaign's accounts, for the account mirror"""
+        return campaign_fetcher(self.http, INSTANTLY_CAMPAIGN_URL, self.headers, provider="instantly")(validators)
+    
     def get_campaign_accounts(self) -> List[str]:
         """Get email accounts assigned to campaign"""
+        return self._fetch_campaign_accounts() or []
+    
+    def _fetch_campaign_accounts(self) -> Optional[List[str]]:
+        """Get campaign accounts, or None if the campaign could not be read"""
         try:
-            response = requests.get(INSTANTLY_CAMPAIGN_URL, headers=self.headers)
+            response = self.http.get(INSTANTLY_CAMPAIGN_URL, headers=self.headers, provider="instantly")
             if response.status_code == 200:
                 campaign = response.json()
                 return campaign.get('email_list', [])
-            return []
+            logger.error(f"Failed to get campaign accounts: {response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"Failed to get campaign accounts: {e}")
-            return []
+            return None
     
     def assign_accounts_to_campaign(self, email_list: List[str]) -> bool:
         """Assign email accounts to campaign"""
         payload = {"email_list": email_list}
         
         try:
-            response = requests.patch(
+            response = self.http.patch(
                 INSTANTLY_CAMPAIGN_URL,
                 headers=self.headers,
-                json=payload
+                json=payload,
+                provider="instantly"
             )
             
             if response.status_code == 200:
@@ -196,6 +346,59 @@ class InstantlyManager:
             logger.error(f"Campaign assignment error: {e}")
             return False
     
+    def add_accounts_to_campaign(self, new_emails: List[str]) -> List[str]:
+        """
+        Merge new accounts into the campaign
+        Each PATCH (one per CAMPAIGN_ASSIGN_CHUNK_SIZE new accounts) is built from a
+        read made right before it, so accounts another writer added meanwhile are
+        kept. A final read verifies the whole list: our accounts and every account
+        that was already there. Anything missing (a lost update on either side) is
+        merged again, up to CAMPAIGN_ASSIGN_ATTEMPTS times.
+        Returns the new accounts confirmed in the campaign.
+        """
+        pending = list(dict.fromkeys(new_emails))
+        restore: List[str] = []  # Existing accounts a concurrent write dropped
+        confirmed = []
+        
+        for attempt in range(CAMPAIGN_ASSIGN_ATTEMPTS):
+            merge = pending + restore
+            if not merge:
+                break
+            
+            expected = set(merge)
+            readable = True
+            for start in range(0, len(merge), CAMPAIGN_ASSIGN_CHUNK_SIZE):
+                current = self._fetch_campaign_accounts()
+                if current is None:
+                    # Never PATCH blind - that would drop every existing account
+                    logger.error("   ✗ Campaign unreadable, skipping assignment")
+                    readable = False
+                    break
+                expected.update(current)
+                present = set(current)
+                missing = [e for e in merge[start:start + CAMPAIGN_ASSIGN_CHUNK_SIZE] if e not in present]
+                if missing and not self.assign_accounts_to_campaign(current + missing):
+                    break
+            if not readable:
+                break
+            
+            # Verify the writes landed and nothing that was there got lost
+            verified = self._fetch_campaign_accounts()
+            if verified is None:
+                break
+            verified = set(verified)
+            confirmed.extend(e for e in pending if e in verified)
+            pending = [e for e in pending if e not in verified]
+            restore = sorted(expected - verified - set(pending))
+            if pending or restore:
+                logger.warning(f"   {len(pending)} new and {len(restore)} existing accounts missing after assignment "
+                               f"(attempt {attempt + 1}/{CAMPAIGN_ASSIGN_ATTEMPTS}), merging again")
+        
+        if pending or restore:
+            logger.error(f"   ✗ {len(pending)} new and {len(restore)} existing accounts could not be "
+                         f"assigned to campaign")
+        return confirmed
+    
     def add_email_account(self, email: str, password: str, domain: str, first_name: str, last_name: str) -> bool:
         """Add email account to Instantly"""
         
@@ -219,17 +422,20 @@ class InstantlyManager:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 INSTANTLY_ACCOUNTS_URL,
                 headers=self.headers,
-                json=payload
+                json=payload,
+                provider="instantly"
             )
             
             if response.status_code in [200, 201]:
-                logger.info(f"      ✓ Added to Instantly")
+                logger.info(f"      ✓ Added to Instantly",
+                            extra={'provider': 'instantly', 'endpoint': endpoint_label(INSTANTLY_ACCOUNTS_URL)})
                 return True
             else:
-                logger.error(f"      ✗ Failed to add to Instantly: {response.status_code}")
+                logger.error(f"      ✗ Failed to add to Instantly: {response.status_code}",
+                             extra={'provider': 'instantly', 'endpoint': endpoint_label(INSTANTLY_ACCOUNTS_URL)})
                 logger.error(f"         Response: {response.text}")
                 return False
         except Exception as e:
@@ -247,10 +453,133 @@ class InstantlyManager:
         }
         
         try:
-            response = requests.post(INSTANTLY_LEADS_URL, json=payload)
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="push"):
+                response = self.http.post(INSTANTLY_LEADS_URL, json=payload, provider="instantly")
             return response.status_code == 200
         except:
             return False
+    
+    def add_leads_bulk(self, leads: List[Dict], retries: int = BULK_UPLOAD_SPLITS) -> Dict[str, bool]:
+        """
+        Add many leads in one request using the list-style "leads" payload
+        Returns {email: success}. Leads the response lists as failed are retried on
+        their own. If Instantly rejects the request's contents (400/422), the chunk
+        is split in half and each half retried, at most retries levels deep, so one
+        bad lead cannot sink the rest. Any other failure (auth, 5xx, network) fails
+        the whole chunk at once: splitting would only repeat it.
+        """
+        if not leads:
+            return {}
+        
+        payload = {
+            "api_key": self.api_key,
+            "campaign_id": INSTANTLY_CAMPAIGN_ID,
+            "leads": leads
+        }
+        
+        try:
+            response = self.http.post(INSTANTLY_LEADS_URL, json=payload, provider="instantly")
+            status = response.status_code
+            body = response.json() if status == 200 else {}
+        except CircuitOpenError as e:
+            logger.warning(f"Instantly bulk upload of {len(leads)} leads skipped: {e}")
+            return {lead['email']: False for lead in leads}
+        except Exception as e:
+            logger.error(f"Instantly bulk upload of {len(leads)} leads failed: {e}")
+            return {lead['email']: False for lead in leads}
+        
+        if status != 200:
+            if status in BULK_REJECTED_STATUSES and len(leads) > 1 and retries > 0:
+                middle = len(leads) // 2
+                metrics.inc("lead_agent_http_retries_total", provider="instantly", endpoint=endpoint_label(INSTANTLY_LEADS_URL))
+                results = self.add_leads_bulk(leads[:middle], retries - 1)
+                results.update(self.add_leads_bulk(leads[middle:], retries - 1))
+                return results
+            logger.error(f"   ✗ Bulk upload of {len(leads)} leads failed: {status}")
+            return {lead['email']: False for lead in leads}
+        
+        failed = self._failed_bulk_emails(body)
+        invalid = body.get("invalid_email_count") if isinstance(body, dict) else None
+        if isinstance(invalid, int) and invalid > 0:
+            logger.warning(f"Instantly rejected {invalid} of {len(leads)} uploaded leads as invalid")
+        results = {lead['email']: lead['email'].lower() not in failed for lead in leads}
+        retry = [lead for lead in leads if not results[lead['email']]]
+        if retry and retries > 0:
+            metrics.inc("lead_agent_http_retries_total", provider="instantly", endpoint=endpoint_label(INSTANTLY_LEADS_URL))
+            results.update(self.add_leads_bulk(retry, retries - 1))
+        return results
+    
+    @staticmethod
+    def _failed_bulk_emails(body: Any) -> set:
+        """
+        Collect the emails a bulk response lists as not added
+        Instantly's v1 response only has counts (leads_uploaded, invalid_email_count, ...);
+        those say how many were skipped but not which, so they are not retried.
+        """
+        failed = set()
+        if not isinstance(body, dict):
+            return failed
+        for key in ("failed_leads", "invalid_emails", "errors"):
+            items = body.get(key)
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                email = item.get('email') if isinstance(item, dict) else item
+                if isinstance(email, str):
+                    failed.add(email.lower())
+        return failed
+
+
+class LeadUploadBuffer:
+    """
+    Buffers leads and uploads them to Instantly in chunks
+    Flushes when chunk_size leads are waiting or the oldest has waited max_wait
+    seconds; importers call flush_if_due() between leads, so a partial chunk is
+    sent on time even while no new lead is added. on_result(lead, success) is
+    called once per lead.
+    """
+    
+    def __init__(self, instantly: InstantlyManager, on_result: Callable[[Dict, bool], None],
+                 chunk_size: int = 100, max_wait: float = 10.0):
+        self.instantly = instantly
+        self.on_result = on_result
+        self.chunk_size = chunk_size
+        self.max_wait = max_wait
+        self.requests_sent = 0
+        self._pending: List[Dict] = []
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, email: str, first_name: str, company: str, **context):
+        """Queue a lead; context is handed back to on_result"""
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.time()
+            self._pending.append({"email": email, "first_name": first_name, "company_name": company, **context})
+            due = len(self._pending) >= self.chunk_size or time.time() - self._oldest >= self.max_wait
+        if due:
+            self.flush()
+    
+    def flush_if_due(self):
+        """Upload the buffer if its oldest lead has waited max_wait seconds (call between leads)"""
+        with self._lock:
+            due = bool(self._pending) and time.time() - self._oldest >= self.max_wait
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """Upload everything buffered so far"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        
+        for start in range(0, len(batch), self.chunk_size):
+            chunk = batch[start:start + self.chunk_size]
+            leads = [{k: lead[k] for k in ("email", "first_name", "company_name")} for lead in chunk]
+            self.requests_sent += 1
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="push"):
+                results = self.instantly.add_leads_bulk(leads)
+            for lead in chunk:
+                self.on_result(lead, results.get(lead['email'], False))
 
 # ============================================================================
 # APOLLO MANAGER
@@ -259,30 +588,87 @@ class InstantlyManager:
 class ApolloManager:
     """Manages Apollo.io lead generation"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, transport: Optional[HttpTransport] = None,
+                 cursor_store: Optional[SearchCursorStore] = None,
+                 employee_ranges: Optional[List[str]] = None):
         self.api_key = api_key
+        self.http = transport or get_transport()
+        self.cursor_store = cursor_store
+        self.employee_ranges = list(employee_ranges or ORGANIZATION_EMPLOYEE_RANGES)
         self.headers = {"Content-Type": "application/json", "Cache-Control": "no-cache"}
     
-    def search_business_owners(self, limit: int = 100) -> List[Dict]:
-        """Search for business owners"""
-        payload = {
+    def _search_payload(self, page: int, per_page: int) -> Dict:
+        return {
             "api_key": self.api_key,
             "person_titles": ["Owner", "Founder", "Co-Founder", "Managing Partner"],
             "person_locations": [TARGET_LOCATION],
-            "organization_num_employees_ranges": ["11,20", "21,50", "51,100"],
-            "page": 1,
-            "per_page": min(limit, 100)
+            "organization_num_employees_ranges": self.employee_ranges,
+            "page": page,
+            "per_page": per_page
         }
-        
+    
+    def shard(self, employee_range: str) -> "ApolloManager":
+        """The same search restricted to one employee range (its own query and cursor)"""
+        return ApolloManager(self.api_key, transport=self.http, cursor_store=self.cursor_store,
+                             employee_ranges=[employee_range])
+    
+    def is_exhausted(self, per_page: int = 100) -> bool:
+        """True once a previous run paged through every result of this search"""
+        if not self.cursor_store:
+            return False
+        return self.cursor_store.get(query_fingerprint(self._search_payload(1, per_page)))["exhausted"]
+    
+    def _search_page(self, page: int, per_page: int) -> Optional[Dict]:
+        """Fetch one raw search page, or None if the call failed"""
+        payload = self._search_payload(page, per_page)
         try:
-            response = requests.post(APOLLO_SEARCH_URL, headers=self.headers, json=payload)
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="search"):
+                response = self.http.post(APOLLO_SEARCH_URL, headers=self.headers, json=payload, provider="apollo")
             if response.status_code == 200:
-                data = response.json()
-                return data.get('people', [])
-            return []
+                return response.json()
+            logger.error(f"Apollo search failed: {response.status_code}")
+            return None
         except Exception as e:
             logger.error(f"Apollo search error: {e}")
-            return []
+            return None
+    
+    def search_business_owners(self, limit: int = 100, page: int = 1) -> List[Dict]:
+        """Search for business owners (a single page)"""
+        data = self._search_page(page, min(limit, 100))
+        return data.get('people', []) if data else []
+    
+    def iter_business_owner_pages(self, per_page: int = 100, max_pages: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Lazily walk search pages, resuming where the last run stopped
+        Stops when the query is exhausted or a page fails to load
+        """
+        fingerprint = query_fingerprint(self._search_payload(1, per_page))
+        
+        def fetch(page: int) -> Optional[Dict]:
+            logger.info(f"\nSearching business owners (page {page})...")
+            return self._search_page(page, per_page)
+        
+        return iter_search_pages(fetch, fingerprint, per_page, self.cursor_store, max_pages)
+    
+    def walk_business_owner_pages(self, per_page: int = 100,
+                                  max_pages: Optional[int] = None) -> Tuple[str, Iterator[Dict]]:
+        """
+        Like iter_business_owner_pages, but leaves the search cursor to the caller
+        Returns the query fingerprint and a generator of page records
+        (see search_cursor.walk_search_pages).
+        """
+        fingerprint = query_fingerprint(self._search_payload(1, per_page))
+        
+        def fetch(page: int) -> Optional[Dict]:
+            logger.info(f"\nSearching business owners (page {page})...")
+            return self._search_page(page, per_page)
+        
+        return fingerprint, walk_search_pages(fetch, fingerprint, per_page, self.cursor_store, max_pages)
+    
+    def iter_business_owners(self, per_page: int = 100, max_pages: Optional[int] = None) -> Iterator[Dict]:
+        """Lazily yield business owners one at a time across pages"""
+        for people in self.iter_business_owner_pages(per_page, max_pages):
+            yield from people
     
     def enrich_person(self, first_name: str, last_name: str, company: str) -> Optional[str]:
         """Enrich person data to get email"""
@@ -295,7 +681,8 @@ class ApolloManager:
         }
         
         try:
-            response = requests.post(APOLLO_ENRICH_URL, headers=self.headers, json=payload)
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="enrich"):
+                response = self.http.post(APOLLO_ENRICH_URL, headers=self.headers, json=payload, provider="apollo")
             if response.status_code == 200:
                 data = response.json()
                 person = data.get('person', {})
@@ -311,176 +698,1122 @@ class ApolloManager:
 class AutonomousLeadAgent:
     """Main autonomous agent that orchestrates everything"""
     
-    def __init__(self):
+    def __init__(self, worker_id: Optional[str] = None):
+        # Shared per-provider rate limiters replace fixed sleeps between calls
+        for provider, limits in RATE_LIMITS.items():
+            configure_limiter(provider, limits['rate'], limits['burst'])
+        for provider, settings in CIRCUIT_BREAKERS.items():
+            configure_breaker(provider, **settings)
+        
+        # One pooled transport shared by every manager in this process
+        self.transport = configure_transport(
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            timeout=HTTP_TIMEOUT
+        )
         self.inframail = InframailManager(
             INFRAMAIL_API_KEY,
             INFRAMAIL_CUSTOMER_ID,
             INFRAMAIL_PROFILE_ID,
-            INFRAMAIL_HOST_ORDER_ID
+            INFRAMAIL_HOST_ORDER_ID,
+            transport=self.transport
+        )
+        self.instantly = InstantlyManager(INSTANTLY_API_KEY, transport=self.transport)
+        self.search_cursors = SearchCursorStore(os.path.join(DATA_DIR, "search_cursors.db"))
+        self.apollo = ApolloManager(APOLLO_API_KEY, transport=self.transport, cursor_store=self.search_cursors)
+        self.validator = EmailValidator(
+            reject_role_accounts=EMAIL_REJECT_ROLE_ACCOUNTS,
+            reject_free_mail=EMAIL_REJECT_FREE_MAIL
+        )
+        self.enricher = CreditSafeApolloManager(
+            APOLLO_API_KEY,
+            transport=self.transport,
+            cache=EnrichmentCache(os.path.join(DATA_DIR, "enrichment_cache.db")),
+            validator=self.validator
         )
-        self.instantly = InstantlyManager(INSTANTLY_API_KEY)
-        self.apollo = ApolloManager(APOLLO_API_KEY)
+        self.journal = RunJournal(os.path.join(DATA_DIR, "run_journal.db"))
+        # Today's lead target is what the campaign accounts can really send, given their warmup
+        self.capacity = CapacityModel(
+            EMAILS_PER_ACCOUNT_PER_DAY,
+            warmup_days=WARMUP_DAYS,
+            ramp_days=SENDING_RAMP_DAYS,
+            accounts_per_day=ACCOUNTS_TO_CREATE_PER_DAY,
+            target_accounts=TARGET_TOTAL_ACCOUNTS
+        )
+        # Local copy of the account lists, shared with the dashboard
+        self.accounts = AccountMirror(os.path.join(DATA_DIR, "account_mirror.db"), fetchers={
+            INFRAMAIL: self.inframail.fetch_accounts,
+            INSTANTLY: self.instantly.fetch_accounts,
+            CAMPAIGN: self.instantly.fetch_campaign_membership,
+        })
+        self.dedup = LeadDedupIndex(os.path.join(DATA_DIR, "lead_dedup.db"), capacity=LEAD_DEDUP_CAPACITY,
+                                    shared=WORKER_SHARDING)
+        # Enriched leads Instantly could not take while its circuit was open
+        self.deferred = DeferredQueue(os.path.join(DATA_DIR, "deferred_work.db"))
+        
+        # Workers sharing DATA_DIR split the day's work through leases
+        self.leases = None
+        self.lead_batches: Dict[int, int] = {}  # Leased batches of today's leads -> leads left in each
+        if WORKER_SHARDING:
+            self.leases = LeaseStore(os.path.join(DATA_DIR, "leases.db"), worker_id or WORKER_ID, ttl=LEASE_TTL)
+            set_cluster_workers(self.leases.live_workers())
+            self.leases.start_heartbeat(on_workers_changed=set_cluster_workers)
+            logger.info(f"Worker {self.leases.worker_id} joined ({self.leases.live_workers()} live)")
         
         self.stats = {
             'accounts_created': 0,
             'accounts_connected': 0,
+            'accounts_assigned': 0,
             'leads_imported': 0,
+            'duplicates_skipped': 0,
+            'emails_rejected': 0,
             'leads_to_import_today': 0
         }
+        self._stats_lock = threading.Lock()
+        # Set on shutdown: in-flight work finishes, nothing new is started
+        self._draining = threading.Event()
+        
+        self.metrics_path = os.path.join(DATA_DIR, "metrics.json")
+        metrics.register_collector(self._collect_metrics)
+        metrics.start_exporter(self.metrics_path, METRICS_EXPORT_INTERVAL)
+    
+    def _collect_metrics(self, registry):
+        """Refresh run and rate-limiter gauges before each metrics snapshot"""
+        for key, value in list(self.stats.items()):
+            registry.set_gauge(f"lead_agent_run_{key}", value)
+        for provider, limiter in get_all_limiter_stats().items():
+            registry.set_gauge("lead_agent_rate_limit_requests_per_second", limiter['rate'], provider=provider)
+            registry.set_gauge("lead_agent_rate_limit_throttled", limiter['throttled'], provider=provider)
+            registry.set_gauge("lead_agent_rate_limit_seconds_waited", limiter['seconds_waited'], provider=provider)
+        for breaker in get_all_breaker_stats():
+            labels = {'provider': breaker['provider'], 'endpoint': breaker['endpoint']}
+            registry.set_gauge("lead_agent_circuit_state", STATE_VALUES[breaker['state']], **labels)
+            registry.set_gauge("lead_agent_circuit_retry_seconds", breaker['retry_in'], **labels)
+            registry.set_gauge("lead_agent_circuit_rejected", breaker['rejected'], **labels)
+        for kind, count in self.deferred.get_stats().items():
+            registry.set_gauge("lead_agent_deferred_work", count, kind=kind)
+    
+    @contextmanager
+    def _exclusive(self, resource: str):
+        """Run a with-block on one worker at a time (a no-op without WORKER_SHARDING)"""
+        if self.leases is None:
+            yield
+            return
+        with self.leases.hold(resource):
+            yield
+    
+    def _record_lead_pushed(self, email: str):
+        """Journal a pushed lead, counted against the first leased batch with room left"""
+        batch = None
+        with self._stats_lock:
+            for candidate, left in self.lead_batches.items():
+                if left > 0:
+                    self.lead_batches[candidate] -= 1
+                    batch = candidate
+                    break
+        self.journal.record(LEAD_PUSHED, email, {'batch': batch} if batch is not None else None)
+        logger.debug(f"Lead pushed: {email}", extra={'lead_id': email, 'provider': 'instantly'})
+    
+    def _import_paused(self) -> bool:
+        """
+        True while the import has to stop: the agent is draining for shutdown, or a
+        circuit the import depends on (search, enrichment, lead push) is open
+        """
+        if self._draining.is_set():
+            return True
+        enrich_url = APOLLO_BULK_MATCH_URL if BULK_ENRICHMENT else APOLLO_ENRICH_URL
+        return (circuit_open("apollo", APOLLO_SEARCH_URL) or circuit_open("apollo", enrich_url)
+                or circuit_open("instantly", INSTANTLY_LEADS_URL))
+    
+    def _lead_push_failed(self, email: str, person: Dict):
+        """Release a lead whose push failed, or park it for a later run while Instantly is down"""
+        logger.debug(f"Lead push failed: {email}", extra={'lead_id': email, 'provider': 'instantly'})
+        if circuit_state("instantly", INSTANTLY_LEADS_URL) == CLOSED:
+            self.dedup.release(email, person)
+            return
+        # Its email is already paid for: keep the dedup claim and push it once Instantly is back
+        self.deferred.defer(LEAD_PUSH, email, {
+            'first_name': person.get('first_name', ''),
+            'company_name': person.get('organization_name', ''),
+            'person': {k: person[k] for k in ('id', 'first_name', 'last_name', 'organization_name') if person.get(k)}
+        })
+    
+    def _push_deferred_leads(self, limit: int) -> int:
+        """
+        Push up to limit leads parked while Instantly was down; returns leads pushed
+        Parked leads are leased, and only deleted once pushed. A lead that fails
+        again stays parked, until DEFERRED_MAX_ATTEMPTS pushes have failed.
+        """
+        if limit <= 0 or circuit_open("instantly", INSTANTLY_LEADS_URL):
+            return 0
+        parked = self.deferred.lease(LEAD_PUSH, limit)
+        if not parked:
+            return 0
+        logger.info(f"Pushing {len(parked)} leads deferred while Instantly was unavailable")
+        
+        leads = [{'email': email, 'first_name': data['first_name'], 'company_name': data['company_name']}
+                 for email, data, _ in parked]
+        if BULK_LEAD_UPLOAD:
+            results = {}
+            for start in range(0, len(leads), LEAD_UPLOAD_CHUNK_SIZE):
+                with metrics.timer("lead_agent_stage_duration_seconds", stage="push"):
+                    results.update(self.instantly.add_leads_bulk(leads[start:start + LEAD_UPLOAD_CHUNK_SIZE]))
+        else:
+            results = {lead['email']: self.instantly.add_lead(lead['email'], lead['first_name'], lead['company_name'])
+                       for lead in leads}
+        
+        pushed = []
+        dropped = []
+        for email, data, attempts in parked:
+            if results.get(email):
+                pushed.append(email)
+                self._record_lead_pushed(email)
+                with self._stats_lock:
+                    self.stats['leads_imported'] += 1
+            elif attempts >= DEFERRED_MAX_ATTEMPTS:
+                dropped.append(email)
+                self.dedup.release(email, data['person'])
+            else:
+                self.deferred.defer(LEAD_PUSH, email, data)
+        self.deferred.complete(LEAD_PUSH, pushed + dropped)
+        if dropped:
+            logger.warning(f"Gave up on {len(dropped)} deferred leads after {DEFERRED_MAX_ATTEMPTS} failed pushes")
+        return len(pushed)
     
     def generate_password(self) -> str:
         """Generate secure random password"""
         chars = string.ascii_letters + string.digits + "!@#$%"
         return ''.join(random.choices(chars, k=16))
     
-    def create_email_accounts(self, num_accounts: int) -> int:
-        """Create email accounts with realistic people names"""
+    def create_email_accounts(self, num_accounts: int, existing_accounts: Optional[List[str]] = None) -> int:
+        """
+        Create email accounts with realistic people names
+        Every step is journaled, so after a restart accounts already created
+        today are connected/assigned instead of being created again
+        """
         logger.info(f"\n{'='*60}")
         logger.info(f"CREATING {num_accounts} EMAIL ACCOUNTS")
         logger.info(f"{'='*60}\n")
         
-        accounts_per_domain = num_accounts // len(EXISTING_DOMAINS)
-        remaining = num_accounts % len(EXISTING_DOMAINS)
+        if existing_accounts is None:
+            self.accounts.sync_all()
+            existing_accounts = self.accounts.emails(INFRAMAIL)
+        
+        if self.leases is None:
+            created_count = self._provision_accounts(num_accounts, existing_accounts, list(EXISTING_DOMAINS))
+        else:
+            created_count = self._provision_accounts_sharded(num_accounts, existing_accounts)
+        
+        # Add all connected, not-yet-assigned accounts to the campaign in one batched, verified update
+        with self._exclusive("campaign"):
+            connected_emails = [email for email in self.journal.entries(ACCOUNT_CONNECTED)
+                                if not self.journal.is_done(ACCOUNT_ASSIGNED, email)]
+            if connected_emails:
+                logger.info(f"\nAssigning {len(connected_emails)} new accounts to campaign")
+                assigned = self.instantly.add_accounts_to_campaign(connected_emails)
+                for email in assigned:
+                    self.journal.record(ACCOUNT_ASSIGNED, email)
+                self.accounts.add(CAMPAIGN, [{'email': email} for email in assigned])
+                self.stats['accounts_assigned'] += len(assigned)
+        
+        return created_count
+    
+    def _provision_accounts_sharded(self, num_accounts: int, existing_accounts: List[str]) -> int:
+        """
+        Provision this worker's share of today's accounts
+        The day's accounts are spread round-robin over EXISTING_DOMAINS up front,
+        so every worker agrees on each domain's quota. Each round leases a fair
+        share of the domains that still have work, so mailbox names on a domain
+        are only ever allocated by one worker at a time.
+        """
+        if not EXISTING_DOMAINS:
+            return 0
+        quotas = Counter(EXISTING_DOMAINS[i % len(EXISTING_DOMAINS)] for i in range(num_accounts))
+        attempted = set()
+        connected = 0
+        
+        while True:
+            created_today = self.journal.entries(ACCOUNT_CREATED)
+            created_on = Counter(account['domain'] for account in created_today.values() if account)
+            unconnected_on = {account['domain'] for email, account in created_today.items()
+                              if account and not self.journal.is_done(ACCOUNT_CONNECTED, email)}
+            pending = [domain for domain in EXISTING_DOMAINS if domain not in attempted
+                       and (created_on[domain] < quotas[domain] or domain in unconnected_on)]
+            share = -(-len(pending) // self.leases.live_workers())
+            
+            leased = []
+            for domain in pending:
+                if len(leased) >= share:
+                    break
+                if self.leases.acquire(f"domain:{domain}"):
+                    leased.append(domain)
+                    attempted.add(domain)
+            if not leased:
+                # Every domain with work left is done or leased by another worker
+                return connected
+            
+            logger.info(f"[{self.leases.worker_id}] Provisioning domains {', '.join(leased)}")
+            try:
+                connected += self._provision_accounts(num_accounts, existing_accounts, leased, quotas)
+            finally:
+                for domain in leased:
+                    self.leases.release(f"domain:{domain}")
+    
+    def _provision_accounts(self, num_accounts: int, existing_accounts: List[str], domains: List[str],
+                            quotas: Optional[Dict[str, int]] = None) -> int:
+        """
+        Create and connect accounts round-robin over domains; returns accounts connected
+        Without quotas, num_accounts is today's total. With quotas ({domain: accounts}),
+        only the given domains are worked on, each up to its own quota.
+        """
+        created_today = self.journal.entries(ACCOUNT_CREATED)
+        
+        # Names are drawn from the free name space, excluding mailboxes that already exist
+        names = NameAllocator(FIRST_NAMES, LAST_NAMES, list(existing_accounts) + list(created_today), NAME_PATTERNS)
+        
+        remaining = None
+        if quotas is not None:
+            created_today = {email: account for email, account in created_today.items()
+                             if account and account['domain'] in domains}
+            created_on = Counter(account['domain'] for account in created_today.values())
+            remaining = {domain: max(0, quotas[domain] - created_on[domain]) for domain in domains}
+            domains = [domain for domain in domains if remaining[domain]]
+            to_create = sum(remaining.values())
+        else:
+            to_create = max(0, num_accounts - len(created_today))
+        
+        # Resume: accounts created before a restart but never connected skip straight to Instantly
+        unconnected = [{'email': email, **account} for email, account in created_today.items()
+                       if not self.journal.is_done(ACCOUNT_CONNECTED, email)]
         
-        used_names = set()
-        created_count = 0
+        if len(created_today):
+            logger.info(f"{len(created_today)} accounts already created today, {to_create} left")
         
-        for i, domain in enumerate(EXISTING_DOMAINS):
-            count = accounts_per_domain + (1 if i < remaining else 0)
-            if count == 0:
+        # Spread accounts round-robin over the domains that still have free names
+        new_accounts = []
+        domains = list(domains)
+        i = 0
+        while len(new_accounts) < to_create and domains:
+            domain = domains[i % len(domains)]
+            name = names.allocate(domain)
+            if name is None:
+                logger.warning(f"[{domain}] No free mailbox names left for patterns {NAME_PATTERNS}")
+                domains.remove(domain)
                 continue
+            i += 1
             
-            logger.info(f"\n[{domain}] Creating {count} accounts")
+            new_accounts.append({
+                'email': name['email'],
+                'password': self.generate_password(),
+                'domain': domain,
+                'first_name': name['first'].capitalize(),
+                'last_name': name['last'].capitalize()
+            })
+            if remaining is not None:
+                remaining[domain] -= 1
+                if not remaining[domain]:
+                    domains.remove(domain)
+        
+        if len(new_accounts) < to_create:
+            logger.warning(f"Name space exhausted: only {len(new_accounts)} of {to_create} accounts can be created")
+        
+        def create(account: Dict) -> bool:
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="provision_create"):
+                ok = self.inframail.create_email_account(account['email'], account['password'])
+            if not ok:
+                return False
+            self.journal.record(ACCOUNT_CREATED, account['email'],
+                                {k: account[k] for k in ('password', 'domain', 'first_name', 'last_name')})
+            self.accounts.add(INFRAMAIL, [{'email': account['email']}])
+            with self._stats_lock:
+                self.stats['accounts_created'] += 1
+            return True
+        
+        def connect(account: Dict) -> bool:
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="provision_connect"):
+                ok = self.instantly.add_email_account(account['email'], account['password'], account['domain'],
+                                                      account['first_name'], account['last_name'])
+            if not ok:
+                return False
+            self.journal.record(ACCOUNT_CONNECTED, account['email'])
+            # The password was only kept to resume the connect after a restart
+            self.journal.redact(ACCOUNT_CREATED, account['email'])
+            self.accounts.add(INSTANTLY, [{'email': account['email']}])
+            with self._stats_lock:
+                self.stats['accounts_connected'] += 1
+            logger.info(f"   ✓ {account['email']} ready")
+            return True
+        
+        # Inframail creates and Instantly connects run concurrently, each account independently
+        engine = ProvisioningEngine(
+            create, connect,
+            per_domain_limit=PROVISION_MAX_PER_DOMAIN,
+            inframail_limit=INFRAMAIL_MAX_CONCURRENCY,
+            instantly_limit=INSTANTLY_MAX_CONCURRENCY,
+            stopping=self._draining.is_set
+        )
+        results = engine.run(new_accounts, created_accounts=unconnected)
+        logger.info(f"\nProvisioned {results['created']} new accounts, connected {results['connected']}, "
+                    f"{results['failed']} failed" + (f", {results['skipped']} left for shutdown"
+                                                     if results['skipped'] else ""))
+        return results['connected']
+    
+    def import_leads(self, num_leads: int, concurrent: Optional[bool] = None) -> int:
+        """Import leads from Apollo to Instantly"""
+        if concurrent is None:
+            concurrent = CONCURRENT_IMPORT
+        mode = ' (streaming)' if STREAMING_IMPORT else ' (concurrent)' if concurrent else ''
+        
+        logger.info(f"\n{'='*60}")
+        logger.info(f"IMPORTING {num_leads} LEADS{mode}")
+        logger.info(f"{'='*60}\n")
+        
+        started = time.time()
+        try:
+            # Leads already enriched during an earlier outage go first
+            imported = self._push_deferred_leads(num_leads)
+            if STREAMING_IMPORT:
+                imported += self._import_leads_streaming(num_leads - imported)
+            elif concurrent:
+                imported += self._import_leads_concurrent(num_leads - imported)
+            else:
+                imported += self._import_leads_sequential(num_leads - imported)
+        finally:
+            self.dedup.save()
+        
+        elapsed = max(time.time() - started, 1e-6)
+        logger.info(f"Imported {imported} leads in {elapsed:.1f}s ({imported / elapsed:.2f} leads/sec)")
+        if imported < num_leads and self._draining.is_set():
+            logger.info(f"Import stopped for shutdown: {num_leads - imported} leads left for a later run")
+        elif imported < num_leads and self._import_paused():
+            logger.warning(f"Import paused while an upstream circuit is open: {num_leads - imported} leads "
+                           f"left for a later run, {self.deferred.count(LEAD_PUSH)} enriched leads waiting to be pushed")
+        return imported
+    
+    def _lead_batch_quotas(self, target: int) -> Dict[int, int]:
+        """
+        Leads still to push in each batch of today's target ({batch: leads left})
+        Leads pushed without a batch (by an unsharded run) fill the first batches.
+        """
+        pushed = Counter()
+        unbatched = 0
+        for data in self.journal.entries(LEAD_PUSHED).values():
+            if data and data.get('batch') is not None:
+                pushed[data['batch']] += 1
+            else:
+                unbatched += 1
+        
+        quotas = {}
+        for batch in range(-(-target // LEAD_BATCH_SIZE)):
+            left = min(LEAD_BATCH_SIZE, target - batch * LEAD_BATCH_SIZE) - pushed[batch]
+            absorbed = min(max(0, left), unbatched)
+            unbatched -= absorbed
+            if left - absorbed > 0:
+                quotas[batch] = left - absorbed
+        return quotas
+    
+    def _lease_search_shard(self, exclude: set) -> Optional[str]:
+        """
+        Lease a search shard (employee range) that is not exhausted, waiting while all are busy
+        Returns None if no shard is left, or as soon as the import has to stop (e.g. SIGTERM).
+        """
+        while not self._import_paused():
+            shards = [shard for shard in ORGANIZATION_EMPLOYEE_RANGES
+                      if shard not in exclude and not self.apollo.shard(shard).is_exhausted()]
+            if not shards:
+                return None
+            for shard in shards:
+                if self.leases.acquire(f"search:{shard}"):
+                    return shard
+            # Woken at once when the agent starts draining
+            self._draining.wait(1)
+        return None
+    
+    def _import_lead_batches(self, target: int) -> int:
+        """
+        Import this worker's share of today's target in leased batches
+        The target is cut into batches of LEAD_BATCH_SIZE and each round leases a
+        fair share of the batches left. Every pushed lead is journaled with its
+        batch, so batches left by a dead worker are finished by another. Leads
+        are searched in a leased shard of the Apollo query, so no two workers
+        page through the same results.
+        """
+        imported = 0
+        attempted = set()
+        while not self._import_paused():
+            quotas = self._lead_batch_quotas(target)
+            share = -(-len(quotas) // self.leases.live_workers())
+            leased = []
+            for batch in quotas:
+                if len(leased) >= share:
+                    break
+                if batch not in attempted and self.leases.acquire(f"leads:{self.journal.run_date}:{batch}"):
+                    leased.append(batch)
+                    attempted.add(batch)
+            if not leased:
+                return imported
             
-            for j in range(count):
-                # Generate realistic name-based email
+            tried_shards = set()
+            try:
                 while True:
-                    first = random.choice(FIRST_NAMES)
-                    last = random.choice(LAST_NAMES)
-                    email = f"{first}.{last}@{domain}"
-                    if email not in used_names:
-                        used_names.add(email)
+                    # Re-read after every import: a batch may have been worked on before we leased it
+                    quotas = self._lead_batch_quotas(target)
+                    with self._stats_lock:
+                        self.lead_batches = {batch: quotas[batch] for batch in leased if batch in quotas}
+                    left = sum(self.lead_batches.values())
+                    if left <= 0 or self._import_paused():
                         break
+                    shard = self._lease_search_shard(tried_shards)
+                    if shard is None:
+                        if not self._import_paused():
+                            logger.warning(f"No search shard left for lead batches {leased} ({left} leads short)")
+                        break
+                    tried_shards.add(shard)
+                    
+                    logger.info(f"[{self.leases.worker_id}] Lead batches {leased}: {left} leads from "
+                                f"companies of {shard} employees")
+                    apollo = self.apollo
+                    self.apollo = apollo.shard(shard)
+                    try:
+                        imported += self.import_leads(left)
+                    finally:
+                        self.apollo = apollo
+                        self.leases.release(f"search:{shard}")
+            finally:
+                with self._stats_lock:
+                    self.lead_batches = {}
+                for batch in leased:
+                    self.leases.release(f"leads:{self.journal.run_date}:{batch}")
+        return imported
+    
+    def _screen_page(self, people: List[Dict]) -> List[str]:
+        """Validate every email on a search page at once (MISSING for hidden emails)"""
+        return self.validator.validate_batch([person.get('email') for person in people])
+    
+    def _reject_email(self):
+        with self._stats_lock:
+            self.stats['emails_rejected'] += 1
+    
+    def _accept_enriched(self, email: Optional[str]) -> bool:
+        """Check an email revealed by enrichment; bad addresses are counted and dropped"""
+        verdict = self.validator.check(email)
+        if verdict not in (VALID, MISSING):
+            self._reject_email()
+        return verdict == VALID
+    
+    def _bulk_enrich_page(self, people: List[Dict], verdicts: List[str], needed: int,
+                          executor: Optional[ThreadPoolExecutor] = None,
+                          apollo_slots: Optional[threading.Semaphore] = None) -> Dict[int, Optional[str]]:
+        """
+        Reveal hidden emails on a search page through bulk match
+        Only as many new people as the import still needs (after those whose email
+        is already visible and valid) are enriched; the rest fall back to one-by-one
+        enrichment if they are reached. Returns {position in page: email or None}.
+        """
+        new_people = [i for i, person in enumerate(people)
+                      if verdicts[i] in (VALID, MISSING) and not self.dedup.seen_person(person)]
+        visible = sum(1 for i in new_people if verdicts[i] == VALID)
+        hidden = [i for i in new_people if verdicts[i] == MISSING][:max(0, needed - visible)]
+        batches = [hidden[start:start + ENRICH_BATCH_SIZE] for start in range(0, len(hidden), ENRICH_BATCH_SIZE)]
+        
+        def enrich(batch: List[int]) -> List[Optional[Dict]]:
+            if apollo_slots is None:
+                return self.enricher.bulk_enrich([people[i] for i in batch], batch_size=ENRICH_BATCH_SIZE)
+            with apollo_slots:
+                return self.enricher.bulk_enrich([people[i] for i in batch], batch_size=ENRICH_BATCH_SIZE)
+        
+        results = executor.map(enrich, batches) if executor else map(enrich, batches)
+        emails = {}
+        for batch, matches in zip(batches, results):
+            for i, person in zip(batch, matches):
+                emails[i] = person.get('email') if person else None
+        return emails
+    
+    def _import_leads_sequential(self, num_leads: int) -> int:
+        """Search, enrich and push one person at a time"""
+        progress = {'imported': 0, 'pending': 0}
+        if num_leads <= 0:
+            return 0
+        
+        def record_result(lead: Dict, pushed: bool):
+            progress['pending'] -= 1
+            if pushed:
+                progress['imported'] += 1
+                self.stats['leads_imported'] += 1
+                self._record_lead_pushed(lead['email'])
+                if progress['imported'] % 10 == 0:
+                    logger.info(f"   Imported {progress['imported']}/{num_leads} leads...")
+            else:
+                self._lead_push_failed(lead['email'], lead['person'])
+        
+        buffer = None
+        if BULK_LEAD_UPLOAD:
+            buffer = LeadUploadBuffer(self.instantly, record_result, LEAD_UPLOAD_CHUNK_SIZE, LEAD_UPLOAD_MAX_WAIT)
+        
+        pages = self.apollo.iter_business_owner_pages()
+        try:
+            for people in pages:
+                verdicts = self._screen_page(people)
+                bulk_emails = {}
+                if BULK_ENRICHMENT:
+                    bulk_emails = self._bulk_enrich_page(people, verdicts,
+                                                         num_leads - progress['imported'] - progress['pending'])
                 
-                password = self.generate_password()
-                first_name = first.capitalize()
-                last_name = last.capitalize()
-                
-                logger.info(f"[{created_count+1}/{num_accounts}] {email}")
-                
-                # Create in Inframail
-                if self.inframail.create_email_account(email, password):
-                    self.stats['accounts_created'] += 1
+                for i, person in enumerate(people):
+                    # Stop mid-page while an upstream is down; the page is searched again next run
+                    if self._import_paused():
+                        break
+                    if buffer:
+                        buffer.flush_if_due()
+                    
+                    # Bad addresses are dropped before they can cost a credit or a bounce
+                    if verdicts[i] not in (VALID, MISSING):
+                        self.stats['emails_rejected'] += 1
+                        continue
+                    
+                    # Known leads are skipped before they can cost an enrichment credit
+                    if self.dedup.seen_person(person):
+                        self.stats['duplicates_skipped'] += 1
+                        continue
+                    
+                    first_name = person.get('first_name', '')
+                    last_name = person.get('last_name', '')
+                    company = person.get('organization_name', '')
+                    email = person.get('email')
                     
-                    # Add to Instantly
-                    if self.instantly.add_email_account(email, password, domain, first_name, last_name):
-                        self.stats['accounts_connected'] += 1
-                        created_count += 1
-                        
-                        # Add to campaign
-                        campaign_accounts = self.instantly.get_campaign_accounts()
-                        if email not in campaign_accounts:
-                            campaign_accounts.append(email)
-                            self.instantly.assign_accounts_to_campaign(campaign_accounts)
+                    if verdicts[i] == MISSING:
+                        # Try to enrich
+                        if i in bulk_emails:
+                            email = bulk_emails[i]
+                        else:
+                            email = self.apollo.enrich_person(first_name, last_name, company)
+                        if not self._accept_enriched(email):
+                            email = None
                     
-                    time.sleep(2)  # Rate limiting
+                    if email:
+                        if not self.dedup.claim(email, person):
+                            self.stats['duplicates_skipped'] += 1
+                        else:
+                            progress['pending'] += 1
+                            if buffer:
+                                buffer.add(email, first_name, company, person=person)
+                            else:
+                                pushed = self.instantly.add_lead(email, first_name, company)
+                                record_result({'email': email, 'person': person}, pushed)
+                    
+                    # Buffered leads count toward the target until their upload says otherwise
+                    if buffer and progress['imported'] + progress['pending'] >= num_leads:
+                        buffer.flush()
+                    if progress['imported'] >= num_leads:
+                        break
+                
+                if progress['imported'] >= num_leads or self._import_paused():
+                    break
+        finally:
+            if buffer:
+                buffer.flush()
+                logger.info(f"Bulk upload used {buffer.requests_sent} requests")
+            # Closing mid-page leaves that page unconsumed so it is searched again next run
+            pages.close()
         
-        return created_count
+        return progress['imported']
     
-    def import_leads(self, num_leads: int) -> int:
-        """Import leads from Apollo to Instantly"""
-        logger.info(f"\n{'='*60}")
-        logger.info(f"IMPORTING {num_leads} LEADS")
-        logger.info(f"{'='*60}\n")
+    def _import_leads_concurrent(self, num_leads: int) -> int:
+        """
+        Enrich and push leads in parallel
+        Apollo and Instantly calls are capped separately; a push only starts
+        if it can still fit under num_leads, so the count stops exactly there
+        """
+        apollo_slots = threading.Semaphore(APOLLO_MAX_CONCURRENCY)
+        instantly_slots = threading.Semaphore(INSTANTLY_MAX_CONCURRENCY)
+        lock = threading.Lock()
+        progress = {'imported': 0, 'pushing': 0}
         
-        imported = 0
-        batch_size = 100
-        batches = (num_leads + batch_size - 1) // batch_size
+        def has_room() -> bool:
+            return progress['imported'] + progress['pushing'] < num_leads
+        
+        def record_result(lead: Dict, pushed: bool):
+            with lock:
+                progress['pushing'] -= 1
+                if pushed:
+                    progress['imported'] += 1
+                    imported = progress['imported']
+            if pushed:
+                self._record_lead_pushed(lead['email'])
+                with self._stats_lock:
+                    self.stats['leads_imported'] += 1
+                if imported % 10 == 0:
+                    logger.info(f"   Imported {imported}/{num_leads} leads...")
+            else:
+                self._lead_push_failed(lead['email'], lead['person'])
+        
+        buffer = None
+        if BULK_LEAD_UPLOAD:
+            buffer = LeadUploadBuffer(self.instantly, record_result, LEAD_UPLOAD_CHUNK_SIZE, LEAD_UPLOAD_MAX_WAIT)
         
-        for batch in range(batches):
-            batch_limit = min(batch_size, num_leads - imported)
+        def process(person: Dict, i: int, verdict: str, bulk_emails: Dict[int, Optional[str]]):
+            if buffer:
+                buffer.flush_if_due()
+            with lock:
+                if not has_room():
+                    return
+            if self._import_paused():
+                return
             
-            logger.info(f"\nBatch {batch+1}/{batches} - Searching for {batch_limit} business owners...")
-            people = self.apollo.search_business_owners(batch_limit)
+            # Bad addresses are dropped before they can cost a credit or a bounce
+            if verdict not in (VALID, MISSING):
+                self._reject_email()
+                return
             
-            for person in people:
-                if imported >= num_leads:
-                    break
-                
-                first_name = person.get('first_name', '')
-                last_name = person.get('last_name', '')
-                company = person.get('organization_name', '')
-                email = person.get('email')
-                
-                if not email or '@' not in email:
-                    # Try to enrich
-                    email = self.apollo.enrich_person(first_name, last_name, company)
-                
-                if email and '@' in email:
-                    if self.instantly.add_lead(email, first_name, company):
-                        imported += 1
-                        self.stats['leads_imported'] += 1
-                        if imported % 10 == 0:
-                            logger.info(f"   Imported {imported}/{num_leads} leads...")
-                
-                time.sleep(0.5)  # Rate limiting
+            # Known leads are skipped before they can cost an enrichment credit
+            if self.dedup.seen_person(person):
+                with self._stats_lock:
+                    self.stats['duplicates_skipped'] += 1
+                return
+            
+            first_name = person.get('first_name', '')
+            last_name = person.get('last_name', '')
+            company = person.get('organization_name', '')
+            email = person.get('email')
+            
+            if verdict == MISSING:
+                if i in bulk_emails:
+                    email = bulk_emails[i]
+                else:
+                    with apollo_slots:
+                        email = self.apollo.enrich_person(first_name, last_name, company)
+                if not self._accept_enriched(email):
+                    return
+            
+            # Reserve a slot so in-flight pushes can never overshoot num_leads
+            with lock:
+                if not has_room():
+                    return
+                progress['pushing'] += 1
+            
+            lead = {'email': email, 'person': person}
+            if not self.dedup.claim(email, person):
+                with lock:
+                    progress['pushing'] -= 1
+                with self._stats_lock:
+                    self.stats['duplicates_skipped'] += 1
+                return
+            
+            with instantly_slots:
+                if buffer:
+                    buffer.add(email, first_name, company, person=person)
+                    return
+                pushed = False
+                try:
+                    pushed = self.instantly.add_lead(email, first_name, company)
+                finally:
+                    record_result(lead, pushed)
         
-        return imported
-    
-    def run(self):
-        """Main execution"""
-        logger.info(f"\n{'='*60}")
-        logger.info(f"AUTONOMOUS LEAD AGENT - STARTING")
-        logger.info(f"{'='*60}\n")
+        if num_leads <= 0:
+            return 0
         
-        # Check current infrastructure
-        inframail_accounts = self.inframail.get_email_accounts()
-        instantly_accounts = self.instantly.get_accounts()
+        pages = self.apollo.iter_business_owner_pages()
+        try:
+            with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+                for people in pages:
+                    verdicts = self._screen_page(people)
+                    bulk_emails = {}
+                    if BULK_ENRICHMENT:
+                        with lock:
+                            needed = num_leads - progress['imported'] - progress['pushing']
+                        bulk_emails = self._bulk_enrich_page(people, verdicts, needed, executor, apollo_slots)
+                    futures = [executor.submit(process, person, i, verdicts[i], bulk_emails)
+                               for i, person in enumerate(people)]
+                    for future in wait(futures).done:
+                        if future.exception():
+                            logger.error(f"Lead worker error: {future.exception()}")
+                    
+                    # Settle buffered leads so failed uploads free room for the next page
+                    if buffer:
+                        buffer.flush()
+                    if progress['imported'] >= num_leads or self._import_paused():
+                        break
+        finally:
+            if buffer:
+                buffer.flush()
+                logger.info(f"Bulk upload used {buffer.requests_sent} requests")
+            pages.close()
         
-        total_accounts = len(inframail_accounts)
-        connected_accounts = len(instantly_accounts)
+        return progress['imported']
+    
+    def _import_leads_streaming(self, num_leads: int) -> int:
+        """
+        Search, enrich and push as overlapping pipeline stages (see lead_pipeline)
+        Pages are only searched while the leads already in flight cannot reach
+        num_leads, and a page is only marked consumed once all its people are settled.
+        """
+        if num_leads <= 0:
+            return 0
+        progress = {'imported': 0}
         
-        logger.info(f"Current Infrastructure:")
-        logger.info(f"  - Inframail accounts: {total_accounts}")
-        logger.info(f"  - Instantly accounts: {connected_accounts}")
-        logger.info(f"  - Current capacity: {connected_accounts * EMAILS_PER_ACCOUNT_PER_DAY} emails/day")
+        def enrich(people: List[Dict]) -> List[Optional[str]]:
+            if BULK_ENRICHMENT:
+                matches = self.enricher.bulk_enrich(people, batch_size=ENRICH_BATCH_SIZE)
+                return [person.get('email') if person else None for person in matches]
+            return [self.apollo.enrich_person(person.get('first_name', ''), person.get('last_name', ''),
+                                              person.get('organization_name', ''))
+                    for person in people]
         
-        # Calculate what to do today
-        accounts_needed = max(0, TARGET_TOTAL_ACCOUNTS - total_accounts)
-        accounts_to_create = min(ACCOUNTS_TO_CREATE_PER_DAY, accounts_needed)
+        def push(leads: List[Dict]) -> Dict[str, bool]:
+            if BULK_LEAD_UPLOAD:
+                with metrics.timer("lead_agent_stage_duration_seconds", stage="push"):
+                    return self.instantly.add_leads_bulk([
+                        {'email': lead['email'],
+                         'first_name': lead['person'].get('first_name', ''),
+                         'company_name': lead['person'].get('organization_name', '')}
+                        for lead in leads
+                    ])
+            return {lead['email']: self.instantly.add_lead(lead['email'], lead['person'].get('first_name', ''),
+                                                           lead['person'].get('organization_name', ''))
+                    for lead in leads}
         
-        logger.info(f"\nToday's Plan:")
-        logger.info(f"  - Accounts to create: {accounts_to_create}")
+        def record_result(lead: Dict, pushed: bool):
+            if not pushed:
+                self._lead_push_failed(lead['email'], lead['person'])
+                return
+            self._record_lead_pushed(lead['email'])
+            with self._stats_lock:
+                self.stats['leads_imported'] += 1
+                progress['imported'] += 1
+                imported = progress['imported']
+            if imported % 10 == 0:
+                logger.info(f"   Imported {imported}/{num_leads} leads...")
         
-        # Create accounts if needed
-        if accounts_to_create > 0:
-            created = self.create_email_accounts(accounts_to_create)
-            connected_accounts += created
+        fingerprint, pages = self.apollo.walk_business_owner_pages()
         
-        # Calculate leads to import based on capacity
-        self.stats['leads_to_import_today'] = connected_accounts * EMAILS_PER_ACCOUNT_PER_DAY
+        def advance_page(page: Dict):
+            self.search_cursors.advance(fingerprint, page['page'], page['total_pages'], page['exhausted'])
         
-        logger.info(f"  - Leads to import: {self.stats['leads_to_import_today']}")
+        pipeline = LeadPipeline(
+            num_leads,
+            is_known=self.dedup.seen_person,
+            enrich=enrich,
+            claim=self.dedup.claim,
+            push=push,
+            on_result=record_result,
+            advance_page=advance_page,
+            paused=self._import_paused,
+            validate_email=self._accept_enriched,
+            screen_emails=self.validator.validate_batch,
+            enrich_batch_size=ENRICH_BATCH_SIZE if BULK_ENRICHMENT else 1,
+            enrich_workers=APOLLO_MAX_CONCURRENCY,
+            push_batch_size=LEAD_UPLOAD_CHUNK_SIZE if BULK_LEAD_UPLOAD else 1,
+            push_workers=INSTANTLY_MAX_CONCURRENCY,
+            max_wait=LEAD_UPLOAD_MAX_WAIT,
+            queue_size=PIPELINE_QUEUE_SIZE
+        )
+        imported = pipeline.run(pages)
         
-        # Import leads
-        if self.stats['leads_to_import_today'] > 0:
-            self.import_leads(self.stats['leads_to_import_today'])
+        with self._stats_lock:
+            self.stats['duplicates_skipped'] += pipeline.stats['known'] + pipeline.stats['duplicates']
+            self.stats['emails_rejected'] += pipeline.stats['rejected']
+        logger.info(f"Pipeline: {pipeline.stats['searched']} searched, {pipeline.stats['not_found']} without email, "
+                    f"{pipeline.stats['rejected']} rejected emails, "
+                    f"{pipeline.stats['known'] + pipeline.stats['duplicates']} duplicates, "
+                    f"{pipeline.stats['failed']} failed pushes")
+        return imported
+    
+    def _plan_day(self) -> Tuple[Dict, Optional[List[str]]]:
+        """Today's plan from the journal, or a new one; also the Inframail accounts if they were just fetched"""
+        # One worker at a time decides the day's plan; the others resume it
+        with self._exclusive(f"plan:{self.journal.run_date}"):
+            plan = self.journal.get_plan()
+            if plan is not None:
+                logger.info(f"Resuming today's plan ({self.journal.run_date}): "
+                            f"{self.journal.count(ACCOUNT_CREATED)} accounts created, "
+                            f"{self.journal.count(LEAD_PUSHED)} leads pushed so far")
+                return plan, None
+            
+            # Check current infrastructure (conditional fetches into the local mirror)
+            self.accounts.sync_all()
+            inframail_accounts = self.accounts.emails(INFRAMAIL)
+            instantly_accounts = self.accounts.emails(INSTANTLY)
+            
+            total_accounts = len(inframail_accounts)
+            connected_accounts = len(instantly_accounts)
+            
+            logger.info(f"Current Infrastructure:")
+            logger.info(f"  - Inframail accounts: {total_accounts}")
+            logger.info(f"  - Instantly accounts: {connected_accounts}")
+            logger.info(f"  - Current capacity: {self._sending_capacity()} emails/day "
+                        f"(accounts in warmup not counted)")
+            
+            # Calculate what to do today
+            accounts_needed = max(0, TARGET_TOTAL_ACCOUNTS - total_accounts)
+            plan = {
+                'connected_accounts': connected_accounts,
+                'accounts_to_create': min(ACCOUNTS_TO_CREATE_PER_DAY, accounts_needed)
+            }
+            self.journal.save_plan(plan)
+            return plan, inframail_accounts
+    
+    def _provisioning_pending(self, plan: Dict) -> bool:
+        """True while some of today's accounts are not yet created, connected or assigned"""
+        created = self.journal.entries(ACCOUNT_CREATED)
+        connected = self.journal.entries(ACCOUNT_CONNECTED)
+        return (len(created) < plan['accounts_to_create']
+                or any(email not in connected for email in created)
+                or any(not self.journal.is_done(ACCOUNT_ASSIGNED, email) for email in connected))
+    
+    def _sending_capacity(self) -> int:
+        """Campaign emails the mirrored campaign accounts can send today, given their age and warmup"""
+        return self.capacity.daily_capacity(
+            campaign_account_dates(self.accounts, self.journal.history(ACCOUNT_CREATED)))
+    
+    def _import_today(self) -> int:
+        """
+        Import what is left of today's lead target
+        The target is today's sendable volume, so leads are only searched and
+        enriched when the campaign can send to them today.
+        """
+        self.stats['leads_to_import_today'] = self._sending_capacity()
+        leads_remaining = max(0, self.stats['leads_to_import_today'] - self.journal.count(LEAD_PUSHED))
         
-        # Final summary
+        logger.info(f"  - Leads to import: {self.stats['leads_to_import_today']} ({leads_remaining} remaining)")
+        
+        if leads_remaining <= 0:
+            return 0
+        if self.leases is not None:
+            return self._import_lead_batches(self.stats['leads_to_import_today'])
+        return self.import_leads(leads_remaining)
+    
+    def _log_summary(self):
+        account_dates = campaign_account_dates(self.accounts, self.journal.history(ACCOUNT_CREATED))
+        days_to_full = self.capacity.days_to_full_capacity(account_dates, self.accounts.count(INFRAMAIL))
         logger.info(f"\n{'='*60}")
         logger.info(f"DAILY RUN COMPLETE")
         logger.info(f"{'='*60}")
         logger.info(f"Accounts created: {self.stats['accounts_created']}")
         logger.info(f"Accounts connected: {self.stats['accounts_connected']}")
+        logger.info(f"Accounts assigned to campaign: {self.stats['accounts_assigned']}")
         logger.info(f"Leads imported: {self.stats['leads_imported']}")
-        logger.info(f"New daily capacity: {connected_accounts * EMAILS_PER_ACCOUNT_PER_DAY} emails/day")
+        logger.info(f"Duplicate leads skipped: {self.stats['duplicates_skipped']}")
+        logger.info(f"Emails rejected (invalid, disposable or role): {self.stats['emails_rejected']}")
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        full_in = "never reached" if days_to_full is None else f"in {days_to_full} days"
+        logger.info(f"Sending capacity: {self.capacity.daily_capacity(account_dates)} emails/day today, "
+                    f"{self.capacity.daily_capacity(account_dates, tomorrow)} tomorrow (full capacity {full_in})")
+        for provider, limiter in get_all_limiter_stats().items():
+            logger.info(f"Rate limit {provider}: {limiter['rate']} req/s, {limiter['throttled']} throttled, "
+                        f"{limiter['seconds_waited']}s waited")
+        for breaker in get_all_breaker_stats():
+            if breaker['opened'] or breaker['state'] != CLOSED:
+                logger.info(f"Circuit {breaker['provider']} {breaker['endpoint']}: {breaker['state']}, "
+                            f"opened {breaker['opened']} times, {breaker['rejected']} calls failed fast")
+        for host, pool in self.transport.get_pool_stats().items():
+            logger.info(f"Connections {host}: {pool['requests']} requests, "
+                        f"{pool['connections_opened']} opened, {pool['reuse_rate']} reused")
         logger.info(f"{'='*60}\n")
+        
+        try:
+            metrics.write_snapshot(self.metrics_path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics: {e}")
+    
+    def run(self):
+        """Main execution (resumes today's plan from the run journal after a restart)"""
+        logger.info(f"\n{'='*60}")
+        logger.info(f"AUTONOMOUS LEAD AGENT - STARTING")
+        logger.info(f"{'='*60}\n")
+        
+        if self.journal.is_complete():
+            logger.info(f"Today's run ({self.journal.run_date}) is already complete - nothing to do")
+            return
+        
+        plan, inframail_accounts = self._plan_day()
+        
+        logger.info(f"\nToday's Plan:")
+        logger.info(f"  - Accounts to create: {plan['accounts_to_create']}")
+        
+        # Create accounts if needed
+        if plan['accounts_to_create'] > 0:
+            self.create_email_accounts(plan['accounts_to_create'], existing_accounts=inframail_accounts)
+        
+        # Import leads based on today's sendable volume
+        self._import_today()
+        
+        if self._provisioning_pending(plan):
+            # Left open so the next run retries today's accounts from the journal
+            logger.warning("Some of today's accounts are not yet created, connected or assigned - "
+                           "the next run resumes them")
+        elif self.journal.count(LEAD_PUSHED) >= self.stats['leads_to_import_today']:
+            self.journal.mark_complete()
+        
+        # Final summary
+        self._log_summary()
+    
+    # ------------------------------------------------------------------
+    # Daemon mode: the same day's work, split into phases run on cadences
+    # ------------------------------------------------------------------
+    
+    def _start_new_day(self):
+        """Switch to a fresh journal and counters once the date changes"""
+        today = datetime.now().date().isoformat()
+        if self.journal.run_date == today:
+            return
+        logger.info(f"New day {today}: planning a fresh run")
+        self.journal.close()
+        self.journal = RunJournal(os.path.join(DATA_DIR, "run_journal.db"))
+        with self._stats_lock:
+            for key in self.stats:
+                self.stats[key] = 0
+    
+    def _complete_day_if_done(self, plan: Dict):
+        if self._provisioning_pending(plan) or self._draining.is_set():
+            return
+        if self.journal.count(LEAD_PUSHED) >= self._sending_capacity():
+            self.journal.mark_complete()
+            self._log_summary()
+    
+    def provision_phase(self):
+        """Plan the day if needed and create, connect and assign any of today's accounts still missing"""
+        self._start_new_day()
+        if self.journal.is_complete():
+            return
+        plan, inframail_accounts = self._plan_day()
+        if self._provisioning_pending(plan):
+            self.create_email_accounts(plan['accounts_to_create'], existing_accounts=inframail_accounts)
+        self._complete_day_if_done(plan)
+    
+    def import_phase(self):
+        """Import what is left of today's leads; no API calls once the target is reached"""
+        self._start_new_day()
+        if self.journal.is_complete():
+            return
+        plan = self.journal.get_plan()
+        if plan is None:
+            # The provisioning phase plans the day
+            return
+        if self._import_paused():
+            logger.info("Import skipped while an upstream circuit is open")
+            return
+        self._import_today()
+        self._complete_day_if_done(plan)
+    
+    def drain(self):
+        """Stop starting new work; calls, pushes and account connects already under way finish"""
+        if not self._draining.is_set():
+            logger.info("Draining: finishing in-flight work before shutting down")
+        self._draining.set()
+    
+    def close(self):
+        """Release leases, persist the dedup index and cache access times, close the journal and detach from the metrics exporter"""
+        metrics.unregister_collector(self._collect_metrics)
+        self.dedup.save()
+        self.enricher.cache.flush()
+        if self.leases is not None:
+            self.leases.close()
+        self.journal.close()
+        self.transport.close()
 
 # ============================================================================
 # MAIN
 # ============================================================================
 
-if __name__ == "__main__":
-    agent = AutonomousLeadAgent()
-    agent.run()
+# Names config.template.py defines that agent.py has no use for (they are not warned about)
+TEMPLATE_ONLY_SETTINGS = {"PERSON_TITLES"}
+
+
+def load_config(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Apply the settings in a config.py over the defaults above
+    Returns the names that changed and the unknown names (which are ignored);
+    the caller logs those once logging is set up from the new LOG_* settings.
+    """
+    settings = runpy.run_path(path)
+    changed = []
+    unknown = []
+    for name, value in settings.items():
+        if not name.isupper() or name.startswith('_') or name in TEMPLATE_ONLY_SETTINGS:
+            continue
+        if name not in globals():
+            unknown.append(name)
+            continue
+        if globals()[name] != value:
+            globals()[name] = value
+            changed.append(name)
+    global INSTANTLY_CAMPAIGN_URL
+    INSTANTLY_CAMPAIGN_URL = f"https://api.instantly.ai/api/v2/campaigns/{INSTANTLY_CAMPAIGN_ID}"
+    return changed, unknown
+
 
+def warn_unknown_settings(path: str, unknown: List[str]):
+    for name in unknown:
+        logger.warning(f"Unknown setting {name} in {path}")
+
+
+def setup_logging():
+    """(Re)configure logging from the LOG_* settings"""
+    configure_logging(LOG_DIR, level=LOG_LEVEL, json_lines=LOG_FORMAT == "json",
+                      max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                      retention_days=LOG_RETENTION_DAYS)
+
+
+def run_daemon(config_path: Optional[str] = None):
+    """
+    Run the provisioning and import phases on their cadences until SIGTERM
+    SIGHUP reloads config_path between phases and rebuilds the agent with it.
+    """
+    state = {'agent': AutonomousLeadAgent()}
+    
+    def reload():
+        if not config_path or not os.path.exists(config_path):
+            logger.warning(f"SIGHUP: no config file at {config_path}, nothing to reload")
+            return
+        changed, unknown = load_config(config_path)
+        if any(name.startswith('LOG_') for name in changed):
+            setup_logging()
+        warn_unknown_settings(config_path, unknown)
+        logger.info(f"Reloaded {config_path}: {', '.join(changed) if changed else 'no changes'}")
+        if {name for name in changed if not name.startswith('LOG_')} - {'PROVISION_INTERVAL', 'IMPORT_INTERVAL'}:
+            state['agent'].close()
+            state['agent'] = AutonomousLeadAgent()
+        if changed:
+            scheduler.set_interval("provision", PROVISION_INTERVAL)
+            scheduler.set_interval("import", IMPORT_INTERVAL)
+    
+    scheduler = Scheduler(on_reload=reload, on_stop=lambda: state['agent'].drain())
+    scheduler.add("provision", lambda: state['agent'].provision_phase(), PROVISION_INTERVAL)
+    scheduler.add("import", lambda: state['agent'].import_phase(), IMPORT_INTERVAL)
+    
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
+    signal.signal(signal.SIGHUP, lambda signum, frame: scheduler.reload())
+    
+    logger.info(f"Daemon started: provisioning every {PROVISION_INTERVAL}s, imports every {IMPORT_INTERVAL}s")
+    # Jobs run on their own thread so signals are handled at once, even mid-phase
+    worker = threading.Thread(target=scheduler.run, name="scheduler")
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(timeout=1.0)
+    finally:
+        state['agent'].close()
+    logger.info("Daemon stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autonomous lead generation agent")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and schedule the daily phases instead of one run")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Settings file applied over the defaults")
+    args = parser.parse_args()
+    
+    unknown = []
+    if os.path.exists(args.config):
+        _, unknown = load_config(args.config)
+    setup_logging()
+    warn_unknown_settings(args.config, unknown)
+    
+    if args.daemon:
+        run_daemon(args.config)
+    else:
+        agent = AutonomousLeadAgent()
+        try:
+            agent.run()
+        finally:
+            agent.close()
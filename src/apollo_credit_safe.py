@@ -5,27 +5,46 @@ Prevents wasted credits from failed API calls
 Key Features:
 1. Pre-validates data before consuming credits
 2. Checks for existing leads before enrichment
-3. Implements retry logic with exponential backoff
+3. Implements retry logic paced by the shared Apollo rate limiter
 4. Tracks credit usage in real-time
 5. Validates email format before API calls
-6. Caches results to avoid duplicate calls
+6. Caches results on disk (with TTL, LRU eviction and "not found" entries) to avoid duplicate calls
+7. Pages through search results and resumes where the last run stopped
+8. Enriches in bulk (people/bulk_match), splitting batches that fail
+9. Streams contacts through enrichment with bounded memory (iter_enrich_safe)
+10. Offline email validation (see email_validation.py): contacts whose email is
+    rejected are never enriched, and enriched emails are checked before use
 """
 
 import requests
 import json
 import time
 import logging
-import re
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
 
+from email_validation import MISSING, VALID, EmailValidator
+from enrichment_cache import EnrichmentCache
+from http_transport import HttpTransport, get_transport
+from metrics import registry as metrics
+from search_cursor import SearchCursorStore, iter_search_pages, query_fingerprint
+
 logger = logging.getLogger(__name__)
 
+APOLLO_BULK_MATCH_URL = "https://api.apollo.io/api/v1/people/bulk_match"
+BULK_MATCH_SIZE = 10  # Apollo's limit of contacts per bulk_match request
+ENRICH_WINDOW_SIZE = 100  # Most contacts held back while a streamed bulk batch fills
+
 class CreditSafeApolloManager:
     """Apollo.io manager with credit protection"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, transport: Optional[HttpTransport] = None,
+                 cursor_store: Optional[SearchCursorStore] = None,
+                 cache: Optional[EnrichmentCache] = None,
+                 validator: Optional[EmailValidator] = None):
         self.api_key = api_key
+        self.http = transport or get_transport()
+        self.cursor_store = cursor_store
         self.headers = {
             "Content-Type": "application/json",
             "Cache-Control": "no-cache"
@@ -33,24 +52,25 @@ class CreditSafeApolloManager:
         self.credits_used_this_session = 0
         self.successful_enrichments = 0
         self.failed_enrichments = 0
-        self.cache = {}  # Cache to avoid duplicate API calls
+        # Cache to avoid duplicate API calls; pass a file-backed EnrichmentCache
+        # to keep results across restarts and share them between processes
+        self.cache = cache or EnrichmentCache()
+        # Offline syntax, disposable-domain and role-account checks
+        self.validator = validator or EmailValidator()
+        self.emails_rejected = 0
         
     def validate_email(self, email: str) -> bool:
-        """Validate email format before making API call"""
-        if not email or not isinstance(email, str):
-            return False
-        
-        # Basic email regex
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        """Validate email offline (syntax, disposable domains, role accounts) before making API call"""
+        return self.validator.is_valid(email)
     
     def is_cached(self, email: str) -> Optional[Dict]:
         """Check if we already have this contact in cache"""
-        return self.cache.get(email.lower())
+        _, data = self.cache.get(email)
+        return data
     
     def add_to_cache(self, email: str, data: Dict):
         """Add contact to cache to avoid duplicate calls"""
-        self.cache[email.lower()] = data
+        self.cache.put(email, data)
     
     def check_credit_balance(self) -> Optional[int]:
         """
@@ -70,76 +90,123 @@ class CreditSafeApolloManager:
                                person_titles: List[str],
                                person_locations: List[str],
                                org_size_ranges: List[str],
-                               limit: int = 100) -> List[Dict]:
+                               limit: int = 100,
+                               page: int = 1) -> List[Dict]:
         """
         Search for contacts with pre-validation
         Only returns contacts that have valid emails
         """
         
         # Validate inputs before making API call
+        if not self._validate_search_params(person_titles, person_locations, limit):
+            return []
+        
+        payload = self._search_payload(person_titles, person_locations, org_size_ranges, limit, page)
+        data = self._search_page(payload)
+        if data is None:
+            return []
+        return self._filter_valid_contacts(data.get('people', []))
+    
+    def iter_search_with_validation(self,
+                                    person_titles: List[str],
+                                    person_locations: List[str],
+                                    org_size_ranges: List[str],
+                                    per_page: int = 100,
+                                    max_pages: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Lazily walk search pages, yielding the validated contacts of each page
+        Resumes after the last page consumed for the same criteria (when a
+        cursor store is configured) and stops once the query is exhausted
+        """
+        if not self._validate_search_params(person_titles, person_locations, per_page):
+            return
+        
+        fingerprint = query_fingerprint(
+            self._search_payload(person_titles, person_locations, org_size_ranges, per_page, 1)
+        )
+        
+        def fetch(page: int) -> Optional[Dict]:
+            payload = self._search_payload(person_titles, person_locations, org_size_ranges, per_page, page)
+            return self._search_page(payload)
+        
+        for people in iter_search_pages(fetch, fingerprint, per_page, self.cursor_store, max_pages):
+            yield self._filter_valid_contacts(people)
+    
+    def _validate_search_params(self, person_titles: List[str], person_locations: List[str], limit: int) -> bool:
         if not person_titles or not person_locations:
             logger.error("Invalid search parameters - no titles or locations provided")
-            return []
+            return False
         
         if limit <= 0 or limit > 100:
             logger.error(f"Invalid limit: {limit}. Must be between 1 and 100")
-            return []
-        
-        payload = {
+            return False
+        return True
+    
+    def _search_payload(self,
+                        person_titles: List[str],
+                        person_locations: List[str],
+                        org_size_ranges: List[str],
+                        per_page: int,
+                        page: int) -> Dict:
+        return {
             "api_key": self.api_key,
             "person_titles": person_titles,
             "person_locations": person_locations,
             "organization_num_employees_ranges": org_size_ranges,
-            "page": 1,
-            "per_page": limit
+            "page": page,
+            "per_page": per_page
         }
-        
+    
+    def _search_page(self, payload: Dict) -> Optional[Dict]:
+        """Fetch one search page; returns None (no credits counted) on failure"""
         try:
-            logger.info(f"Searching Apollo for {limit} contacts...")
+            logger.info(f"Searching Apollo for {payload['per_page']} contacts (page {payload['page']})...")
             
-            response = requests.post(
-                "https://api.apollo.io/api/v1/mixed_people/search",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="search"):
+                response = self.http.post(
+                    "https://api.apollo.io/api/v1/mixed_people/search",
+                    headers=self.headers,
+                    json=payload,
+                    timeout=30,
+                    provider="apollo"
+                )
             
             # Check for successful response BEFORE processing
             if response.status_code != 200:
                 logger.error(f"Search failed with status {response.status_code}: {response.text}")
-                return []
+                return None
             
             data = response.json()
-            people = data.get('people', [])
-            
-            # Filter out contacts without emails BEFORE enrichment
-            valid_contacts = []
-            for person in people:
-                email = person.get('email')
-                
-                # Skip if no email or invalid email
-                if not email or not self.validate_email(email):
-                    logger.debug(f"Skipping contact without valid email: {person.get('name', 'Unknown')}")
-                    continue
-                
-                valid_contacts.append(person)
-            
-            logger.info(f"Found {len(valid_contacts)} contacts with valid emails (filtered from {len(people)} total)")
             
             # Track credits used (search uses credits too)
-            self.credits_used_this_session += limit
+            self.credits_used_this_session += payload['per_page']
             
-            return valid_contacts
+            return data
             
         except requests.exceptions.Timeout:
             logger.error("Apollo API timeout - no credits consumed")
-            return []
+            return None
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error during search: {e}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Unexpected error during search: {e}")
-            return []
+            return None
+    
+    def _filter_valid_contacts(self, people: List[Dict]) -> List[Dict]:
+        """Filter out contacts without emails BEFORE enrichment (the whole page is validated at once)"""
+        valid_contacts = []
+        verdicts = self.validator.validate_batch([person.get('email') for person in people])
+        for person, verdict in zip(people, verdicts):
+            # Skip if no email or invalid email
+            if verdict != VALID:
+                logger.debug(f"Skipping contact without valid email ({verdict}): {person.get('name', 'Unknown')}")
+                continue
+            
+            valid_contacts.append(person)
+        
+        logger.info(f"Found {len(valid_contacts)} contacts with valid emails (filtered from {len(people)} total)")
+        return valid_contacts
     
     def enrich_with_retry(self, 
                           first_name: str, 
@@ -158,13 +225,17 @@ class CreditSafeApolloManager:
             return None
         
         # Create cache key
-        cache_key = f"{first_name.lower()}_{last_name.lower()}_{organization_name.lower() if organization_name else 'none'}"
+        cache_key = self._cache_key(first_name, last_name, organization_name)
         
         # Check cache first (avoid duplicate API calls)
-        cached = self.is_cached(cache_key)
-        if cached:
+        hit, cached = self.cache.get(cache_key)
+        if hit and cached:
             logger.info(f"Using cached data for {first_name} {last_name} (saved 1 credit)")
             return cached
+        if hit:
+            logger.info(f"{first_name} {last_name} previously not found (saved 1 credit)")
+            self.failed_enrichments += 1
+            return None
         
         payload = {
             "api_key": self.api_key,
@@ -175,33 +246,36 @@ class CreditSafeApolloManager:
         }
         
         for attempt in range(max_retries):
+            if attempt > 0:
+                metrics.inc("lead_agent_http_retries_total", provider="apollo", endpoint="/api/v1/people/match")
             try:
                 logger.debug(f"Enriching {first_name} {last_name} (attempt {attempt + 1}/{max_retries})")
                 
-                response = requests.post(
-                    "https://api.apollo.io/api/v1/people/match",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=30
-                )
+                with metrics.timer("lead_agent_stage_duration_seconds", stage="enrich"):
+                    response = self.http.post(
+                        "https://api.apollo.io/api/v1/people/match",
+                        headers=self.headers,
+                        json=payload,
+                        timeout=30,
+                        provider="apollo"
+                    )
                 
                 # Check status code BEFORE processing
                 if response.status_code == 404:
                     logger.warning(f"Contact not found: {first_name} {last_name}")
+                    self.cache.put_negative(cache_key)
                     self.failed_enrichments += 1
                     return None
                 
                 if response.status_code == 429:
-                    # Rate limited - wait and retry
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Rate limited. Waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
+                    # Rate limited - the shared limiter has already slowed down
+                    # (honoring Retry-After), so the retry waits on it
+                    logger.warning(f"Rate limited. Retrying at the reduced Apollo rate...")
                     continue
                 
                 if response.status_code != 200:
                     logger.error(f"Enrichment failed with status {response.status_code}: {response.text}")
                     if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
                         continue
                     else:
                         self.failed_enrichments += 1
@@ -215,7 +289,7 @@ class CreditSafeApolloManager:
                 email = person.get('email')
                 if not email or not self.validate_email(email):
                     logger.warning(f"Enrichment returned invalid email for {first_name} {last_name}")
-                    self.failed_enrichments += 1
+                    self._reject_enriched(cache_key, email)
                     return None
                 
                 # Success! Cache the result
@@ -229,7 +303,6 @@ class CreditSafeApolloManager:
             except requests.exceptions.Timeout:
                 logger.warning(f"Timeout on attempt {attempt + 1}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
                     continue
                 else:
                     logger.error(f"All retries exhausted for {first_name} {last_name}")
@@ -239,7 +312,6 @@ class CreditSafeApolloManager:
             except Exception as e:
                 logger.error(f"Error enriching {first_name} {last_name}: {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
                     continue
                 else:
                     self.failed_enrichments += 1
@@ -249,45 +321,239 @@ class CreditSafeApolloManager:
         self.failed_enrichments += 1
         return None
     
-    def batch_enrich_safe(self, contacts: List[Dict], max_credits: int = None) -> List[Dict]:
+    def _reject_enriched(self, cache_key: str, email: Optional[str]):
+        """Account for an enrichment whose email failed validation"""
+        self.failed_enrichments += 1
+        if email:
+            # Apollo revealed an address (and charged for it); remember it as unusable so it is not bought twice
+            self.cache.put_negative(cache_key)
+            self.credits_used_this_session += 1
+            self.emails_rejected += 1
+    
+    @staticmethod
+    def _cache_key(first_name: str, last_name: str, organization_name: Optional[str]) -> str:
+        return f"{first_name.lower()}_{last_name.lower()}_{organization_name.lower() if organization_name else 'none'}"
+    
+    def bulk_enrich(self,
+                    contacts: List[Dict],
+                    batch_size: int = BULK_MATCH_SIZE,
+                    max_credits: Optional[int] = None) -> List[Optional[Dict]]:
         """
-        Safely enrich a batch of contacts with credit limit
-        Stops if max_credits is reached
+        Enrich contacts through people/bulk_match, batch_size contacts per call
+        Returns one entry per contact, in order: the enriched person or None.
+        Cached contacts cost nothing, and each new match is cached and counted as
+        one credit. A batch that fails as a whole is split in half and retried;
+        a single contact left over goes through enrich_with_retry.
         """
+        results: List[Optional[Dict]] = [None] * len(contacts)
         
-        enriched_contacts = []
-        
+        # Cache key -> positions, so a person listed twice is only paid for once
+        pending: Dict[str, List[int]] = {}
+        details: Dict[str, Dict] = {}
         for i, contact in enumerate(contacts):
-            # Check credit limit
+            first_name = contact.get('first_name') or ''
+            last_name = contact.get('last_name') or ''
+            company = contact.get('organization_name') or ''
+            if not first_name or not last_name:
+                logger.error("Cannot enrich: missing first or last name")
+                self.failed_enrichments += 1
+                continue
+            
+            cache_key = self._cache_key(first_name, last_name, company)
+            hit, cached = self.cache.get(cache_key)
+            if hit:
+                if cached:
+                    results[i] = cached
+                else:
+                    self.failed_enrichments += 1
+                continue
+            
+            if cache_key not in details:
+                details[cache_key] = {"first_name": first_name, "last_name": last_name, "organization_name": company}
+                if contact.get('id'):
+                    details[cache_key]["id"] = contact['id']
+            pending.setdefault(cache_key, []).append(i)
+        
+        saved = len(contacts) - sum(len(positions) for positions in pending.values())
+        if saved:
+            logger.info(f"{saved} contacts served from cache or skipped (no credits used)")
+        
+        keys = list(pending)
+        start = 0
+        while start < len(keys):
+            size = batch_size
+            if max_credits:
+                size = min(size, max_credits - self.credits_used_this_session)
+                if size <= 0:
+                    logger.warning(f"Credit limit reached ({max_credits}). Stopping enrichment.")
+                    break
+            batch = keys[start:start + size]
+            start += size
+            for cache_key, person in self._match_batch(batch, details).items():
+                for i in pending[cache_key]:
+                    results[i] = person
+        
+        return results
+    
+    def _match_batch(self, keys: List[str], details: Dict[str, Dict], max_retries: int = 3) -> Dict[str, Optional[Dict]]:
+        """Match one batch, retrying while throttled and splitting it if it fails"""
+        matches = None
+        for attempt in range(max_retries):
+            if attempt > 0:
+                metrics.inc("lead_agent_http_retries_total", provider="apollo", endpoint="/api/v1/people/bulk_match")
+            matches, status = self._bulk_match([details[key] for key in keys])
+            # Only a 429 is worth repeating as-is; the limiter has already slowed down
+            if matches is not None or status != 429:
+                break
+        
+        if matches is None:
+            if len(keys) == 1:
+                detail = details[keys[0]]
+                return {keys[0]: self.enrich_with_retry(detail['first_name'], detail['last_name'],
+                                                        detail['organization_name'])}
+            middle = len(keys) // 2
+            logger.warning(f"Bulk match of {len(keys)} contacts failed, retrying in halves")
+            metrics.inc("lead_agent_http_retries_total", provider="apollo", endpoint="/api/v1/people/bulk_match")
+            results = self._match_batch(keys[:middle], details, max_retries)
+            results.update(self._match_batch(keys[middle:], details, max_retries))
+            return results
+        
+        results = {}
+        for cache_key, person in zip(keys, matches):
+            detail = details[cache_key]
+            name = f"{detail['first_name']} {detail['last_name']}"
+            email = person.get('email') if isinstance(person, dict) else None
+            if not person:
+                logger.warning(f"Contact not found: {name}")
+                self.cache.put_negative(cache_key)
+                self.failed_enrichments += 1
+                results[cache_key] = None
+            elif not email or not self.validate_email(email):
+                logger.warning(f"Enrichment returned invalid email for {name}")
+                self._reject_enriched(cache_key, email)
+                results[cache_key] = None
+            else:
+                self.add_to_cache(cache_key, person)
+                self.credits_used_this_session += 1
+                self.successful_enrichments += 1
+                logger.info(f"✓ Enriched: {name} - {email}")
+                results[cache_key] = person
+        return results
+    
+    def _bulk_match(self, details: List[Dict]) -> Tuple[Optional[List], Optional[int]]:
+        """
+        One people/bulk_match call; returns (matches in request order, status code)
+        matches is None if the call failed or the response cannot be mapped back
+        """
+        payload = {
+            "api_key": self.api_key,
+            "details": details,
+            "reveal_personal_emails": True
+        }
+        
+        try:
+            with metrics.timer("lead_agent_stage_duration_seconds", stage="enrich_bulk"):
+                response = self.http.post(
+                    APOLLO_BULK_MATCH_URL,
+                    headers=self.headers,
+                    json=payload,
+                    timeout=30,
+                    provider="apollo"
+                )
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Bulk match error: {e}")
+            return None, None
+        
+        if response.status_code != 200:
+            logger.error(f"Bulk match failed with status {response.status_code}: {response.text}")
+            return None, response.status_code
+        
+        try:
+            matches = response.json().get('matches')
+        except ValueError:
+            matches = None
+        if not isinstance(matches, list) or len(matches) != len(details):
+            logger.error(f"Bulk match returned an unexpected response for {len(details)} contacts")
+            return None, response.status_code
+        return matches, response.status_code
+    
+    def batch_enrich_safe(self, contacts: List[Dict], max_credits: int = None, bulk: bool = True) -> List[Dict]:
+        """
+        Safely enrich a batch of contacts with credit limit
+        Stops if max_credits is reached. With bulk, contacts without a valid email
+        are enriched BULK_MATCH_SIZE at a time through people/bulk_match.
+        """
+        return list(self.iter_enrich_safe(contacts, max_credits=max_credits, bulk=bulk))
+    
+    def iter_enrich_safe(self, contacts: Iterable[Dict], max_credits: int = None, bulk: bool = True) -> Iterator[Dict]:
+        """
+        Lazily enrich a stream of contacts, yielding enriched contacts in input order
+        Only a small window of contacts (at most one bulk batch of hidden emails)
+        is held at a time, so any number of contacts can be streamed through.
+        Stops if max_credits is reached.
+        """
+        window: List[Tuple[Dict, str]] = []
+        hidden = 0
+        
+        for contact in contacts:
             if max_credits and self.credits_used_this_session >= max_credits:
                 logger.warning(f"Credit limit reached ({max_credits}). Stopping enrichment.")
                 break
             
-            # Extract contact info
-            first_name = contact.get('first_name', '')
-            last_name = contact.get('last_name', '')
-            company = contact.get('organization_name', '')
-            
-            # Skip if already has valid email
-            existing_email = contact.get('email')
-            if existing_email and self.validate_email(existing_email):
-                logger.info(f"Contact already has valid email: {existing_email}")
-                enriched_contacts.append(contact)
+            verdict = self.validator.check(contact.get('email'))
+            if verdict not in (VALID, MISSING):
+                # Apollo already gave an address we would not send to; revealing another costs a credit
+                logger.debug(f"Skipping {contact.get('name', 'Unknown')}: email rejected ({verdict})")
+                self.emails_rejected += 1
                 continue
             
-            # Enrich with retry
-            enriched = self.enrich_with_retry(first_name, last_name, company)
+            if not bulk:
+                enriched = contact if verdict == VALID else self._enrich_contact(contact)
+                if enriched:
+                    yield enriched
+                continue
             
-            if enriched:
-                enriched_contacts.append(enriched)
+            window.append((contact, verdict))
+            if verdict == MISSING:
+                hidden += 1
+            if hidden >= BULK_MATCH_SIZE or len(window) >= ENRICH_WINDOW_SIZE:
+                yield from self._enrich_window(window, max_credits)
+                window, hidden = [], 0
+        
+        if window:
+            yield from self._enrich_window(window, max_credits)
+    
+    def _enrich_window(self, window: List[Tuple[Dict, str]], max_credits: Optional[int]) -> Iterator[Dict]:
+        """Bulk enrich the hidden emails in window ((contact, verdict) pairs), then yield the window in order"""
+        missing = [contact for contact, verdict in window if verdict == MISSING]
+        enriched = iter(self.bulk_enrich(missing, max_credits=max_credits) if missing else [])
+        for contact, verdict in window:
+            if verdict == VALID:
+                yield contact
+                continue
+            person = next(enriched)
+            if person:
+                yield person
             else:
-                logger.warning(f"Failed to enrich {first_name} {last_name}")
-            
-            # Rate limiting: small delay between calls
-            if i < len(contacts) - 1:
-                time.sleep(0.5)
+                logger.warning(f"Failed to enrich {contact.get('first_name', '')} {contact.get('last_name', '')}")
+    
+    def _enrich_contact(self, contact: Dict) -> Optional[Dict]:
+        """Enrich one contact through people/match (None if it failed)"""
+        first_name = contact.get('first_name', '')
+        last_name = contact.get('last_name', '')
+        company = contact.get('organization_name', '')
+        
+        # Skip if already has valid email
+        existing_email = contact.get('email')
+        if existing_email and self.validate_email(existing_email):
+            logger.info(f"Contact already has valid email: {existing_email}")
+            return contact
         
-        return enriched_contacts
+        # Enrich with retry
+        enriched = self.enrich_with_retry(first_name, last_name, company)
+        if not enriched:
+            logger.warning(f"Failed to enrich {first_name} {last_name}")
+        return enriched
     
     def get_session_stats(self) -> Dict:
         """Get statistics for this session"""
@@ -295,7 +561,8 @@ class CreditSafeApolloManager:
             "credits_used": self.credits_used_this_session,
             "successful_enrichments": self.successful_enrichments,
             "failed_enrichments": self.failed_enrichments,
-            "cache_size": len(self.cache),
+            "emails_rejected": self.emails_rejected,
+            **self.cache.get_stats(),
             "success_rate": f"{(self.successful_enrichments / max(1, self.successful_enrichments + self.failed_enrichments) * 100):.1f}%"
         }
 
@@ -304,8 +571,11 @@ class CreditSafeApolloManager:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
-    # Initialize manager
-    apollo = CreditSafeApolloManager(api_key="YOUR_API_KEY")
+    # Initialize manager (results cached on disk across runs)
+    apollo = CreditSafeApolloManager(
+        api_key="YOUR_API_KEY",
+        cache=EnrichmentCache("enrichment_cache.db")
+    )
     
     # Search with validation
     contacts = apollo.search_with_validation(
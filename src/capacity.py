@@ -0,0 +1,146 @@
+"""
+Sending Capacity
+How many campaign emails the mailboxes can really send, today and on later days
+
+Key Features:
+1. Each account's age comes from its creation date: Instantly's timestamp_created,
+   the time the agent created it (run journal), or the time the account mirror
+   first saw it. Accounts that were already there at the mirror's first sync
+   predate the agent's records and count as fully warmed up.
+2. New accounts send nothing to the campaign while they warm up (warmup_days),
+   then ramp up linearly to emails_per_day over ramp_days
+3. Only connected accounts that are in the campaign count
+4. Projections include accounts that are not created yet (accounts_per_day until
+   target_accounts), so the days until full capacity include their warmup too
+"""
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from account_mirror import AccountMirror, CAMPAIGN, INFRAMAIL, INSTANTLY
+
+logger = logging.getLogger(__name__)
+
+MAX_PROJECTION_DAYS = 365
+
+# Creation date given to accounts older than the mirror: always past warmup and ramp
+ESTABLISHED = date.min
+
+
+def _parse_timestamp(value) -> Optional[float]:
+    """Epoch seconds from an ISO 8601 string (or a number), None if unreadable"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def campaign_account_dates(mirror: AccountMirror, created: Optional[Dict[str, str]] = None) -> List[date]:
+    """
+    Creation date of every connected account in the campaign, from the local mirror
+    created: {email: local ISO timestamp} of accounts the agent created (RunJournal.history(ACCOUNT_CREATED))
+    """
+    created = {email: datetime.fromisoformat(at).timestamp() for email, at in (created or {}).items()}
+    instantly = {record["email"]: record for record in mirror.records(INSTANTLY)}
+    first_seen = {record["email"]: record["first_seen"] for record in mirror.records(INFRAMAIL)}
+    first_synced = [mirror.first_synced_at(source) for source in (INFRAMAIL, INSTANTLY)]
+    dates = []
+    for record in mirror.records(CAMPAIGN):
+        email = record["email"]
+        account = instantly.get(email)
+        if account is None:
+            continue
+        when = _parse_timestamp(account["data"].get("timestamp_created")) or created.get(email)
+        if when is None:
+            seen = (first_seen.get(email), account["first_seen"])
+            if any(at is not None and synced is not None and at <= synced for at, synced in zip(seen, first_synced)):
+                dates.append(ESTABLISHED)
+                continue
+            when = min(at for at in seen if at is not None)
+        dates.append(datetime.fromtimestamp(when).date())
+    return dates
+
+
+class CapacityModel:
+    """Warmup-aware projection of daily sendable campaign volume"""
+
+    def __init__(self,
+                 emails_per_day: int,
+                 warmup_days: int = 0,
+                 ramp_days: int = 0,
+                 accounts_per_day: int = 0,
+                 target_accounts: int = 0):
+        self.emails_per_day = emails_per_day
+        self.warmup_days = max(0, warmup_days)
+        self.ramp_days = max(0, ramp_days)
+        self.accounts_per_day = max(0, accounts_per_day)
+        self.target_accounts = target_accounts
+
+    def per_account(self, age_days: int) -> int:
+        """Campaign emails one account can send on the given day of its life (day 0 = created)"""
+        if age_days < self.warmup_days:
+            return 0
+        ramped = age_days - self.warmup_days + 1
+        if ramped > self.ramp_days:
+            return self.emails_per_day
+        return -(-self.emails_per_day * ramped // (self.ramp_days + 1))
+
+    def daily_capacity(self, created: Iterable[date], on: Optional[date] = None) -> int:
+        """Emails the accounts created on the given dates can send on day on (default today)"""
+        on = on or date.today()
+        return sum(self.per_account((on - day).days) for day in created)
+
+    def planned_accounts(self, existing: int, start: Optional[date] = None,
+                         days: int = MAX_PROJECTION_DAYS) -> List[date]:
+        """Creation dates of the accounts still to be created, from start on, at accounts_per_day"""
+        start = start or date.today()
+        left = max(0, self.target_accounts - existing)
+        if not self.accounts_per_day:
+            return []
+        planned = []
+        for offset in range(days):
+            batch = min(self.accounts_per_day, left)
+            if batch <= 0:
+                break
+            planned.extend([start + timedelta(days=offset)] * batch)
+            left -= batch
+        return planned
+
+    def project(self, created: Iterable[date], existing: int, days: int = 30,
+                start: Optional[date] = None) -> List[Tuple[date, int]]:
+        """
+        Sendable volume for each of the next days, with the accounts still to be created
+        existing: accounts that already count against target_accounts (e.g. all Inframail mailboxes)
+        """
+        start = start or date.today()
+        accounts = list(created) + self.planned_accounts(existing, start, days)
+        return [(start + timedelta(days=offset), self.daily_capacity(accounts, start + timedelta(days=offset)))
+                for offset in range(days)]
+
+    def days_to_full_capacity(self, created: Iterable[date], existing: int,
+                              start: Optional[date] = None) -> Optional[int]:
+        """Days until target_accounts * emails_per_day can be sent (0 = today), None if never"""
+        full = self.target_accounts * self.emails_per_day
+        for offset, (_, volume) in enumerate(self.project(created, existing, MAX_PROJECTION_DAYS, start)):
+            if volume >= full:
+                return offset
+        return None
+
+    def get_stats(self, created: Iterable[date], existing: int) -> Dict:
+        created = list(created)
+        today = date.today()
+        return {
+            "daily_capacity": self.daily_capacity(created, today),
+            "warming_up": sum(1 for day in created if self.per_account((today - day).days) < self.emails_per_day),
+            "days_to_full_capacity": self.days_to_full_capacity(created, existing, today),
+            "projection": [{"date": day.isoformat(), "emails": volume}
+                           for day, volume in self.project(created, existing, 14, today)]
+        }
@@ -0,0 +1,184 @@
+"""
+Circuit Breakers
+Fail fast while an upstream endpoint is down instead of waiting on every call
+
+Key Features:
+1. One breaker per provider and endpoint (Apollo search and enrichment trip separately)
+2. Closed -> open after failure_threshold consecutive failures (timeouts,
+   connection errors, 5xx responses); 429s are left to the rate limiter
+3. While open, calls raise CircuitOpenError at once, without touching the network
+4. After probe_interval seconds one probe call is let through (half-open): success
+   closes the breaker, failure opens it again for twice as long (up to max_probe_interval)
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from metrics import endpoint_label
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric states for metrics gauges
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_PROBE_INTERVAL = 30.0
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the endpoint's breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit {name} is open (next probe in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_failure(status_code: int) -> bool:
+    """Responses that count against the breaker (server errors; 429 is throttling, not an outage)"""
+    return status_code >= 500
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one endpoint"""
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 max_probe_interval: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.probe_interval = float(probe_interval)
+        self.max_probe_interval = max_probe_interval if max_probe_interval is not None else self.probe_interval * 8
+
+        self.state = CLOSED
+        self.failures = 0
+        self._open_for = self.probe_interval
+        self._probe_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN and now >= self._probe_at:
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe that never reported back is given up on after an interval
+                if self._probe_started is None or now - self._probe_started >= self._open_for:
+                    self._probe_started = now
+                    return
+            self.rejected += 1
+            retry_in = max(0.0, self._probe_at - now)
+        raise CircuitOpenError(self.name, retry_in)
+
+    def on_success(self):
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self._open_for = self.probe_interval
+            self._probe_started = None
+        if recovered:
+            logger.info(f"[{self.name}] Circuit closed: probe succeeded")
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._open_for = min(self.max_probe_interval, self._open_for * 2)
+            elif self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened += 1
+            self._probe_started = None
+            self._probe_at = time.monotonic() + self._open_for
+            open_for = self._open_for
+        logger.warning(f"[{self.name}] Circuit open after {self.failures} failures; next probe in {open_for:.0f}s")
+
+    def on_response(self, status_code: int):
+        if is_failure(status_code):
+            self.on_failure()
+        else:
+            self.on_success()
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open and not yet due for a probe)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() < self._probe_at
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            retry_in = max(0.0, self._probe_at - time.monotonic()) if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in": round(retry_in, 1)
+            }
+
+
+# Process-wide breakers, one per (provider, endpoint)
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_settings: Dict[str, Dict] = {}
+_breakers_lock = threading.Lock()
+
+
+def configure_breaker(provider: str,
+                      failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                      probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                      max_probe_interval: Optional[float] = None):
+    """Set the thresholds for a provider's breakers (resets its existing breakers)"""
+    with _breakers_lock:
+        _settings[provider] = {"failure_threshold": failure_threshold, "probe_interval": probe_interval,
+                               "max_probe_interval": max_probe_interval}
+        for key in [key for key in _breakers if key[0] == provider]:
+            del _breakers[key]
+
+
+def get_breaker(provider: str, endpoint: str) -> CircuitBreaker:
+    """Get the shared breaker for a provider's endpoint (see metrics.endpoint_label)"""
+    key = (provider, endpoint)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(f"{provider} {endpoint}", **_settings.get(provider, {}))
+                _breakers[key] = breaker
+    return breaker
+
+
+def get_state(provider: str, url: str) -> str:
+    """State of the breaker for this provider and URL (closed if it was never used)"""
+    breaker = _breakers.get((provider, endpoint_label(url)))
+    return breaker.state if breaker is not None else CLOSED
+
+
+def is_open(provider: str, url: str) -> bool:
+    """True while the breaker for this provider and URL rejects calls"""
+    breaker = _breakers.get((provider, endpoint_label(url)))
+    return breaker is not None and breaker.is_open()
+
+
+def get_all_breaker_stats() -> List[Dict]:
+    """Statistics for every breaker in this process"""
+    return [{"provider": provider, "endpoint": endpoint, **breaker.get_stats()}
+            for (provider, endpoint), breaker in sorted(_breakers.items())]
@@ -5,12 +5,24 @@ Beautiful web interface to watch your autonomous agent work
 Access at: http://31.97.145.136:8080
 """
 
-from flask import Flask, render_template, jsonify
-import requests
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 import os
 
+from account_mirror import (AccountMirror, CAMPAIGN, INFRAMAIL, INSTANTLY,
+                            campaign_fetcher, inframail_fetcher, instantly_accounts_fetcher)
+from capacity import CapacityModel, campaign_account_dates
+from circuit_breaker import STATE_VALUES
+from http_transport import configure_transport
+from log_tail import read_since, readable_lines, tail_lines, find_latest_log
+from metrics import read_snapshot, render_prometheus, registry as metrics
+
 app = Flask(__name__)
 
 # API Keys
@@ -22,78 +34,231 @@ INFRAMAIL_PROFILE_ID = "2b25dd6a-7c8a-42ba-aabf-23780350b865"
 INFRAMAIL_HOST_ORDER_ID = "1755058187025"
 INSTANTLY_CAMPAIGN_ID = "1dfdc50b-465a-4cea-8a33-d80ef0a3e010"
 
+# Agent logs (daily agent_YYYYMMDD.log files written by agent.py)
+LOG_DIR = '/opt/lead_agent/logs'
+LOG_STREAM_POLL_INTERVAL = 1  # Seconds between checks for new log lines
+
+# Metrics snapshot exported by agent.py (DATA_DIR/metrics.json)
+METRICS_FILE = '/opt/lead_agent/data/metrics.json'
+
+# Account lists mirrored locally, shared with agent.py (DATA_DIR/account_mirror.db)
+ACCOUNT_MIRROR_FILE = '/opt/lead_agent/data/account_mirror.db'
+
+# /api/accounts pages (?limit= is capped at ACCOUNTS_MAX_PAGE_SIZE)
+ACCOUNTS_PAGE_SIZE = 100
+ACCOUNTS_MAX_PAGE_SIZE = 500
+
+# Ramp schedule (same values as agent.py), for the warmup-aware capacity model
+EMAILS_PER_ACCOUNT_PER_DAY = 20
+ACCOUNTS_TO_CREATE_PER_DAY = 20
+TARGET_TOTAL_ACCOUNTS = 100
+WARMUP_DAYS = 14
+SENDING_RAMP_DAYS = 7
+
+capacity = CapacityModel(
+    EMAILS_PER_ACCOUNT_PER_DAY,
+    warmup_days=WARMUP_DAYS,
+    ramp_days=SENDING_RAMP_DAYS,
+    accounts_per_day=ACCOUNTS_TO_CREATE_PER_DAY,
+    target_accounts=TARGET_TOTAL_ACCOUNTS
+)
+
+# Pooled keep-alive connections with a default timeout on every upstream call
+HTTP_TIMEOUT = 10
+transport = configure_transport(pool_maxsize=4, timeout=HTTP_TIMEOUT)
+
+# ============================================================================
+# STATS SNAPSHOT
+# ============================================================================
+
+STATS_REFRESH_INTERVAL = 30  # Seconds between background refreshes
+
+mirror = AccountMirror(ACCOUNT_MIRROR_FILE, fetchers={
+    INFRAMAIL: inframail_fetcher(
+        transport,
+        f"https://app.inframail.io/api/v1/host/operations/email?hostOrderId={INFRAMAIL_HOST_ORDER_ID}&customerId={INFRAMAIL_CUSTOMER_ID}&profileId={INFRAMAIL_PROFILE_ID}",
+        {"x-api-key": INFRAMAIL_API_KEY}
+    ),
+    INSTANTLY: instantly_accounts_fetcher(
+        transport,
+        "https://api.instantly.ai/api/v2/accounts",
+        {"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
+    ),
+    CAMPAIGN: campaign_fetcher(
+        transport,
+        f"https://api.instantly.ai/api/v2/campaigns/{INSTANTLY_CAMPAIGN_ID}",
+        {"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
+    ),
+})
+
+
+def mirrored_count(source: str) -> int:
+    # Skipped if the agent (or an earlier refresh) synced recently; otherwise a conditional fetch
+    mirror.sync(source, max_age=STATS_REFRESH_INTERVAL / 2)
+    return mirror.count(source)
+
+
+def fetch_inframail_count() -> int:
+    return mirrored_count(INFRAMAIL)
+
+
+def fetch_instantly_count() -> int:
+    return mirrored_count(INSTANTLY)
+
+
+def fetch_campaign_accounts() -> int:
+    return mirrored_count(CAMPAIGN)
+
+
+def fetch_campaign_stats() -> dict:
+    response = transport.get(
+        f"https://api.instantly.ai/api/v2/campaigns/analytics?campaign_id={INSTANTLY_CAMPAIGN_ID}",
+        headers={"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
+    )
+    response.raise_for_status()
+    data = response.json()
+    if not data:
+        return {}
+    return data[0] if isinstance(data, list) else data
+
+
+class StatsSnapshot:
+    """
+    Upstream stats refreshed in the background and served from memory
+    All sources are fetched in parallel. A source that fails keeps its last good
+    value (marked stale) instead of dropping to zero.
+    """
+    
+    SOURCES = {
+        'inframail_accounts': (fetch_inframail_count, 0),
+        'instantly_accounts': (fetch_instantly_count, 0),
+        'campaign_accounts': (fetch_campaign_accounts, 0),
+        'campaign_stats': (fetch_campaign_stats, {}),
+    }
+    
+    def __init__(self, interval: float = STATS_REFRESH_INTERVAL):
+        self.interval = interval
+        self.values = {}
+        self.fetched_at = {}
+        self.errors = {}
+        self._refresh_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.SOURCES))
+        self._thread = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+    
+    def _fetch(self, name: str, fetcher):
+        try:
+            value = fetcher()
+        except Exception as e:
+            self.errors[name] = str(e)
+            return
+        self.values[name] = value
+        self.fetched_at[name] = time.time()
+        self.errors.pop(name, None)
+    
+    def refresh(self):
+        """Fetch every source in parallel"""
+        with self._refresh_lock:
+            futures = [self._executor.submit(self._fetch, name, fetcher)
+                       for name, (fetcher, _) in self.SOURCES.items()]
+            for future in futures:
+                future.result()
+        self._ready.set()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+    
+    def start(self):
+        """Start the background refresher (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stats-refresher", daemon=True)
+            self._thread.start()
+    
+    def get(self) -> dict:
+        """Current snapshot; waits for the first fetch only if nothing has been fetched yet"""
+        self.start()
+        if not self._ready.is_set():
+            # The refresher fetches immediately on start; share that fetch
+            self._ready.wait(timeout=HTTP_TIMEOUT * 2)
+        
+        now = time.time()
+        data = {name: self.values.get(name, default) for name, (_, default) in self.SOURCES.items()}
+        ages = {name: round(now - at, 1) for name, at in self.fetched_at.items()}
+        data['snapshot'] = {
+            'age_seconds': max(ages.values()) if ages else None,
+            'source_age_seconds': ages,
+            'stale_sources': sorted(set(self.errors) | (set(self.SOURCES) - set(self.fetched_at))),
+            'errors': dict(self.errors)
+        }
+        return data
+
+
+snapshot = StatsSnapshot()
+
+# ============================================================================
+# AGENT HEALTH
+# ============================================================================
+
+CIRCUIT_STATES = {value: state for state, value in STATE_VALUES.items()}
+
+
+def agent_health() -> dict:
+    """Circuit breaker states and deferred work from the agent's latest metrics snapshot"""
+    agent_snapshot = read_snapshot(METRICS_FILE) or {}
+    gauges = agent_snapshot.get('gauges', {})
+    
+    def by_endpoint(name):
+        return {(labels['provider'], labels['endpoint']): value for labels, value in gauges.get(name, [])}
+    
+    retry_in = by_endpoint('lead_agent_circuit_retry_seconds')
+    rejected = by_endpoint('lead_agent_circuit_rejected')
+    circuits = [{
+        'provider': labels['provider'],
+        'endpoint': labels['endpoint'],
+        'state': CIRCUIT_STATES.get(int(value), 'closed'),
+        'retry_in': retry_in.get((labels['provider'], labels['endpoint']), 0),
+        'rejected': int(rejected.get((labels['provider'], labels['endpoint']), 0))
+    } for labels, value in gauges.get('lead_agent_circuit_state', [])]
+    
+    return {
+        'circuits': sorted(circuits, key=lambda c: (c['provider'], c['endpoint'])),
+        'deferred': {labels['kind']: int(value) for labels, value in gauges.get('lead_agent_deferred_work', [])},
+        'age_seconds': round(time.time() - agent_snapshot['generated_at'], 1) if agent_snapshot else None
+    }
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
 @app.route('/')
 def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/api/stats')
 def get_stats():
-    """Get real-time stats from all systems"""
+    """Get stats from all systems (served from the background snapshot)"""
     
-    # Get Inframail accounts
-    inframail_count = 0
-    try:
-        response = requests.get(
-            f"https://app.inframail.io/api/v1/host/operations/email?hostOrderId={INFRAMAIL_HOST_ORDER_ID}&customerId={INFRAMAIL_CUSTOMER_ID}&profileId={INFRAMAIL_PROFILE_ID}",
-            headers={"x-api-key": INFRAMAIL_API_KEY}
-        )
-        if response.status_code == 200:
-            inframail_count = len(response.json().get('emails', []))
-    except:
-        pass
-    
-    # Get Instantly accounts
-    instantly_count = 0
-    try:
-        response = requests.get(
-            "https://api.instantly.ai/api/v2/accounts",
-            headers={"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
-        )
-        if response.status_code == 200:
-            instantly_count = len(response.json())
-    except:
-        pass
-    
-    # Get campaign accounts
-    campaign_accounts = 0
-    try:
-        response = requests.get(
-            f"https://api.instantly.ai/api/v2/campaigns/{INSTANTLY_CAMPAIGN_ID}",
-            headers={"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
-        )
-        if response.status_code == 200:
-            campaign_accounts = len(response.json().get('email_list', []))
-    except:
-        pass
-    
-    # Get campaign analytics
-    campaign_stats = {}
-    try:
-        response = requests.get(
-            f"https://api.instantly.ai/api/v2/campaigns/analytics?campaign_id={INSTANTLY_CAMPAIGN_ID}",
-            headers={"Authorization": f"Bearer {INSTANTLY_API_KEY}"}
-        )
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                campaign_stats = data[0] if isinstance(data, list) else data
-    except:
-        pass
-    
-    # Read latest log
+    stats = snapshot.get()
+    inframail_count = stats['inframail_accounts']
+    instantly_count = stats['instantly_accounts']
+    campaign_accounts = stats['campaign_accounts']
+    campaign_stats = stats['campaign_stats']
+    
+    # Read latest log (seeks from the end instead of reading the whole file)
     log_lines = []
-    log_file = '/root/lead_agent/logs/with_campaign_assignment.log'
-    if os.path.exists(log_file):
+    log_file = find_latest_log(LOG_DIR)
+    if log_file:
         try:
-            with open(log_file, 'r') as f:
-                log_lines = f.readlines()[-50:]  # Last 50 lines
-        except:
+            log_lines = readable_lines(tail_lines(log_file, 50))  # Last 50 lines
+        except OSError:
             pass
     
-    # Calculate stats
-    daily_capacity = campaign_accounts * 20
-    accounts_to_create = max(0, 100 - inframail_count)
-    days_to_2k = max(1, (accounts_to_create + 19) // 20)  # Round up
+    # Sendable volume from the mirrored campaign accounts, their age and warmup
+    capacity_stats = capacity.get_stats(campaign_account_dates(mirror), inframail_count)
+    accounts_to_create = max(0, TARGET_TOTAL_ACCOUNTS - inframail_count)
     
     return jsonify({
         'timestamp': datetime.now().isoformat(),
@@ -101,10 +266,12 @@ def get_stats():
             'inframail_accounts': inframail_count,
             'instantly_accounts': instantly_count,
             'campaign_accounts': campaign_accounts,
-            'daily_capacity': daily_capacity,
-            'target_accounts': 100,
+            'daily_capacity': capacity_stats['daily_capacity'],
+            'warming_up': capacity_stats['warming_up'],
+            'target_accounts': TARGET_TOTAL_ACCOUNTS,
             'accounts_remaining': accounts_to_create,
-            'days_to_2k': days_to_2k
+            'days_to_2k': capacity_stats['days_to_full_capacity'],
+            'capacity_projection': capacity_stats['projection']
         },
         'campaign': {
             'sent': campaign_stats.get('sent', 0),
@@ -116,31 +283,99 @@ def get_stats():
             'open_rate': round(campaign_stats.get('open_rate', 0) * 100, 1) if campaign_stats.get('open_rate') else 0,
             'reply_rate': round(campaign_stats.get('reply_rate', 0) * 100, 1) if campaign_stats.get('reply_rate') else 0
         },
-        'recent_activity': [line.strip() for line in log_lines if line.strip()]
+        'recent_activity': [line.strip() for line in log_lines if line.strip()],
+        'snapshot': stats['snapshot'],
+        'mirror': mirror.get_stats(),
+        'health': agent_health(),
+        'transport': transport.get_pool_stats()
     })
 
+@app.route('/api/logs')
+def get_logs():
+    """New log lines since ?cursor= (the last 50 lines if no cursor is given)"""
+    lines, cursor = read_since(LOG_DIR, request.args.get('cursor'))
+    return jsonify({'lines': readable_lines(lines), 'cursor': cursor})
+
+@app.route('/api/logs/stream')
+def stream_logs():
+    """Server-Sent Events stream of new log lines; resumes from Last-Event-ID"""
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    
+    def generate(cursor):
+        while True:
+            lines, cursor = read_since(LOG_DIR, cursor)
+            if lines:
+                payload = json.dumps({'lines': readable_lines(lines)})
+                yield f"id: {cursor}\ndata: {payload}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(LOG_STREAM_POLL_INTERVAL)
+    
+    return Response(stream_with_context(generate(cursor)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics: the agent's latest snapshot plus the dashboard's own calls"""
+    snapshots = [(metrics.snapshot(), {'process': 'dashboard'})]
+    agent_snapshot = read_snapshot(METRICS_FILE)
+    if agent_snapshot is not None:
+        age = max(0.0, time.time() - agent_snapshot.get('generated_at', 0))
+        agent_snapshot.setdefault('gauges', {})['lead_agent_metrics_snapshot_age_seconds'] = [[{}, round(age, 1)]]
+        snapshots.append((agent_snapshot, {'process': 'agent'}))
+    return Response(render_prometheus(snapshots), mimetype='text/plain; version=0.0.4')
+
+def int_arg(name: str, default: int, minimum: int, maximum: Optional[int] = None) -> int:
+    """Integer query parameter clamped to [minimum, maximum]; raises ValueError if not a number"""
+    value = int(request.args.get(name, default))
+    value = max(minimum, value)
+    return min(value, maximum) if maximum is not None else value
+
 @app.route('/api/accounts')
 def get_accounts():
-    """Get list of all email accounts"""
-    accounts = []
-    
+    """
+    One page of email accounts, filtered by ?domain= and ?status=, with per-domain counts
+    Served from the local mirror (kept fresh by the stats refresher). The ETag follows the
+    mirror's revision, so an unchanged list is answered with 304 and no body.
+    """
     try:
-        response = requests.get(
-            f"https://app.inframail.io/api/v1/host/operations/email?hostOrderId={INFRAMAIL_HOST_ORDER_ID}&customerId={INFRAMAIL_CUSTOMER_ID}&profileId={INFRAMAIL_PROFILE_ID}",
-            headers={"x-api-key": INFRAMAIL_API_KEY}
-        )
-        if response.status_code == 200:
-            emails = response.json().get('emails', [])
-            accounts = [{'email': e['email'], 'domain': e['email'].split('@')[1]} for e in emails]
-    except:
-        pass
-    
-    return jsonify({'accounts': accounts})
+        page = int_arg('page', 1, 1)
+        limit = int_arg('limit', ACCOUNTS_PAGE_SIZE, 1, ACCOUNTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'page and limit must be integers'}), 400
+    domain = (request.args.get('domain') or '').strip().lower() or None
+    status = request.args.get('status') or None
+    
+    snapshot.get()
+    query = json.dumps([page, limit, domain, status])
+    etag = f"{mirror.revision(INFRAMAIL)}-{hashlib.sha1(query.encode()).hexdigest()[:12]}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    domains = mirror.count_by_domain(INFRAMAIL, status)
+    total = domains.get(domain, 0) if domain else sum(domains.values())
+    accounts = mirror.accounts(INFRAMAIL, domain, status, offset=(page - 1) * limit, limit=limit)
+    response = jsonify({
+        'accounts': [{'email': a['email'], 'status': a['status']} for a in accounts],
+        'page': page,
+        'limit': limit,
+        'total': total,
+        'pages': -(-total // limit),
+        'domains': domains
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 if __name__ == '__main__':
     # Create templates directory
     os.makedirs('templates', exist_ok=True)
     
+    # Keep upstream stats warm so page loads never wait on the APIs
+    snapshot.start()
+    
     # Run on all interfaces so it's accessible from outside
     app.run(host='0.0.0.0', port=8080, debug=False)
 
@@ -0,0 +1,102 @@
+"""
+Deferred Work
+Work put aside while an upstream was unavailable, kept for a later run
+
+When a circuit breaker fails a call fast, the work it would have done is
+parked here instead of being dropped. For example, a lead whose email was
+already paid for but could not be pushed to Instantly. The next run leases it
+back out before doing anything new, and deletes it only once it was pushed;
+if the run dies first, the lease runs out and the item is offered again.
+Items are stored by kind and key, e.g. ("lead_push", email), so deferring the
+same item twice keeps one copy.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+LEAD_PUSH = "lead_push"
+
+DEFAULT_LEASE_TTL = 600  # Seconds before an item leased by a run that died is offered again
+
+
+class DeferredQueue:
+    """Durable FIFO of deferred work items, shared by every worker"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deferred_work (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                deferred_at REAL NOT NULL,
+                leased_until REAL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(deferred_work)")}
+        if "leased_until" not in columns:
+            self._conn.execute("ALTER TABLE deferred_work ADD COLUMN leased_until REAL")
+
+    def defer(self, kind: str, key: str, data: Optional[Dict] = None):
+        """Park an item for later (counts another attempt if it is already parked)"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO deferred_work (kind, key, data, deferred_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(kind, key) DO UPDATE SET
+                       data = excluded.data, attempts = attempts + 1, leased_until = NULL""",
+                (kind, key, json.dumps(data) if data is not None else None, time.time())
+            )
+
+    def lease(self, kind: str, limit: int, ttl: float = DEFAULT_LEASE_TTL) -> List[Tuple[str, Optional[Dict], int]]:
+        """
+        Lease up to limit of the oldest unleased items of a kind, as (key, data, attempts)
+        Leased items stay stored but are not offered again for ttl seconds. Call
+        complete() once an item is done, or defer() it again if it failed.
+        """
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """SELECT key, data, attempts FROM deferred_work
+                       WHERE kind = ? AND (leased_until IS NULL OR leased_until < ?)
+                       ORDER BY deferred_at LIMIT ?""",
+                    (kind, now, limit)
+                ).fetchall()
+                self._conn.executemany("UPDATE deferred_work SET leased_until = ? WHERE kind = ? AND key = ?",
+                                       [(now + ttl, kind, key) for key, _, _ in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [(key, json.loads(data) if data else None, attempts) for key, data, attempts in rows]
+
+    def complete(self, kind: str, keys: List[str]):
+        """Delete items that are done"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM deferred_work WHERE kind = ? AND key = ?",
+                                   [(kind, key) for key in keys])
+
+    def count(self, kind: Optional[str] = None) -> int:
+        with self._lock:
+            if kind is None:
+                return self._conn.execute("SELECT COUNT(*) FROM deferred_work").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM deferred_work WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Items waiting, by kind"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT kind, COUNT(*) FROM deferred_work GROUP BY kind").fetchall())
@@ -0,0 +1,181 @@
+"""
+Offline Email Validation
+Screens addresses before they cost an enrichment credit or a bounce, without any network calls
+
+Key Features:
+1. Stricter, RFC 5321/5322-style syntax rules (dot-atom local part, hostname labels, length limits)
+2. Disposable and free-mail domains from compiled sets, subdomains included
+3. Role accounts (info@, sales@, ...) that reach a team instead of the owner
+4. Apollo's "email_not_unlocked@domain.com" placeholder recognized as a hidden email
+5. Per-domain verdict cache, so a page of 100 people costs one domain check per company
+6. Whole batches (a search page) validated in one call
+"""
+
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Verdicts
+VALID = "valid"
+MISSING = "missing"        # No email (or a locked placeholder): enrichment may reveal one
+SYNTAX = "syntax"
+DISPOSABLE = "disposable"
+FREE_MAIL = "free_mail"
+ROLE = "role"
+
+DEFAULT_CACHE_SIZE = 100000  # Domains whose verdict is kept
+
+MAX_EMAIL_LENGTH = 254
+MAX_LOCAL_LENGTH = 64
+MAX_DOMAIN_LENGTH = 253
+
+# Unquoted dot-atom: atext runs separated by single dots
+_LOCAL_PART = re.compile(r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*$")
+# Hostname labels of 1-63 letters, digits and inner hyphens; an alphabetic (or punycode) TLD
+_DOMAIN = re.compile(r"^(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})$")
+
+# Apollo returns this instead of an email it has not revealed yet
+LOCKED_LOCAL_PARTS = frozenset({"email_not_unlocked"})
+
+DISPOSABLE_DOMAINS = frozenset({
+    "10minutemail.com", "10minutemail.net", "20minutemail.com", "33mail.com", "anonaddy.me",
+    "burnermail.io", "discard.email", "dispostable.com", "dropmail.me", "emailondeck.com",
+    "fakeinbox.com", "fakemail.net", "getairmail.com", "getnada.com", "guerrillamail.biz",
+    "guerrillamail.com", "guerrillamail.de", "guerrillamail.info", "guerrillamail.net",
+    "guerrillamail.org", "guerrillamailblock.com", "harakirimail.com", "inboxbear.com",
+    "incognitomail.org", "jetable.org", "mailcatch.com", "maildrop.cc", "mailexpire.com",
+    "mailinator.com", "mailinator.net", "mailinator2.com", "mailnesia.com", "mailnull.com",
+    "mailsac.com", "mailtemp.net", "mintemail.com", "mohmal.com", "moakt.com", "mvrht.com",
+    "mytemp.email", "mytrashmail.com", "nada.email", "sharklasers.com", "spam4.me",
+    "spambog.com", "spamgourmet.com", "spamex.com", "tempail.com", "tempinbox.com",
+    "tempmail.com", "tempmail.net", "tempmail.plus", "tempmailo.com", "temp-mail.io",
+    "temp-mail.org", "tempr.email", "throwawaymail.com", "tmail.ws", "tmpmail.net",
+    "tmpmail.org", "trash-mail.com", "trashmail.com", "trashmail.de", "trashmail.me",
+    "trashmail.net", "wegwerfmail.de", "wegwerfmail.net", "yopmail.com", "yopmail.fr",
+    "yopmail.net", "zetmail.com",
+})
+
+FREE_MAIL_DOMAINS = frozenset({
+    "aim.com", "aol.com", "comcast.net", "fastmail.com", "gmail.com", "gmx.com", "gmx.de",
+    "gmx.net", "googlemail.com", "hey.com", "hotmail.co.uk", "hotmail.com", "hotmail.de",
+    "hotmail.fr", "hushmail.com", "icloud.com", "inbox.com", "live.com", "live.co.uk",
+    "mac.com", "mail.com", "mail.ru", "me.com", "msn.com", "outlook.com", "pm.me",
+    "proton.me", "protonmail.com", "qq.com", "rocketmail.com", "sbcglobal.net",
+    "tutanota.com", "verizon.net", "web.de", "yahoo.ca", "yahoo.co.uk", "yahoo.com",
+    "yahoo.de", "yahoo.fr", "yandex.com", "yandex.ru", "ymail.com", "zoho.com",
+})
+
+ROLE_ACCOUNTS = frozenset({
+    "abuse", "accounting", "accounts", "admin", "administrator", "billing", "bookings",
+    "careers", "contact", "contactus", "customercare", "customerservice", "dev", "enquiries",
+    "enquiry", "feedback", "finance", "hello", "help", "helpdesk", "hostmaster", "hr", "info",
+    "inquiries", "inquiry", "jobs", "legal", "mail", "marketing", "media", "news",
+    "newsletter", "no-reply", "noreply", "office", "orders", "postmaster", "press",
+    "privacy", "reception", "recruiting", "sales", "security", "service", "shop", "support",
+    "team", "webmaster",
+})
+
+
+class EmailValidator:
+    """Offline screening of emails, with a bounded per-domain verdict cache"""
+
+    def __init__(self,
+                 reject_role_accounts: bool = True,
+                 reject_free_mail: bool = False,
+                 disposable_domains: Iterable[str] = DISPOSABLE_DOMAINS,
+                 free_mail_domains: Iterable[str] = FREE_MAIL_DOMAINS,
+                 role_accounts: Iterable[str] = ROLE_ACCOUNTS,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.reject_role_accounts = reject_role_accounts
+        self.reject_free_mail = reject_free_mail
+        self.disposable_domains = frozenset(d.lower() for d in disposable_domains)
+        self.free_mail_domains = frozenset(d.lower() for d in free_mail_domains)
+        self.role_accounts = frozenset(r.lower() for r in role_accounts)
+        self.cache_size = cache_size
+        self._domains: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.verdicts: Counter = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _listed(self, domain: str, domains: frozenset) -> bool:
+        """domain or any parent domain (mx.mailinator.com -> mailinator.com) is in domains"""
+        while True:
+            if domain in domains:
+                return True
+            dot = domain.find(".")
+            if dot < 0:
+                return False
+            domain = domain[dot + 1:]
+
+    def _check_domain(self, domain: str) -> str:
+        if len(domain) > MAX_DOMAIN_LENGTH or not _DOMAIN.match(domain):
+            return SYNTAX
+        if self._listed(domain, self.disposable_domains):
+            return DISPOSABLE
+        if self.reject_free_mail and self._listed(domain, self.free_mail_domains):
+            return FREE_MAIL
+        return VALID
+
+    def _domain_verdict(self, domain: str) -> str:
+        with self._lock:
+            verdict = self._domains.get(domain)
+            if verdict is not None:
+                self._domains.move_to_end(domain)
+                self.cache_hits += 1
+                return verdict
+            self.cache_misses += 1
+        verdict = self._check_domain(domain)
+        with self._lock:
+            self._domains[domain] = verdict
+            if len(self._domains) > self.cache_size:
+                self._domains.popitem(last=False)
+        return verdict
+
+    def _verdict(self, email: Optional[str]) -> str:
+        if not email or not isinstance(email, str):
+            return MISSING
+        local, at, domain = email.rpartition("@")
+        if not at or not local:
+            return SYNTAX
+        if local.lower() in LOCKED_LOCAL_PARTS:
+            return MISSING
+        if len(email) > MAX_EMAIL_LENGTH or len(local) > MAX_LOCAL_LENGTH or not _LOCAL_PART.match(local):
+            return SYNTAX
+        verdict = self._domain_verdict(domain.lower())
+        if verdict != VALID:
+            return verdict
+        if self.reject_role_accounts and local.lower() in self.role_accounts:
+            return ROLE
+        return VALID
+
+    def check(self, email: Optional[str]) -> str:
+        """Verdict for one email: VALID, MISSING, or why it is rejected"""
+        verdict = self._verdict(email)
+        with self._lock:
+            self.verdicts[verdict] += 1
+        return verdict
+
+    def is_valid(self, email: Optional[str]) -> bool:
+        return self.check(email) == VALID
+
+    def validate_batch(self, emails: Iterable[Optional[str]]) -> List[str]:
+        """Verdicts for a whole batch (e.g. every email on a search page), in order"""
+        verdicts = [self._verdict(email) for email in emails]
+        with self._lock:
+            self.verdicts.update(verdicts)
+        return verdicts
+
+    def get_stats(self) -> Dict:
+        checked = sum(self.verdicts.values())
+        return {
+            "checked": checked,
+            "verdicts": dict(self.verdicts),
+            "rejected": checked - self.verdicts[VALID] - self.verdicts[MISSING],
+            "domains_cached": len(self._domains),
+            "domain_cache_hit_rate": f"{(self.cache_hits / max(1, self.cache_hits + self.cache_misses) * 100):.1f}%"
+        }
@@ -0,0 +1,173 @@
+"""
+Persistent Enrichment Cache
+Disk-backed cache of Apollo enrichment results that survives restarts
+
+Key Features:
+1. SQLite storage (WAL) shared safely between the agent and other processes
+2. TTL on every entry, with a shorter TTL for "not found" results
+3. Size cap with least-recently-used eviction, checked against an approximate
+   row count (recounted every RECOUNT_INTERVAL writes) and done in batches
+   down to EVICT_TO of the cap, so a write is not a table scan
+4. Hits only note their access time in memory; the times are written in
+   batches of TOUCH_BATCH_SIZE, so a lookup is not a write
+5. Hit / miss / eviction counters
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600           # Positive results: 30 days
+DEFAULT_NEGATIVE_TTL_SECONDS = 7 * 24 * 3600   # "Not found" results: 7 days
+DEFAULT_MAX_ENTRIES = 200000
+
+RECOUNT_INTERVAL = 1000   # Writes between exact row counts (other processes write to the same file)
+EVICT_TO = 0.9            # Eviction trims the cache to this share of max_entries
+TOUCH_BATCH_SIZE = 256    # Access times buffered before they are written
+
+
+class EnrichmentCache:
+    """TTL + LRU cache of enrichment results, keyed by first_last_company"""
+
+    def __init__(self,
+                 path: str = ":memory:",
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS enrichment_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_enrichment_cache_access ON enrichment_cache (last_access)"
+        )
+
+        self._approx_count = self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+        self._writes_since_count = 0
+        self._touched: Dict[str, float] = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Look up a key
+        Returns (hit, value): value is None on a negative ("not found") hit
+        """
+        key = key.lower()
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM enrichment_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+
+            value, created_at = row
+            ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+            if now - created_at > ttl:
+                self._conn.execute("DELETE FROM enrichment_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touches()
+            if value is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, json.loads(value)
+
+    def put(self, key: str, data: Dict):
+        """Cache a successful enrichment"""
+        self._store(key, json.dumps(data))
+
+    def put_negative(self, key: str):
+        """Cache a "not found" result so it is not paid for again"""
+        self._store(key, None)
+
+    def _store(self, key: str, value: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO enrichment_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       value = excluded.value,
+                       created_at = excluded.created_at,
+                       last_access = excluded.last_access""",
+                (key.lower(), value, now, now)
+            )
+            self._touched.pop(key.lower(), None)
+            # Counted as an insert even if it replaced a row; the next recount corrects it
+            self._approx_count += 1
+            self._writes_since_count += 1
+            if self._approx_count > self.max_entries or self._writes_since_count >= RECOUNT_INTERVAL:
+                self._evict()
+
+    def _flush_touches(self):
+        """Write the buffered access times (caller holds the lock)"""
+        if self._touched:
+            self._conn.executemany("UPDATE enrichment_cache SET last_access = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        """Recount, and if over max_entries drop least-recently-used entries down to EVICT_TO of it (caller holds the lock)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+        self._writes_since_count = 0
+        if count > self.max_entries:
+            self._flush_touches()
+            excess = count - int(self.max_entries * EVICT_TO)
+            self._conn.execute(
+                """DELETE FROM enrichment_cache WHERE key IN (
+                       SELECT key FROM enrichment_cache ORDER BY last_access LIMIT ?
+                   )""",
+                (excess,)
+            )
+            self.evictions += excess
+            count -= excess
+        self._approx_count = count
+
+    def flush(self):
+        """Write buffered access times now (e.g. before the process exits)"""
+        with self._lock:
+            self._flush_touches()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        """Get cache counters for this process"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "cache_size": len(self),
+            "cache_hits": self.hits,
+            "cache_negative_hits": self.negative_hits,
+            "cache_misses": self.misses,
+            "cache_evictions": self.evictions,
+            "cache_expirations": self.expirations,
+            "cache_hit_rate": f"{((self.hits + self.negative_hits) / max(1, lookups) * 100):.1f}%"
+        }
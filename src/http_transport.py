@@ -0,0 +1,193 @@
+"""
+Shared HTTP Transport
+Keeps one pooled, keep-alive connection set per upstream host
+
+Key Features:
+1. One requests.Session per host (Apollo, Instantly, Inframail)
+2. Configurable pool sizes so concurrent callers reuse TCP/TLS connections
+3. Default timeout on every call (no more hanging forever)
+4. Per-host pool reuse statistics
+5. Optional per-provider adaptive rate limiting (see rate_limiter.py)
+6. Per provider/endpoint request, status and latency metrics (see metrics.py)
+7. Per provider/endpoint circuit breakers that fail fast while an endpoint is down
+   (see circuit_breaker.py)
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import CircuitOpenError, get_breaker
+from metrics import endpoint_label, registry
+from rate_limiter import THROTTLE_STATUS_CODES, get_limiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when the caller does not configure the transport
+DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_CONNECTIONS = 1
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class HttpTransport:
+    """Pooled HTTP client shared by all API managers"""
+
+    def __init__(self,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, url: str) -> requests.Session:
+        """Get (or lazily create) the pooled session for the URL's host"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=False
+                )
+                session = requests.Session()
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+                logger.debug(f"Opened connection pool for {host} (maxsize={self.pool_maxsize})")
+        return session
+
+    def request(self, method: str, url: str, provider: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pool, applying the default timeout
+        If provider is given, the call waits on that provider's shared rate limiter
+        and feeds the response back so the limiter can adapt. It also goes through
+        the endpoint's circuit breaker: while that is open, CircuitOpenError (a
+        RequestException) is raised without sending anything.
+        """
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        labels = {'provider': provider or urlsplit(url).netloc, 'endpoint': endpoint_label(url), 'method': method}
+        breaker = get_breaker(provider, labels['endpoint']) if provider is not None else None
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                registry.inc("lead_agent_http_circuit_rejections_total", **labels)
+                raise
+
+        limiter = get_limiter(provider) if provider is not None else None
+        if limiter is not None:
+            limiter.acquire()
+
+        started = time.perf_counter()
+        try:
+            response = self._session_for(url).request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            latency = time.perf_counter() - started
+            registry.observe("lead_agent_http_request_duration_seconds", latency, **labels)
+            registry.inc("lead_agent_http_request_errors_total", error=type(e).__name__, **labels)
+            logger.debug(f"{method} {labels['endpoint']} failed after {latency * 1000:.0f}ms: {type(e).__name__}",
+                         extra={'provider': labels['provider'], 'endpoint': labels['endpoint'],
+                                'latency': round(latency, 4)})
+            if limiter is not None:
+                limiter.on_error()
+            if breaker is not None:
+                breaker.on_failure()
+            raise
+        latency = time.perf_counter() - started
+        registry.observe("lead_agent_http_request_duration_seconds", latency, **labels)
+        registry.inc("lead_agent_http_requests_total", status=response.status_code, **labels)
+        logger.debug(f"{method} {labels['endpoint']} {response.status_code} in {latency * 1000:.0f}ms",
+                     extra={'provider': labels['provider'], 'endpoint': labels['endpoint'],
+                            'latency': round(latency, 4)})
+
+        if limiter is not None:
+            limiter.on_response(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+            if response.status_code >= 500 and response.status_code not in THROTTLE_STATUS_CODES:
+                # A failing upstream: retries wait on a reduced rate, like after a timeout
+                limiter.on_error()
+        if breaker is not None:
+            breaker.on_response(response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def get_pool_stats(self) -> Dict:
+        """Get connection reuse statistics for every host"""
+        stats = {}
+        for host, session in list(self._sessions.items()):
+            requests_sent = 0
+            connections_opened = 0
+            adapter = session.get_adapter(host)
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+
+            reused = max(0, requests_sent - connections_opened)
+            stats[host] = {
+                "requests": requests_sent,
+                "connections_opened": connections_opened,
+                "connections_reused": reused,
+                "reuse_rate": f"{(reused / max(1, requests_sent) * 100):.1f}%"
+            }
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Process-wide transport shared by every manager
+_shared_transport: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Get the process-wide shared transport, creating it with defaults if needed"""
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_lock:
+            if _shared_transport is None:
+                _shared_transport = HttpTransport()
+    return _shared_transport
+
+
+def configure_transport(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                        timeout: float = DEFAULT_TIMEOUT) -> HttpTransport:
+    """Replace the shared transport with one using the given pool settings"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is not None:
+            _shared_transport.close()
+        _shared_transport = HttpTransport(pool_connections, pool_maxsize, timeout)
+    return _shared_transport
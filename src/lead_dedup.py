@@ -0,0 +1,279 @@
+"""
+Lead Dedup Index
+Remembers every lead already pushed to Instantly, across runs
+
+Key Features:
+1. Emails are normalized and hashed; Apollo person ids are indexed too, so
+   known people are skipped before any enrichment credit is spent
+2. In-memory Bloom filter answers "definitely new" without touching disk
+3. Exact on-disk set (SQLite) confirms possible duplicates
+4. Atomic claim() so concurrent workers never push the same lead twice
+5. Rows are numbered, so the Bloom filter catches up on keys added since it
+   was saved (or by other processes) by reading only the newer rows
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Optional
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 5000000
+DEFAULT_ERROR_RATE = 0.001
+
+
+def normalize_email(email: str) -> str:
+    """Lowercase, trim and drop any +tag from the local part"""
+    local, _, domain = email.strip().lower().partition('@')
+    local = local.split('+', 1)[0]
+    return f"{local}@{domain}"
+
+
+def email_key(email: str) -> bytes:
+    return hashlib.sha256(b"email:" + normalize_email(email).encode()).digest()[:16]
+
+
+def person_key(person: Dict) -> Optional[bytes]:
+    """Key for an Apollo person: their id, else name + company"""
+    if person.get('id'):
+        raw = f"apollo:{person['id']}"
+    else:
+        first = (person.get('first_name') or '').strip().lower()
+        last = (person.get('last_name') or '').strip().lower()
+        company = (person.get('organization_name') or '').strip().lower()
+        if not first or not last:
+            return None
+        raw = f"name:{first}_{last}_{company}"
+    return hashlib.sha256(raw.encode()).digest()[:16]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 16-byte keys"""
+
+    HEADER = struct.Struct("<QQQ")  # bits, hashes, version
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        # Highest row id of the exact set whose key has been added
+        self.version = 0
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        # Double hashing: the key is already a uniform hash
+        h1, h2 = struct.unpack("<QQ", key[:16])
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: bytes):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path: str):
+        # Unique per writer: several workers may save the same filter at once
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.num_bits, self.num_hashes, self.version))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BloomFilter"]:
+        try:
+            with open(path, "rb") as f:
+                num_bits, num_hashes, version = cls.HEADER.unpack(f.read(cls.HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if len(bits) != (num_bits + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.num_bits, bloom.num_hashes, bloom.version, bloom.bits = num_bits, num_hashes, version, bits
+        return bloom
+
+
+class LeadDedupIndex:
+    """Persistent set of leads already pushed, with a Bloom filter in front"""
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE,
+                 shared: bool = False):
+        """
+        shared: other processes push leads into the same index at the same time.
+        Before a lookup the Bloom filter reads any rows they committed since it last
+        looked (PRAGMA data_version says whether there are any), so it stays a valid
+        prefilter and only possible duplicates go to the exact set.
+        """
+        self.path = path
+        self.shared = shared
+        self.bloom_path = f"{path}.bloom"
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        migrated = self._create_table()
+
+        self.lookups = 0
+        self.bloom_rejections = 0
+        self.duplicates = 0
+
+        bloom = None if migrated else BloomFilter.load(self.bloom_path)
+        if bloom is None or bloom.version > self._max_id():
+            # Missing, or saved against a different copy of the exact set - rebuild
+            count = self._count()
+            bloom = BloomFilter(max(capacity, count * 2), error_rate)
+            if count:
+                logger.info(f"Rebuilding lead dedup filter from {count} known keys")
+        self._bloom = bloom
+        self._data_version = None
+        # Keys pushed since the filter was saved (e.g. before a crash)
+        self._refresh()
+
+    def _create_table(self) -> bool:
+        """Create pushed_leads, or number the rows of an older copy. True if it migrated."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pushed_leads)")}
+        if columns and "id" not in columns:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another worker may have just migrated
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pushed_leads)")}
+                if "id" not in columns:
+                    self._conn.execute("ALTER TABLE pushed_leads RENAME TO pushed_leads_old")
+                    self._create_numbered_table()
+                    self._conn.execute("INSERT INTO pushed_leads (key) SELECT key FROM pushed_leads_old")
+                    self._conn.execute("DROP TABLE pushed_leads_old")
+                    # Its header counts keys rather than naming a row id
+                    try:
+                        os.remove(self.bloom_path)
+                    except FileNotFoundError:
+                        pass
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return True
+        self._create_numbered_table()
+        return False
+
+    def _create_numbered_table(self):
+        # AUTOINCREMENT: ids of released keys are never reused, so a new key always
+        # gets an id above every version a Bloom filter has already read up to
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pushed_leads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key BLOB NOT NULL UNIQUE
+            )
+        """)
+
+    def _max_id(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM pushed_leads").fetchone()[0]
+
+    def _refresh(self):
+        """Caller holds the lock (or is __init__). Add keys with ids past the filter's version."""
+        rows = self._conn.execute(
+            "SELECT id, key FROM pushed_leads WHERE id > ? ORDER BY id", (self._bloom.version,)
+        )
+        for row_id, key in rows:
+            self._bloom.add(key)
+            self._bloom.version = row_id
+
+    def _refresh_shared(self):
+        """Caller holds the lock. Catch up only if another connection committed since the last look."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._refresh()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pushed_leads").fetchone()[0]
+
+    def _contains(self, key: bytes) -> bool:
+        """Caller holds the lock"""
+        self.lookups += 1
+        if self.shared:
+            self._refresh_shared()
+        if key not in self._bloom:
+            self.bloom_rejections += 1
+            return False
+        return self._conn.execute("SELECT 1 FROM pushed_leads WHERE key = ?", (key,)).fetchone() is not None
+
+    def seen_person(self, person: Dict) -> bool:
+        """True if this person (or their email, when known) was already pushed"""
+        keys = [person_key(person)]
+        if person.get('email') and '@' in person['email']:
+            keys.append(email_key(person['email']))
+        with self._lock:
+            seen = any(self._contains(key) for key in keys if key)
+            if seen:
+                self.duplicates += 1
+            return seen
+
+    def seen_email(self, email: str) -> bool:
+        with self._lock:
+            seen = self._contains(email_key(email))
+            if seen:
+                self.duplicates += 1
+            return seen
+
+    def _insert(self, key: bytes) -> bool:
+        """Caller holds the lock. True if the key was new."""
+        cursor = self._conn.execute("INSERT OR IGNORE INTO pushed_leads (key) VALUES (?)", (key,))
+        inserted = cursor.rowcount == 1
+        if inserted:
+            self._bloom.add(key)
+            # Next in line: no other process's row can be missing below it
+            if cursor.lastrowid == self._bloom.version + 1:
+                self._bloom.version = cursor.lastrowid
+        return inserted
+
+    def claim(self, email: str, person: Optional[Dict] = None) -> bool:
+        """
+        Atomically reserve a lead before pushing it
+        Returns False if the email was already pushed (by this or another process).
+        The person key is recorded either way, so the person is skipped before
+        enrichment next time.
+        """
+        with self._lock:
+            claimed = self._insert(email_key(email))
+            if person:
+                key = person_key(person)
+                if key:
+                    self._insert(key)
+            if not claimed:
+                self.duplicates += 1
+            return claimed
+
+    def release(self, email: str, person: Optional[Dict] = None):
+        """Undo a claim after a failed push so the lead can be retried"""
+        keys = [email_key(email)]
+        if person:
+            keys.append(person_key(person))
+        with self._lock:
+            for key in keys:
+                if key:
+                    self._conn.execute("DELETE FROM pushed_leads WHERE key = ?", (key,))
+        # The Bloom filter keeps the bits; that only costs one exact lookup later
+
+    def save(self):
+        """Persist the Bloom filter so the next start skips the rebuild"""
+        with self._lock:
+            self._refresh()
+            self._bloom.save(self.bloom_path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def get_stats(self) -> Dict:
+        return {
+            "known_keys": len(self),
+            "lookups": self.lookups,
+            "bloom_rejections": self.bloom_rejections,
+            "duplicates": self.duplicates
+        }
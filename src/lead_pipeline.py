@@ -0,0 +1,460 @@
+"""
+Lead Pipeline
+Streams leads from Apollo search to Instantly through bounded, overlapping stages
+
+    search pages -> validate -> dedup -> enrich -> push
+
+Each stage is a generator over the one before it. The search, enrich and push
+stages run in their own threads and hand leads on through bounded queues, so
+a slow stage makes the earlier ones wait instead of piling people up in
+memory: peak memory depends on the queue size, not on the number of leads.
+The first leads reach Instantly while later pages are still being searched.
+
+Demand drives the search: a new page is only fetched while the people already
+in the pipeline cannot cover what is left of the target. A search page only
+counts as consumed once every person on it has been pushed or dropped, so
+stopping at the target never skips people nobody looked at.
+"""
+
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from email_validation import MISSING, VALID
+
+logger = logging.getLogger(__name__)
+
+# The only person fields the later stages need; the rest of Apollo's record is dropped early
+PERSON_FIELDS = ("id", "first_name", "last_name", "name", "organization_name", "email")
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+_END = object()
+_POLL = 0.1  # Seconds between stop checks while a stage waits
+
+
+def basic_email_check(email: Optional[str]) -> bool:
+    """Format-only email check"""
+    return bool(email and isinstance(email, str) and EMAIL_PATTERN.match(email))
+
+
+class LeadPipeline:
+    """Streaming, memory-bounded import of up to target leads"""
+
+    def __init__(self,
+                 target: int,
+                 is_known: Callable[[Dict], bool],
+                 enrich: Callable[[List[Dict]], List[Optional[str]]],
+                 claim: Callable[[str, Dict], bool],
+                 push: Callable[[List[Dict]], Dict[str, bool]],
+                 on_result: Callable[[Dict, bool], None],
+                 advance_page: Optional[Callable[[Dict], None]] = None,
+                 paused: Optional[Callable[[], bool]] = None,
+                 validate_email: Callable[[Optional[str]], bool] = basic_email_check,
+                 screen_emails: Optional[Callable[[List[Optional[str]]], List[str]]] = None,
+                 enrich_batch_size: int = 1,
+                 enrich_workers: int = 4,
+                 push_batch_size: int = 1,
+                 push_workers: int = 4,
+                 max_wait: float = 10.0,
+                 queue_size: int = 200):
+        """
+        is_known(person): lead already pushed in an earlier run
+        enrich(people): one email (or None) per person, in order
+        claim(email, person): reserve the lead in the dedup index (False if taken)
+        push(leads): upload leads ({'email', 'person'}), returns {email: success}
+        on_result(lead, pushed): called once per claimed lead
+        advance_page(page): called, in page order, once a page is fully settled
+        paused(): True while an upstream the import needs is unavailable; the
+            pipeline then stops before searching or enriching anyone else
+        validate_email(email): True if an email (found or revealed) may be used
+        screen_emails(emails): one verdict per email of a whole search page
+            (see email_validation); people with a rejected email are dropped
+            before they reach enrichment
+        """
+        self.target = target
+        self.is_known = is_known
+        self.enrich_people = enrich
+        self.claim = claim
+        self.push_leads = push
+        self.on_result = on_result
+        self.advance_page = advance_page
+        self.paused = paused
+        self.validate_email = validate_email
+        self.screen_emails = screen_emails
+        self.enrich_batch_size = max(1, enrich_batch_size)
+        self.enrich_workers = max(1, enrich_workers)
+        self.push_batch_size = max(1, push_batch_size)
+        self.push_workers = max(1, push_workers)
+        self.max_wait = max_wait
+        self.queue_size = max(1, queue_size)
+
+        self.stats = {'searched': 0, 'invalid': 0, 'rejected': 0, 'known': 0, 'not_found': 0,
+                      'duplicates': 0, 'pushed': 0, 'failed': 0}
+        self._imported = 0
+        self._reserved = 0    # Leads past enrichment, counted against the target until settled
+        self._unclaimed = 0   # Leads searched but not yet reserved or dropped
+        self._pages: "OrderedDict[int, Dict]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._errors: List[BaseException] = []
+        self.stopped_unavailable = False
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _room(self) -> int:
+        return self.target - self._imported - self._reserved
+
+    def _open_page(self, page: Dict):
+        with self._cond:
+            self._pages[page['page']] = {'outstanding': len(page['people']), 'page': {
+                k: page[k] for k in ('page', 'total_pages', 'exhausted')}}
+            self._unclaimed += len(page['people'])
+            self.stats['searched'] += len(page['people'])
+            self._commit_pages()
+
+    def _commit_pages(self):
+        """Advance the search cursor past every leading page that is fully settled (lock held)"""
+        while self._pages:
+            number, entry = next(iter(self._pages.items()))
+            if entry['outstanding'] > 0:
+                return
+            del self._pages[number]
+            if self.advance_page:
+                try:
+                    self.advance_page(entry['page'])
+                except Exception as e:
+                    logger.error(f"Could not record search page {number}: {e}")
+
+    def _drop(self, lead: Dict, reason: str):
+        """Settle a lead that never reserved room"""
+        with self._cond:
+            self.stats[reason] += 1
+            self._unclaimed -= 1
+            self._pages[lead['page']]['outstanding'] -= 1
+            self._commit_pages()
+            self._cond.notify_all()
+
+    def _reserve(self, n: int) -> int:
+        """Wait for room under the target and reserve up to n leads; 0 once stopped"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._stop.is_set() or self._room() > 0)
+            if self._stop.is_set():
+                return 0
+            reserved = min(n, self._room())
+            self._reserved += reserved
+            self._unclaimed -= reserved
+            return reserved
+
+    def _settle(self, lead: Dict, reason: str, imported: bool = False):
+        """Settle a reserved lead"""
+        with self._cond:
+            self.stats[reason] += 1
+            self._reserved -= 1
+            if imported:
+                self._imported += 1
+            self._pages[lead['page']]['outstanding'] -= 1
+            self._commit_pages()
+            if self._imported >= self.target:
+                self._stop.set()
+            self._cond.notify_all()
+
+    def _wait_for_demand(self) -> bool:
+        """Block until more people are needed; False once stopped"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._stop.is_set() or self._unclaimed < self._room())
+            return not self._stop.is_set()
+
+    def stop(self):
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+
+    def _pause_if_unavailable(self) -> bool:
+        """Stop if paused() says an upstream is down; unsettled people are searched again next run"""
+        if self.paused is None or not self.paused():
+            return False
+        if not self._stop.is_set():
+            logger.warning("Upstream unavailable, stopping the import until a later run")
+            self.stopped_unavailable = True
+        self.stop()
+        return True
+
+    # ------------------------------------------------------------------
+    # Threaded plumbing
+    # ------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, q: queue.Queue, tick: bool = False) -> Iterator:
+        """Items from a stage's queue; with tick, None is yielded while the queue is idle"""
+        while True:
+            try:
+                item = q.get(timeout=_POLL)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                if tick:
+                    yield None
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def _start(self, target: Callable, name: str):
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                logger.error(f"Pipeline stage {name} failed: {e}")
+                self._errors.append(e)
+                self.stop()
+
+        thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def threaded(self, items: Iterator, name: str, tick: bool = False) -> Iterator:
+        """Run a generator stage in its own thread, behind a bounded queue"""
+        q: queue.Queue = queue.Queue(self.queue_size)
+
+        def produce():
+            try:
+                for item in items:
+                    if not self._put(q, item):
+                        break
+            finally:
+                close = getattr(items, 'close', None)
+                if close:
+                    close()
+                self._put(q, _END)
+
+        self._start(produce, name)
+        return self._drain(q, tick)
+
+    def parallel(self, func: Callable[[List[Dict]], Iterable[Dict]], batches: Iterator[List[Dict]],
+                 workers: int, name: str, tick: bool = False) -> Iterator:
+        """Run func over batches with up to workers calls in flight; yields what the calls emit"""
+        q: queue.Queue = queue.Queue(self.queue_size)
+        slots = threading.Semaphore(workers)
+
+        def task(batch: List[Dict]):
+            try:
+                for item in func(batch):
+                    if not self._put(q, item):
+                        return
+            except Exception as e:
+                logger.error(f"Pipeline {name} error: {e}")
+            finally:
+                slots.release()
+
+        def produce():
+            try:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pipeline-{name}") as executor:
+                    for batch in batches:
+                        while not slots.acquire(timeout=_POLL):
+                            if self._stop.is_set():
+                                return
+                        if self._stop.is_set():
+                            slots.release()
+                            return
+                        executor.submit(task, batch)
+            finally:
+                close = getattr(batches, 'close', None)
+                if close:
+                    close()
+                self._put(q, _END)
+
+        self._start(produce, name)
+        return self._drain(q, tick)
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def people(self, pages: Iterator[Dict]) -> Iterator[Dict]:
+        """Search stage: one slimmed-down lead per person, fetching pages on demand"""
+        try:
+            while self._wait_for_demand():
+                if self._pause_if_unavailable():
+                    return
+                page = next(pages, None)
+                if page is None:
+                    return
+                self._open_page(page)
+                verdicts = [None] * len(page['people'])
+                if self.screen_emails:
+                    verdicts = self.screen_emails([person.get('email') for person in page['people']])
+                for person, verdict in zip(page['people'], verdicts):
+                    yield {'page': page['page'], 'email': None, 'verdict': verdict,
+                           'person': {k: person.get(k) for k in PERSON_FIELDS if person.get(k) is not None}}
+        finally:
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+
+    def validate(self, leads: Iterator[Dict]) -> Iterator[Dict]:
+        """Drop people who can be neither enriched nor emailed; keep only well-formed emails"""
+        for lead in leads:
+            person = lead['person']
+            email = person.get('email')
+            verdict = lead.pop('verdict')
+            if verdict is None:
+                if self.validate_email(email):
+                    lead['email'] = email
+            elif verdict == VALID:
+                lead['email'] = email
+            elif verdict != MISSING:
+                self._drop(lead, 'rejected')
+                continue
+            if not person.get('first_name') or not (lead['email'] or person.get('last_name')):
+                self._drop(lead, 'invalid')
+                continue
+            yield lead
+
+    def dedup(self, leads: Iterator[Dict]) -> Iterator[Dict]:
+        """Drop leads pushed in an earlier run, before they can cost an enrichment credit"""
+        for lead in leads:
+            if self.is_known(lead['person']):
+                self._drop(lead, 'known')
+                continue
+            yield lead
+
+    def enrich_batches(self, leads: Iterator[Optional[Dict]]) -> Iterator[List[Dict]]:
+        """Leads with an email go on alone; the rest are grouped for enrichment"""
+        batch = []
+        for lead in leads:
+            if lead is None:
+                # Search is idle (or waiting for demand): don't hold a partial batch back
+                if batch:
+                    yield batch
+                    batch = []
+                continue
+            if lead['email']:
+                yield [lead]
+                continue
+            batch.append(lead)
+            if len(batch) >= self.enrich_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def enrich(self, batch: List[Dict]) -> Iterator[Dict]:
+        """Reserve room under the target, then reveal hidden emails"""
+        while batch:
+            if self._pause_if_unavailable():
+                return
+            reserved = self._reserve(len(batch))
+            if not reserved:
+                # Stopped: these people stay unsettled, so their page is searched again
+                return
+            chunk, batch = batch[:reserved], batch[reserved:]
+
+            hidden = [lead for lead in chunk if not lead['email']]
+            if hidden:
+                try:
+                    emails = self.enrich_people([lead['person'] for lead in hidden])
+                except Exception as e:
+                    logger.error(f"Enrichment error: {e}")
+                    emails = []
+                for lead, email in zip(hidden, emails):
+                    lead['email'] = email if self.validate_email(email) else None
+
+            for lead in chunk:
+                if lead['email']:
+                    yield lead
+                else:
+                    self._settle(lead, 'not_found')
+
+    def push_batches(self, leads: Iterator[Optional[Dict]]) -> Iterator[List[Dict]]:
+        """
+        Group leads for upload. A batch goes out when full, when its oldest lead has
+        waited max_wait seconds, or when enrichment is blocked waiting for room.
+        """
+        batch: List[Dict] = []
+        oldest = 0.0
+        for lead in leads:
+            if lead is not None:
+                if not batch:
+                    oldest = time.monotonic()
+                batch.append(lead)
+            if batch and (len(batch) >= self.push_batch_size
+                          or time.monotonic() - oldest >= self.max_wait
+                          or (lead is None and self._room() <= 0)):
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def push(self, batch: List[Dict]) -> Iterator[Dict]:
+        """Claim each lead in the dedup index and upload the claimed ones"""
+        claimed = []
+        for lead in batch:
+            try:
+                is_new = self.claim(lead['email'], lead['person'])
+            except Exception as e:
+                logger.error(f"Dedup error for {lead['email']}: {e}")
+                self._settle(lead, 'failed')
+                continue
+            if is_new:
+                claimed.append(lead)
+            else:
+                self._settle(lead, 'duplicates')
+        if not claimed:
+            return
+
+        try:
+            results = self.push_leads(claimed)
+        except Exception as e:
+            logger.error(f"Lead upload error: {e}")
+            results = {}
+
+        for lead in claimed:
+            pushed = bool(results.get(lead['email']))
+            try:
+                self.on_result(lead, pushed)
+            finally:
+                self._settle(lead, 'pushed' if pushed else 'failed', imported=pushed)
+            yield lead
+
+    # ------------------------------------------------------------------
+
+    def run(self, pages: Iterator[Dict]) -> int:
+        """
+        Import until target leads are pushed or the search runs out
+        pages yields {'page', 'people', 'total_pages', 'exhausted'} (see search_cursor.walk_search_pages)
+        """
+        if self.target <= 0:
+            return 0
+
+        leads = self.threaded(self.dedup(self.validate(self.people(pages))), "search", tick=True)
+        enriched = self.parallel(self.enrich, self.enrich_batches(leads), self.enrich_workers, "enrich", tick=True)
+        pushed = self.parallel(self.push, self.push_batches(enriched), self.push_workers, "push")
+        try:
+            for _ in pushed:
+                if self._stop.is_set():
+                    break
+        finally:
+            self.stop()
+            for thread in self._threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self._imported
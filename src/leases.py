@@ -0,0 +1,185 @@
+"""
+Work Leases
+Lets several agent workers split the day's work through one shared SQLite store
+
+Key Features:
+1. Time-limited, exclusive leases on named work units (a domain, a search
+   shard, a batch of the day's leads)
+2. A worker that stops heartbeating loses its leases once they expire, so
+   another worker picks its work up
+3. Registry of live workers, so per-provider rate limits can be split between them
+
+Workers on several machines need DATA_DIR on a shared filesystem with working
+file locks (SQLite relies on them).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_TTL = 120.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseStore:
+    """Exclusive, expiring leases on work units, shared by every worker"""
+
+    def __init__(self, path: str, worker_id: Optional[str] = None, ttl: float = DEFAULT_LEASE_TTL):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self._held: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._conn = open_database(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                resource TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+        self.heartbeat()
+
+    def acquire(self, resource: str) -> bool:
+        """Take (or extend) the lease on resource unless a live worker holds it"""
+        now = time.time()
+        with self._lock:
+            # The upsert only overwrites our own lease or an expired one
+            taken = self._conn.execute(
+                """INSERT INTO leases (resource, owner, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT(resource) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                   WHERE leases.owner = excluded.owner OR leases.expires_at < ?""",
+                (resource, self.worker_id, now + self.ttl, now)
+            ).rowcount == 1
+            if taken:
+                self._held[resource] = now
+        if taken:
+            logger.debug(f"[{self.worker_id}] Leased {resource}")
+        return taken
+
+    def acquire_wait(self, resource: str, timeout: Optional[float] = None, poll: float = 1.0) -> bool:
+        """Block until resource can be leased; False after timeout seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.acquire(resource):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def release(self, resource: str):
+        with self._lock:
+            self._held.pop(resource, None)
+            self._conn.execute("DELETE FROM leases WHERE resource = ? AND owner = ?", (resource, self.worker_id))
+
+    @contextmanager
+    def hold(self, resource: str, timeout: Optional[float] = None) -> Iterator[bool]:
+        """Lease resource for the duration of a with-block (waits for it); yields whether it was leased"""
+        leased = self.acquire_wait(resource, timeout)
+        try:
+            yield leased
+        finally:
+            if leased:
+                self.release(resource)
+
+    def held(self) -> List[str]:
+        with self._lock:
+            return list(self._held)
+
+    def heartbeat(self) -> List[str]:
+        """Mark this worker alive and extend every lease it holds; returns leases lost to expiry"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO workers (worker_id, heartbeat_at) VALUES (?, ?)
+                   ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at""",
+                (self.worker_id, now)
+            )
+            self._conn.execute("UPDATE leases SET expires_at = ? WHERE owner = ?", (now + self.ttl, self.worker_id))
+            owned = {resource for (resource,) in self._conn.execute(
+                "SELECT resource FROM leases WHERE owner = ?", (self.worker_id,))}
+            lost = [resource for resource in self._held if resource not in owned]
+            for resource in lost:
+                del self._held[resource]
+        for resource in lost:
+            logger.warning(f"[{self.worker_id}] Lease on {resource} expired and was taken over")
+        return lost
+
+    def live_workers(self) -> int:
+        """Workers that heartbeated within the lease TTL (this one included)"""
+        with self._lock:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", (time.time() - self.ttl,)
+            ).fetchone()[0]
+        return max(1, count)
+
+    def start_heartbeat(self, on_workers_changed: Optional[Callable[[int], None]] = None,
+                        interval: Optional[float] = None):
+        """
+        Heartbeat in the background (every ttl/3 seconds by default)
+        on_workers_changed(n) is called with the live worker count whenever it changes.
+        """
+        if self._heartbeat is not None:
+            return
+        interval = interval or self.ttl / 3
+
+        def run():
+            workers = None
+            while True:
+                try:
+                    self.heartbeat()
+                    live = self.live_workers()
+                    if live != workers:
+                        workers = live
+                        logger.info(f"[{self.worker_id}] {live} live worker(s)")
+                        if on_workers_changed:
+                            on_workers_changed(live)
+                except Exception as e:
+                    logger.warning(f"[{self.worker_id}] Lease heartbeat failed: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._heartbeat = threading.Thread(target=run, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def close(self):
+        """Release every lease and leave the worker registry"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._lock:
+            self._held.clear()
+            self._conn.execute("DELETE FROM leases WHERE owner = ?", (self.worker_id,))
+            self._conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            leases = self._conn.execute(
+                "SELECT resource, owner, expires_at FROM leases WHERE expires_at >= ? ORDER BY resource", (now,)
+            ).fetchall()
+        return {
+            "worker_id": self.worker_id,
+            "live_workers": self.live_workers(),
+            "leases": [{"resource": resource, "owner": owner, "expires_in": round(expires_at - now, 1)}
+                       for resource, owner, expires_at in leases],
+        }
@@ -0,0 +1,120 @@
+"""
+Log Tailing
+Reads the end of the agent's log without loading the whole file
+
+Key Features:
+1. tail_lines() seeks backwards from the end, so cost depends on N, not file size
+2. read_since() returns only lines appended after a byte-offset cursor
+3. Follows the daily agent_YYYYMMDD.log files and handles rotation/truncation
+4. readable_lines() shows JSON-lines logs (LOG_FORMAT = "json") like the text format
+"""
+
+import glob
+import json
+import os
+from typing import List, Optional, Tuple
+
+LOG_PATTERN = "agent_*.log"
+BLOCK_SIZE = 8192
+MAX_READ_BYTES = 256 * 1024  # Per incremental read
+
+
+def find_latest_log(log_dir: str, pattern: str = LOG_PATTERN) -> Optional[str]:
+    """Newest daily log (agent_YYYYMMDD.log names sort by date)"""
+    candidates = glob.glob(os.path.join(log_dir, pattern))
+    if not candidates:
+        return None
+    return max(candidates, key=lambda path: (os.path.basename(path), os.path.getmtime(path)))
+
+
+def tail_lines(path: str, n: int = 50) -> List[str]:
+    """Last n lines of a file, reading backwards in blocks"""
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # n lines need n+1 newlines unless we reach the start of the file
+        while position > 0 and data.count(b"\n") <= n:
+            step = min(BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return lines[-n:]
+
+
+def _encode_cursor(path: str, inode: int, offset: int) -> str:
+    return f"{inode}:{offset}:{os.path.basename(path)}"
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int, str]]:
+    if not cursor:
+        return None
+    try:
+        inode, offset, name = cursor.split(":", 2)
+        return int(inode), int(offset), name
+    except ValueError:
+        return None
+
+
+def read_since(log_dir: str, cursor: Optional[str] = None, initial_lines: int = 50,
+               pattern: str = LOG_PATTERN) -> Tuple[List[str], Optional[str]]:
+    """
+    New complete lines since cursor, plus the cursor to pass next time
+    Without a cursor, returns the last initial_lines lines. If the day's log
+    rolled over, or the file was rotated or truncated, reading restarts at the
+    beginning of the current log.
+    """
+    path = find_latest_log(log_dir, pattern)
+    if path is None:
+        return [], cursor
+
+    stat = os.stat(path)
+    decoded = _decode_cursor(cursor)
+    if decoded is None:
+        return tail_lines(path, initial_lines), _encode_cursor(path, stat.st_ino, stat.st_size)
+
+    inode, offset, name = decoded
+    if name != os.path.basename(path):
+        # Day rolled over: finish what is left of the previous log first
+        previous = os.path.join(log_dir, name)
+        if os.path.exists(previous) and os.stat(previous).st_ino == inode and os.stat(previous).st_size > offset:
+            lines, new_offset = _read_lines(previous, offset)
+            if lines:
+                return lines, _encode_cursor(previous, inode, new_offset)
+        offset = 0
+    elif inode != stat.st_ino or offset > stat.st_size:
+        # Rotated or truncated in place
+        offset = 0
+
+    lines, offset = _read_lines(path, offset)
+    return lines, _encode_cursor(path, stat.st_ino, offset)
+
+
+def _read_lines(path: str, offset: int) -> Tuple[List[str], int]:
+    """Complete lines from offset on; a partial last line is left for next time"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(MAX_READ_BYTES)
+
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return [], offset
+    return data[:end].decode("utf-8", errors="replace").splitlines(), offset + end
+
+
+def readable_line(line: str) -> str:
+    """A JSON log line as "ts - LEVEL - message"; any other line unchanged"""
+    if not line.startswith("{"):
+        return line
+    try:
+        entry = json.loads(line)
+        return f"{entry['ts']} - {entry['level']} - {entry['message']}"
+    except (ValueError, KeyError, TypeError):
+        return line
+
+
+def readable_lines(lines: List[str]) -> List[str]:
+    return [readable_line(line) for line in lines]
@@ -0,0 +1,227 @@
+"""
+Logging Setup
+Non-blocking, rotating logs for the agent
+
+Key Features:
+1. Callers only put records on a bounded in-memory queue; one background thread
+   (QueueListener) formats them and does all the disk I/O
+2. If the queue is full (e.g. the disk stalls) records are dropped and counted
+   instead of blocking the caller
+3. One file per day, agent_YYYYMMDD.log, which the dashboard tails; a day's file
+   is also rotated by size to agent_YYYYMMDD.log.1, .2, ... and old days are deleted
+4. Optional JSON-lines format with fixed fields (provider, endpoint, latency,
+   lead_id), filled from logger calls' extra={...}
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_PREFIX = "agent_"
+
+# Structured fields every JSON line carries (null when a call did not set them)
+FIELDS = ("provider", "endpoint", "latency", "lead_id")
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_RETENTION_DAYS = 14
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, the fixed FIELDS and exc if any"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DailyRotatingFileHandler(logging.Handler):
+    """
+    Writes to <directory>/agent_YYYYMMDD.log, switching files at midnight
+    Past max_bytes the day's file is renamed to .1 (older ones shift up to
+    backup_count) and a new one is started; days older than retention_days are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT, retention_days: int = DEFAULT_RETENTION_DAYS):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self._day: Optional[str] = None
+        self._stream = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.directory, f"{LOG_PREFIX}{day}.log")
+
+    def _open(self, day: str):
+        self._close_stream()
+        self._day = day
+        self._stream = open(self.path_for(day), "a", encoding="utf-8")
+        self._delete_old_days()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _rotate_by_size(self):
+        self._close_stream()
+        path = self.path_for(self._day)
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{path}.{i}"):
+                    os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+        self._stream = open(path, "a", encoding="utf-8")
+
+    def _delete_old_days(self):
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for path in glob.glob(os.path.join(self.directory, f"{LOG_PREFIX}*.log*")):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record) + "\n"
+            day = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+            if day != self._day or self._stream is None:
+                self._open(day)
+            elif self.max_bytes and self._stream.tell() + len(line) > self.max_bytes:
+                self._rotate_by_size()
+            self._stream.write(line)
+            self._stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            self._close_stream()
+        finally:
+            self.release()
+        super().close()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: a full queue drops the record"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now (they may change later) but leave formatting to the listener thread.
+        # The root logger's handlers run last, so the record is changed in place instead of copied.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_lock = threading.Lock()
+
+
+def configure_logging(log_dir: Optional[str],
+                      level: str = "INFO",
+                      json_lines: bool = False,
+                      max_bytes: int = DEFAULT_MAX_BYTES,
+                      backup_count: int = DEFAULT_BACKUP_COUNT,
+                      retention_days: int = DEFAULT_RETENTION_DAYS,
+                      console: bool = True,
+                      queue_size: int = DEFAULT_QUEUE_SIZE):
+    """
+    Route the root logger through a queue to the daily file (if log_dir) and the console
+    Safe to call again, e.g. after a config reload: the previous listener is flushed and replaced.
+    """
+    global _listener, _queue_handler
+    formatter = JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if log_dir:
+        file_handler = DailyRotatingFileHandler(log_dir, max_bytes, backup_count, retention_days)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    with _lock:
+        previous_listener = _listener
+        root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        listener.start()
+        _listener, _queue_handler = listener, queue_handler
+
+    if previous_listener is not None:
+        previous_listener.stop()
+        for handler in previous_listener.handlers:
+            handler.close()
+
+
+def shutdown_logging():
+    """Flush every queued record to disk (registered to run at exit)"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,212 @@
+"""
+Metrics
+Counters, gauges and latency histograms for every outbound call and pipeline stage
+
+Key Features:
+1. Process-wide registry labeled by provider / endpoint / status / stage
+2. Snapshot exported to a small JSON file (atomic rename) on an interval,
+   so the dashboard process can read the agent's numbers without any RPC
+3. Prometheus text rendering for the dashboard's /metrics endpoint
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segments that are ids (uuids, numbers, long tokens) are collapsed so
+# /api/v2/campaigns/<uuid> is one endpoint, not one per campaign
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9a-fA-F-]{8,}$|^\d+$")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def endpoint_label(url: str) -> str:
+    """Normalized path of a URL for use as a metric label"""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?", 1)[0]
+    return "/".join(":id" if _ID_SEGMENT.match(part) else part for part in path.split("/")) or "/"
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe in-process metrics"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._collectors: List[Callable[["MetricsRegistry"], None]] = []
+        self._lock = threading.Lock()
+        self._exporter: Optional[threading.Thread] = None
+        self._export_path: Optional[str] = None
+        self._export_interval = 15.0
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation in a histogram (bucket counts, then sum and count)"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of a with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def register_collector(self, collector: Callable[["MetricsRegistry"], None]):
+        """Callback run before each snapshot, e.g. to refresh gauges"""
+        self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Callable[["MetricsRegistry"], None]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def snapshot(self) -> Dict:
+        for collector in list(self._collectors):
+            try:
+                collector(self)
+            except Exception as e:
+                logger.debug(f"Metrics collector failed: {e}")
+
+        def dump(metrics):
+            return {name: [[dict(key), value] for key, value in series.items()]
+                    for name, series in metrics.items()}
+
+        with self._lock:
+            return {
+                "generated_at": time.time(),
+                "buckets": list(self.buckets),
+                "counters": dump(self._counters),
+                "gauges": dump(self._gauges),
+                "histograms": {name: [[dict(key), list(hist)] for key, hist in series.items()]
+                               for name, series in self._histograms.items()},
+            }
+
+    def write_snapshot(self, path: str):
+        """Atomically write the snapshot for other processes to read"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def start_exporter(self, path: str, interval: float = 15.0):
+        """
+        Write the snapshot to path every interval seconds
+        One exporter thread per process: calling this again (e.g. after a config
+        reload) moves it to the new path and interval.
+        """
+        self._export_path = path
+        self._export_interval = interval
+        if self._exporter is not None:
+            return
+
+        def run():
+            while True:
+                path = self._export_path
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    logger.warning(f"Could not export metrics to {path}: {e}")
+                time.sleep(self._export_interval)
+
+        self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+
+def read_snapshot(path: str) -> Optional[Dict]:
+    """Load a snapshot written by another process"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(snapshots: List[Tuple[Dict, Dict[str, str]]]) -> str:
+    """
+    Render snapshots as Prometheus text exposition format
+    Each entry is (snapshot, extra_labels), e.g. ({...}, {"process": "agent"})
+    """
+    types: Dict[str, str] = {}
+    samples: Dict[str, List[str]] = {}
+
+    for snap, extra in snapshots:
+        for kind, metric_type in (("counters", "counter"), ("gauges", "gauge")):
+            for name, series in snap.get(kind, {}).items():
+                types[name] = metric_type
+                for labels, value in series:
+                    samples.setdefault(name, []).append(
+                        f"{name}{_format_labels({**labels, **extra})} {_format_value(value)}"
+                    )
+
+        buckets = snap.get("buckets", list(LATENCY_BUCKETS))
+        for name, series in snap.get("histograms", {}).items():
+            types[name] = "histogram"
+            lines = samples.setdefault(name, [])
+            for labels, hist in series:
+                labels = {**labels, **extra}
+                for bound, count in zip(buckets, hist):
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': repr(float(bound))})} {_format_value(count)}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {_format_value(hist[-1])}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {repr(float(hist[-2]))}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(hist[-1])}")
+
+    output = []
+    for name in sorted(samples):
+        output.append(f"# TYPE {name} {types[name]}")
+        output.extend(samples[name])
+    return "\n".join(output) + "\n"
+
+
+# Process-wide registry used by the transport, managers and agent
+registry = MetricsRegistry()
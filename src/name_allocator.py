@@ -0,0 +1,86 @@
+"""
+Account Name Allocator
+Hands out unused first.last style mailbox names per domain in O(1)
+
+The free name space of each domain is computed once (every pattern x first
+name x last name, minus mailboxes that already exist) and shuffled; each
+allocation pops the next name. Patterns are used in order of preference, so
+"f.last" names are only handed out once every "first.last" name is taken.
+"""
+
+import logging
+import random
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Local-part patterns: {first}/{last} are full names, {f}/{l} their initials
+NAME_PATTERNS = {
+    "first.last": "{first}.{last}",
+    "firstl": "{first}{l}",
+    "f.last": "{f}.{last}",
+}
+
+
+class NameAllocator:
+    """Collision-free mailbox name allocation, aware of existing accounts"""
+
+    def __init__(self,
+                 first_names: Iterable[str],
+                 last_names: Iterable[str],
+                 existing_emails: Iterable[str] = (),
+                 patterns: Iterable[str] = ("first.last",),
+                 rng: Optional[random.Random] = None):
+        self.first_names = list(dict.fromkeys(name.lower() for name in first_names))
+        self.last_names = list(dict.fromkeys(name.lower() for name in last_names))
+        unknown = [p for p in patterns if p not in NAME_PATTERNS]
+        if unknown:
+            raise ValueError(f"Unknown name patterns: {unknown}")
+        self.patterns = list(patterns)
+        self.rng = rng or random.Random()
+        self._taken = {email.strip().lower() for email in existing_emails}
+        # Per domain: one shuffled stack per pattern, in preference order
+        self._free: Dict[str, List[List[Dict]]] = {}
+
+    def _build(self, domain: str) -> List[List[Dict]]:
+        seen = set()
+        tiers = []
+        for pattern in self.patterns:
+            template = NAME_PATTERNS[pattern]
+            tier = []
+            for first in self.first_names:
+                for last in self.last_names:
+                    local = template.format(first=first, last=last, f=first[0], l=last[0])
+                    email = f"{local}@{domain}"
+                    if email in seen or email in self._taken:
+                        continue
+                    seen.add(email)
+                    tier.append({'email': email, 'first': first, 'last': last})
+            self.rng.shuffle(tier)
+            tiers.append(tier)
+        return tiers
+
+    def _tiers(self, domain: str) -> List[List[Dict]]:
+        domain = domain.lower()
+        if domain not in self._free:
+            self._free[domain] = self._build(domain)
+        return self._free[domain]
+
+    def allocate(self, domain: str) -> Optional[Dict]:
+        """Next free name on the domain ({'email', 'first', 'last'}), or None if exhausted"""
+        for tier in self._tiers(domain):
+            while tier:
+                name = tier.pop()
+                # Skip names reserved since the space was built
+                if name['email'] not in self._taken:
+                    self._taken.add(name['email'])
+                    return name
+        return None
+
+    def reserve(self, email: str):
+        """Mark an address as taken (e.g. created elsewhere)"""
+        self._taken.add(email.strip().lower())
+
+    def remaining(self, domain: str) -> int:
+        """Free names left on the domain (upper bound if reservations are pending)"""
+        return sum(len(tier) for tier in self._tiers(domain))
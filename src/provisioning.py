@@ -0,0 +1,93 @@
+"""
+Account Provisioning Engine
+Moves each new mailbox through Inframail create -> Instantly connect concurrently
+
+Each stage has its own worker pool (the per-provider limit), and every call
+also holds a per-domain slot, so one busy domain cannot hog the providers.
+An account is handed to the Instantly stage as soon as its Inframail create
+finishes, so a slow connect never holds up the next create.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningEngine:
+    """Two-stage concurrent pipeline for new email accounts"""
+
+    def __init__(self,
+                 create_account: Callable[[Dict], bool],
+                 connect_account: Callable[[Dict], bool],
+                 per_domain_limit: int = 2,
+                 inframail_limit: int = 3,
+                 instantly_limit: int = 3,
+                 stopping: Optional[Callable[[], bool]] = None):
+        """
+        stopping(): True once no new accounts should be created (e.g. on shutdown);
+            accounts already created are still connected
+        """
+        self.create_account = create_account
+        self.connect_account = connect_account
+        self.per_domain_limit = per_domain_limit
+        self.inframail_limit = inframail_limit
+        self.instantly_limit = instantly_limit
+        self.stopping = stopping
+        self._domain_slots: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _domain_slot(self, domain: str) -> threading.Semaphore:
+        with self._lock:
+            if domain not in self._domain_slots:
+                self._domain_slots[domain] = threading.Semaphore(self.per_domain_limit)
+            return self._domain_slots[domain]
+
+    def _run_stage(self, stage: Callable[[Dict], bool], account: Dict) -> bool:
+        with self._domain_slot(account['domain']):
+            try:
+                return stage(account)
+            except Exception as e:
+                logger.error(f"Provisioning error for {account['email']}: {e}")
+                return False
+
+    def _create(self, account: Dict) -> Optional[bool]:
+        """Inframail stage; None if the engine was told to stop before this account started"""
+        if self.stopping is not None and self.stopping():
+            return None
+        return self._run_stage(self.create_account, account)
+
+    def run(self, new_accounts: List[Dict], created_accounts: Optional[List[Dict]] = None) -> Dict[str, int]:
+        """
+        Provision new_accounts end to end; created_accounts (already created in
+        Inframail, e.g. before a restart) only go through the Instantly stage.
+        Each account dict needs at least 'email' and 'domain'.
+        """
+        results = {'created': 0, 'connected': 0, 'failed': 0, 'skipped': 0}
+
+        with ThreadPoolExecutor(max_workers=self.inframail_limit, thread_name_prefix="inframail") as inframail_pool, \
+                ThreadPoolExecutor(max_workers=self.instantly_limit, thread_name_prefix="instantly") as instantly_pool:
+
+            connects: List[Future] = [instantly_pool.submit(self._run_stage, self.connect_account, account)
+                                      for account in created_accounts or []]
+
+            creates = {inframail_pool.submit(self._create, account): account for account in new_accounts}
+            for future in as_completed(creates):
+                created = future.result()
+                if created is None:
+                    results['skipped'] += 1
+                elif created:
+                    results['created'] += 1
+                    connects.append(instantly_pool.submit(self._run_stage, self.connect_account, creates[future]))
+                else:
+                    results['failed'] += 1
+
+            for future in as_completed(connects):
+                if future.result():
+                    results['connected'] += 1
+                else:
+                    results['failed'] += 1
+
+        return results
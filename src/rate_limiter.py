@@ -0,0 +1,199 @@
+"""
+Adaptive Rate Limiter
+Per-provider token buckets shared by every API manager
+
+Key Features:
+1. Token bucket configured in requests/sec plus a burst size
+2. Honors Retry-After on 429 responses
+3. Halves the rate on 429/503 and grows it back while calls succeed
+4. One limiter per provider (apollo, instantly, inframail) per process
+5. Cluster share: with N workers running, each one uses 1/N of the configured rate
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Starting points; each limiter adapts from here
+DEFAULT_RATE_LIMITS = {
+    "apollo": {"rate": 2.0, "burst": 5},
+    "instantly": {"rate": 5.0, "burst": 10},
+    "inframail": {"rate": 1.0, "burst": 2},
+}
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket that backs off on throttling and speeds up while calls succeed"""
+
+    def __init__(self,
+                 name: str,
+                 rate: float,
+                 burst: int = 1,
+                 min_rate: Optional[float] = None,
+                 max_rate: Optional[float] = None,
+                 decrease_factor: float = 0.5,
+                 increase_interval: float = 5.0):
+        self.name = name
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.min_rate = min_rate if min_rate is not None else self.base_rate / 10
+        self.max_rate = max_rate if max_rate is not None else self.base_rate * 4
+        self.share = 1.0
+        self._full_burst = self.burst
+        self.decrease_factor = decrease_factor
+        self.increase_interval = increase_interval
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._last_adjust = self._last_refill
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.seconds_waited = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self) -> float:
+        """Block until a request may be sent. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Reserve a token now (the balance may go negative) and sleep off the debt
+            self._tokens -= 1
+            wait = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            self.requests += 1
+            self.seconds_waited += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_response(self, status_code: int, retry_after: Optional[float] = None):
+        """Adapt the rate to the upstream's answer"""
+        with self._lock:
+            now = time.monotonic()
+            if status_code in THROTTLE_STATUS_CODES:
+                self.throttled += 1
+                old_rate = self.rate
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._tokens = min(self._tokens, 0.0)
+                pause = retry_after if retry_after is not None else 1.0 / self.rate
+                self._paused_until = max(self._paused_until, now + pause)
+                self._last_adjust = now
+                logger.warning(f"[{self.name}] Throttled ({status_code}); rate {old_rate:.2f} -> {self.rate:.2f} req/s, "
+                               f"pausing {pause:.1f}s")
+            elif status_code < 500 and now - self._last_adjust >= self.increase_interval:
+                # Additive increase while the provider keeps accepting us
+                self.rate = min(self.max_rate, self.rate + self.base_rate * 0.1)
+                self._last_adjust = now
+
+    def on_error(self):
+        """Treat a transport error (timeout, reset) or a 5xx answer as a soft throttle"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Spend the burst so the next call (often a retry) waits for the reduced rate
+            self._tokens = min(self._tokens, 0.0)
+            self._last_adjust = time.monotonic()
+
+    def set_share(self, share: float):
+        """Use this share of the configured rates and burst, e.g. 1/N with N workers"""
+        with self._lock:
+            scale = share / self.share
+            if scale == 1:
+                return
+            self.share = share
+            self.base_rate *= scale
+            self.rate *= scale
+            self.min_rate *= scale
+            self.max_rate *= scale
+            self.burst = max(1, int(self._full_burst * share))
+            self._tokens = min(self._tokens, float(self.burst))
+        logger.info(f"[{self.name}] Using {share:.0%} of the cluster rate limit ({self.rate:.2f} req/s)")
+
+    def get_stats(self) -> Dict:
+        """Get limiter statistics"""
+        return {
+            "rate": round(self.rate, 2),
+            "burst": self.burst,
+            "share": round(self.share, 3),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "seconds_waited": round(self.seconds_waited, 1)
+        }
+
+
+# Process-wide limiters, one per provider
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+_cluster_share = 1.0
+
+
+def get_limiter(provider: str) -> AdaptiveRateLimiter:
+    """Get the shared limiter for a provider, creating it from defaults if needed"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                settings = DEFAULT_RATE_LIMITS.get(provider, {"rate": 1.0, "burst": 1})
+                limiter = AdaptiveRateLimiter(provider, **settings)
+                limiter.set_share(_cluster_share)
+                _limiters[provider] = limiter
+    return limiter
+
+
+def configure_limiter(provider: str, rate: float, burst: int = 1, **kwargs) -> AdaptiveRateLimiter:
+    """Replace a provider's shared limiter with new settings"""
+    limiter = AdaptiveRateLimiter(provider, rate, burst, **kwargs)
+    limiter.set_share(_cluster_share)
+    with _limiters_lock:
+        _limiters[provider] = limiter
+    return limiter
+
+
+def set_cluster_workers(workers: int):
+    """Split every provider's rate limit evenly between this many live workers"""
+    global _cluster_share
+    with _limiters_lock:
+        _cluster_share = 1.0 / max(1, workers)
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        limiter.set_share(_cluster_share)
+
+
+def get_all_limiter_stats() -> Dict[str, Dict]:
+    """Get statistics for every provider limiter in this process"""
+    return {name: limiter.get_stats() for name, limiter in list(_limiters.items())}
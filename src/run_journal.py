@@ -0,0 +1,165 @@
+"""
+Run Journal
+Durable record of each day's plan and every completed unit of work
+
+After a crash or restart the agent reads the journal, skips everything that
+already finished today and picks the plan up in the middle. Work is recorded
+by kind and key, e.g. ("account_created", email) or ("lead_pushed", email).
+
+Secrets a record needs for resuming (a new mailbox's password) are only kept
+until redact() is called for it, and never past its day. The file is 0600.
+"""
+
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_CREATED = "account_created"
+ACCOUNT_CONNECTED = "account_connected"
+ACCOUNT_ASSIGNED = "account_assigned"
+LEAD_PUSHED = "lead_pushed"
+
+RETENTION_DAYS = 7
+
+# Fields removed from a record's data by redact(), and from every earlier day's records
+SECRET_FIELDS = ("password",)
+
+
+class RunJournal:
+    """Write-ahead journal of the current day's run, stored in SQLite"""
+
+    def __init__(self, path: str, run_date: Optional[str] = None):
+        self.path = path
+        self.run_date = run_date or date.today().isoformat()
+        self._lock = threading.Lock()
+        self._conn = open_database(path, private=True)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_plans (
+                run_date TEXT PRIMARY KEY,
+                plan TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                completed_at TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS run_events (
+                run_date TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT,
+                recorded_at TEXT NOT NULL,
+                PRIMARY KEY (run_date, kind, key)
+            )
+        """)
+        self._prune()
+
+    def _prune(self):
+        """Drop journals older than RETENTION_DAYS and secrets left in earlier days' records"""
+        cutoff = (date.fromisoformat(self.run_date) - timedelta(days=RETENTION_DAYS)).isoformat()
+        with self._lock:
+            self._conn.execute("DELETE FROM run_events WHERE run_date < ?", (cutoff,))
+            self._conn.execute("DELETE FROM run_plans WHERE run_date < ?", (cutoff,))
+            rows = self._conn.execute(
+                "SELECT run_date, kind, key, data FROM run_events WHERE run_date < ? AND data IS NOT NULL",
+                (self.run_date,)
+            ).fetchall()
+            self._redact_rows(rows)
+
+    def _redact_rows(self, rows):
+        """Caller holds the lock; rows are (run_date, kind, key, data)"""
+        updates = []
+        for run_date, kind, key, data in rows:
+            fields = json.loads(data)
+            if isinstance(fields, dict) and any(name in fields for name in SECRET_FIELDS):
+                kept = {name: value for name, value in fields.items() if name not in SECRET_FIELDS}
+                updates.append((json.dumps(kept), run_date, kind, key))
+        self._conn.executemany("UPDATE run_events SET data = ? WHERE run_date = ? AND kind = ? AND key = ?", updates)
+
+    def redact(self, kind: str, key: str):
+        """Remove SECRET_FIELDS from today's record once the work that needed them is done"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_date, kind, key, data FROM run_events WHERE run_date = ? AND kind = ? AND key = ?"
+                " AND data IS NOT NULL",
+                (self.run_date, kind, key)
+            ).fetchall()
+            self._redact_rows(rows)
+
+    def get_plan(self) -> Optional[Dict]:
+        """Today's saved plan, or None if today's run has not started"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT plan FROM run_plans WHERE run_date = ?", (self.run_date,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_plan(self, plan: Dict):
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO run_plans (run_date, plan, created_at) VALUES (?, ?, ?)
+                   ON CONFLICT(run_date) DO UPDATE SET plan = excluded.plan""",
+                (self.run_date, json.dumps(plan), datetime.now().isoformat())
+            )
+
+    def mark_complete(self):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE run_plans SET completed_at = ? WHERE run_date = ?",
+                (datetime.now().isoformat(), self.run_date)
+            )
+
+    def is_complete(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT completed_at FROM run_plans WHERE run_date = ?", (self.run_date,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def record(self, kind: str, key: str, data: Optional[Dict] = None):
+        """Record a completed unit of work (idempotent)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_events (run_date, kind, key, data, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (self.run_date, kind, key, json.dumps(data) if data is not None else None, datetime.now().isoformat())
+            )
+
+    def is_done(self, kind: str, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM run_events WHERE run_date = ? AND kind = ? AND key = ?",
+                (self.run_date, kind, key)
+            ).fetchone() is not None
+
+    def entries(self, kind: str) -> Dict[str, Optional[Dict]]:
+        """All of today's records of a kind, in the order they were recorded"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, data FROM run_events WHERE run_date = ? AND kind = ? ORDER BY recorded_at",
+                (self.run_date, kind)
+            ).fetchall()
+        return {key: json.loads(data) if data else None for key, data in rows}
+
+    def history(self, kind: str) -> Dict[str, str]:
+        """When each key of a kind was first recorded, over every retained day (not just today)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, MIN(recorded_at) FROM run_events WHERE kind = ? GROUP BY key", (kind,)
+            ).fetchall()
+        return dict(rows)
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM run_events WHERE run_date = ? AND kind = ?",
+                (self.run_date, kind)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,132 @@
+"""
+Scheduler
+Runs the agent's phases on fixed cadences inside one long-running process
+
+Key Features:
+1. Each job runs every interval seconds, counted from the end of its last run,
+   so a slow phase is never started again back to back
+2. Jobs run one at a time on the scheduler's thread; between jobs it sleeps on
+   an event until the next one is due, without polling
+3. reload() and stop() are safe to call from signal handlers: they only set
+   flags and wake the loop, which acts on them between jobs
+4. stop() lets the running job finish (it is told to drain through on_stop)
+   and then returns from run()
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """One recurring phase"""
+
+    def __init__(self, name: str, func: Callable[[], None], interval: float, next_run: float):
+        self.name = name
+        self.func = func
+        self.interval = float(interval)
+        self.next_run = next_run
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+
+
+class Scheduler:
+    """Single-threaded cadence scheduler with reload and graceful stop"""
+
+    def __init__(self,
+                 on_reload: Optional[Callable[[], None]] = None,
+                 on_stop: Optional[Callable[[], None]] = None):
+        """
+        on_reload(): called between jobs after reload() was requested
+        on_stop(): called once when stop() is requested, e.g. to make the running job drain
+        """
+        self.on_reload = on_reload
+        self.on_stop = on_stop
+        self.jobs: List[Job] = []
+        self._wake = threading.Event()
+        self._reload = threading.Event()
+        self._stop = threading.Event()
+
+    def add(self, name: str, func: Callable[[], None], interval: float, delay: float = 0.0) -> Job:
+        """Run func every interval seconds, the first time after delay seconds"""
+        job = Job(name, func, interval, time.monotonic() + delay)
+        self.jobs.append(job)
+        self._wake.set()
+        return job
+
+    def set_interval(self, name: str, interval: float):
+        """Change a job's cadence; its next run moves accordingly"""
+        for job in self.jobs:
+            if job.name == name and job.interval != interval:
+                job.next_run += interval - job.interval
+                job.interval = float(interval)
+        self._wake.set()
+
+    def reload(self):
+        self._reload.set()
+        self._wake.set()
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        if self.on_stop:
+            self.on_stop()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def _run_job(self, job: Job):
+        started = time.monotonic()
+        try:
+            job.func()
+        except Exception as e:
+            job.failures += 1
+            logger.exception(f"Scheduled {job.name} failed: {e}")
+        finished = time.monotonic()
+        job.runs += 1
+        job.last_duration = finished - started
+        job.next_run = finished + job.interval
+        logger.info(f"Scheduled {job.name} finished in {job.last_duration:.1f}s; "
+                    f"next in {job.interval:.0f}s")
+
+    def run(self):
+        """Run due jobs until stop() is called"""
+        while not self._stop.is_set():
+            if self._reload.is_set():
+                self._reload.clear()
+                if self.on_reload:
+                    try:
+                        self.on_reload()
+                    except Exception as e:
+                        logger.exception(f"Reload failed, keeping the current settings: {e}")
+                continue
+
+            if not self.jobs:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            job = min(self.jobs, key=lambda j: j.next_run)
+            wait = job.next_run - time.monotonic()
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            self._run_job(job)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        return {job.name: {
+            "interval": job.interval,
+            "runs": job.runs,
+            "failures": job.failures,
+            "last_duration": round(job.last_duration, 1),
+            "next_in": round(max(0.0, job.next_run - now), 1)
+        } for job in self.jobs}
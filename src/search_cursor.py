@@ -0,0 +1,133 @@
+"""
+Resumable Apollo Search
+Walks search result pages lazily and remembers where each query stopped
+
+Each query is identified by a fingerprint of its search criteria. After a
+page has been fully consumed its number is saved, so the next run continues
+from the following page instead of re-fetching people it already has.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from storage import open_database
+
+logger = logging.getLogger(__name__)
+
+# Apollo does not serve results past this page
+APOLLO_MAX_PAGES = 500
+
+
+def query_fingerprint(payload: Dict) -> str:
+    """Stable id for a search query (ignores the API key and page number)"""
+    criteria = {k: v for k, v in payload.items() if k not in ("api_key", "page")}
+    return hashlib.sha1(json.dumps(criteria, sort_keys=True).encode()).hexdigest()
+
+
+class SearchCursorStore:
+    """Persists the last consumed page for each search query"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cursors (
+                fingerprint TEXT PRIMARY KEY,
+                last_page INTEGER NOT NULL,
+                total_pages INTEGER,
+                exhausted INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+    def get(self, fingerprint: str) -> Dict:
+        """Get the cursor for a query (page 0 if never searched)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_page, total_pages, exhausted FROM search_cursors WHERE fingerprint = ?",
+                (fingerprint,)
+            ).fetchone()
+        if not row:
+            return {"last_page": 0, "total_pages": None, "exhausted": False}
+        return {"last_page": row[0], "total_pages": row[1], "exhausted": bool(row[2])}
+
+    def advance(self, fingerprint: str, page: int, total_pages: Optional[int], exhausted: bool):
+        """Record that a page has been consumed"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO search_cursors (fingerprint, last_page, total_pages, exhausted, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(fingerprint) DO UPDATE SET
+                       last_page = excluded.last_page,
+                       total_pages = excluded.total_pages,
+                       exhausted = excluded.exhausted,
+                       updated_at = excluded.updated_at""",
+                (fingerprint, page, total_pages, int(exhausted), datetime.now().isoformat())
+            )
+
+    def reset(self, fingerprint: str):
+        """Start a query over from page 1"""
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cursors WHERE fingerprint = ?", (fingerprint,))
+
+
+def walk_search_pages(fetch_page: Callable[[int], Optional[Dict]],
+                      fingerprint: str,
+                      per_page: int,
+                      cursor_store: Optional[SearchCursorStore] = None,
+                      max_pages: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Lazily yield each page after the last consumed one, without moving the cursor
+    Items are {'page', 'people', 'total_pages', 'exhausted'}; the caller records
+    progress with cursor_store.advance() once it is done with a page.
+    fetch_page(page) returns the decoded response body, or None if the call failed.
+    """
+    cursor = cursor_store.get(fingerprint) if cursor_store else {"last_page": 0, "exhausted": False}
+    if cursor["exhausted"]:
+        logger.warning(f"Search {fingerprint[:8]} is exhausted after {cursor['last_page']} pages - "
+                       f"widen the search criteria or reset its cursor")
+        return
+
+    page = cursor["last_page"] + 1
+    pages_fetched = 0
+
+    while max_pages is None or pages_fetched < max_pages:
+        data = fetch_page(page)
+        if data is None:
+            # Failed call - leave the cursor alone so the page is retried next time
+            return
+        pages_fetched += 1
+
+        people = data.get('people', [])
+        total_pages = (data.get('pagination') or {}).get('total_pages')
+        last_page = min(total_pages or APOLLO_MAX_PAGES, APOLLO_MAX_PAGES)
+        exhausted = len(people) < per_page or page >= last_page
+
+        yield {"page": page, "people": people, "total_pages": total_pages, "exhausted": exhausted}
+
+        if exhausted:
+            logger.info(f"Search {fingerprint[:8]} exhausted at page {page}")
+            return
+        page += 1
+
+
+def iter_search_pages(fetch_page: Callable[[int], Optional[Dict]],
+                      fingerprint: str,
+                      per_page: int,
+                      cursor_store: Optional[SearchCursorStore] = None,
+                      max_pages: Optional[int] = None) -> Iterator[List[Dict]]:
+    """
+    Lazily yield the 'people' list of each search page, resuming after the last consumed page
+    A page only counts as consumed once the caller asks for the next one, so stopping
+    halfway through a page means that page is fetched again next time.
+    """
+    for page in walk_search_pages(fetch_page, fingerprint, per_page, cursor_store, max_pages):
+        if page["people"]:
+            yield page["people"]
+        if cursor_store:
+            cursor_store.advance(fingerprint, page["page"], page["total_pages"], page["exhausted"])
@@ -0,0 +1,35 @@
+"""
+Local State Storage
+SQLite helpers shared by the agent's on-disk stores
+
+Every store opens its database through open_database() so all of them use
+WAL mode and a busy timeout, which lets the agent, the dashboard and other
+workers read and write the same files safely.
+"""
+
+import os
+import sqlite3
+
+BUSY_TIMEOUT_SECONDS = 30
+
+
+def open_database(path: str, private: bool = False) -> sqlite3.Connection:
+    """
+    Open (and create if needed) a SQLite database for shared, multi-threaded use
+    private: for secrets - readable by the owner only (0600; SQLite gives its -wal and -shm
+    files the same mode) and deleted data is zeroed
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if private:
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        os.chmod(path, 0o600)
+
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if private:
+        # Overwrite deleted and replaced content instead of leaving it in free pages
+        conn.execute("PRAGMA secure_delete=ON")
+    return conn